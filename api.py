@@ -0,0 +1,322 @@
+import hashlib
+import json
+from datetime import date, datetime, timedelta
+
+from flask import Blueprint, Response, abort, current_app, jsonify, request
+
+from geo import geocode, nearest_venues
+from models import db, Venue, Artist, Show
+from queries import decode_cursor, encode_cursor
+from search import find_venues, find_artists
+
+#----------------------------------------------------------------------------#
+# JSON API.
+#----------------------------------------------------------------------------#
+
+# Read-only JSON views of venues, artists, shows and search under /api/v1.
+#
+# Collections are paginated with keyset cursors: a response carries
+# `next_cursor`, passed back as ?cursor= for the following page. Every
+# resource accepts ?fields=a,b to return (and select) only those columns.
+#
+# Responses carry a strong ETag derived from the id and version of every row
+# they contain, computed before serializing anything, so a matching
+# If-None-Match is answered with 304 and an empty body.
+
+api = Blueprint('api', __name__, url_prefix='/api/v1')
+
+VENUE_FIELDS = (
+    'id', 'name', 'city', 'state', 'address', 'phone', 'genres',
+    'facebook_link', 'image_link', 'website_link', 'seeking_talent',
+    'seeking_description', 'latitude', 'longitude', 'upcoming_shows_count',
+    'past_shows_count'
+)
+
+NEARBY_FIELDS = ('id', 'name', 'city', 'state', 'address', 'latitude', 'longitude', 'upcoming_shows_count')
+
+ARTIST_FIELDS = (
+    'id', 'name', 'city', 'state', 'phone', 'genres', 'facebook_link',
+    'image_link', 'website_link', 'seeking_venue', 'seeking_description',
+    'upcoming_shows_count', 'past_shows_count'
+)
+
+SHOW_FIELDS = ('id', 'venue_id', 'artist_id', 'start_time', 'duration_minutes')
+
+CALENDAR_FIELDS = ('id', 'start_time', 'duration_minutes', 'venue_id', 'venue_name', 'artist_id', 'artist_name')
+
+#----------------------------------------------------------------------------#
+# Helpers.
+#----------------------------------------------------------------------------#
+
+def _fields(allowed):
+    # The requested sparse fieldset; `id` is always included.
+    requested = request.args.get('fields')
+    if not requested:
+        return allowed
+    fields = [field.strip() for field in requested.split(',') if field.strip()]
+    unknown = set(fields) - set(allowed)
+    if unknown:
+        abort(400, 'Unknown fields: {}'.format(', '.join(sorted(unknown))))
+    return ('id',) + tuple(field for field in allowed if field in fields and field != 'id')
+
+def _limit():
+    limit = request.args.get('limit', current_app.config['API_PAGE_SIZE'], type=int)
+    return max(1, min(limit, current_app.config['API_MAX_PAGE_SIZE']))
+
+def _columns(model, fields):
+    return [getattr(model, field) for field in fields] + [model.version]
+
+def _serialize(row, fields):
+    data = {}
+    for field in fields:
+        value = getattr(row, field)
+        data[field] = value.isoformat() if isinstance(value, datetime) else value
+    return data
+
+def _row_version(row):
+    return [row.id, row.version]
+
+def _etag(rows, *extra, versions=_row_version):
+    # Rows are (..., version) tuples with the id first; rows that also
+    # render other entities pass `versions` to include theirs.
+    digest = hashlib.sha1(json.dumps(
+        [request.path, request.query_string.decode()] + list(extra) +
+        [list(versions(row)) for row in rows]
+    ).encode())
+    return digest.hexdigest()
+
+def _conditional(etag, build):
+    # Returns 304 if the client already has this representation; otherwise
+    # calls `build` for the body.
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = jsonify(build())
+    response.set_etag(etag)
+    return response
+
+def _collection(fields, query, cursor_of, versions=_row_version):
+    # Runs a keyset-paginated `query` (already filtered and ordered) and
+    # returns the conditional response for the page.
+    limit = _limit()
+    rows = query.limit(limit + 1).all()
+    more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = cursor_of(rows[-1]) if rows and more else None
+
+    return _conditional(_etag(rows, next_cursor, versions=versions), lambda: {
+        'data': [_serialize(row, fields) for row in rows],
+        'next_cursor': next_cursor
+    })
+
+def _detail(model, fields, entity_id):
+    row = db.session.query(*_columns(model, fields)).filter(model.id == entity_id).first()
+    if row is None:
+        abort(404)
+    return _conditional(_etag([row]), lambda: {'data': _serialize(row, fields)})
+
+def _id_cursor(model, query):
+    cursor = request.args.get('cursor')
+    if cursor is not None:
+        try:
+            query = query.filter(model.id > int(cursor))
+        except ValueError:
+            abort(400, 'Malformed cursor')
+    return query.order_by(model.id)
+
+def _show_filters(query):
+    for name, column in (('venue_id', Show.venue_id), ('artist_id', Show.artist_id)):
+        value = request.args.get(name, type=int)
+        if value is not None:
+            query = query.filter(column == value)
+    return query
+
+def _show_cursor(query):
+    # Keyset pagination on (start_time, id).
+    cursor = request.args.get('cursor')
+    if cursor is not None:
+        try:
+            start_time, show_id = decode_cursor(cursor)
+        except ValueError:
+            abort(400, 'Malformed cursor')
+        query = query.filter(
+            (Show.start_time > start_time) |
+            ((Show.start_time == start_time) & (Show.id > show_id)))
+    return query.order_by(Show.start_time, Show.id)
+
+def _date_arg(name):
+    value = request.args.get(name)
+    if not value:
+        abort(400, 'Missing {}'.format(name))
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        abort(400, 'Malformed {}; expected YYYY-MM-DD'.format(name))
+
+def api_error(error):
+    response = jsonify({'error': error.name, 'message': error.description})
+    response.status_code = error.code
+    # e.g. the Allow header of a 405
+    for name, value in error.get_headers():
+        if name.lower() != 'content-type':
+            response.headers.add(name, value)
+    return response
+
+def is_api_request():
+    return request.path == api.url_prefix or request.path.startswith(api.url_prefix + '/')
+
+# Registered per code so they take precedence over the HTML handlers of the
+# app. Errors raised while routing, e.g. an unknown path or method under
+# /api/v1, match no blueprint; the app's handlers pass those to api_error.
+for code in (400, 404, 405):
+    api.register_error_handler(code, api_error)
+
+#----------------------------------------------------------------------------#
+# Venues.
+#----------------------------------------------------------------------------#
+
+@api.route('/venues')
+def list_venues():
+    fields = _fields(VENUE_FIELDS)
+    query = _id_cursor(Venue, db.session.query(*_columns(Venue, fields)))
+    return _collection(fields, query, lambda row: str(row.id))
+
+@api.route('/venues/<int:venue_id>')
+def get_venue(venue_id):
+    return _detail(Venue, _fields(VENUE_FIELDS), venue_id)
+
+@api.route('/venues/near')
+def venues_near():
+    # The venues nearest to ?lat=&lon=, ?zip= or ?city=&state=, nearest
+    # first, each with its distance_km: up to ?limit= of them within
+    # ?radius_km= if given, else the nearest within NEARBY_MAX_RADIUS_KM.
+    # See geo.py for the grid index behind it.
+    latitude, longitude = _origin()
+    max_radius = current_app.config['NEARBY_MAX_RADIUS_KM']
+    radius = request.args.get('radius_km', type=float)
+    if radius is not None and not 0 < radius <= max_radius:
+        abort(400, 'radius_km must be between 0 and {}'.format(max_radius))
+    fields = _fields(NEARBY_FIELDS)
+    found = nearest_venues(latitude, longitude, _limit(), max_radius, radius_km=radius,
+                           columns=_columns(Venue, fields))
+
+    return _conditional(_etag([row for _, row in found]), lambda: {
+        'origin': {'latitude': latitude, 'longitude': longitude},
+        'data': [dict(_serialize(row, fields), distance_km=round(distance, 2)) for distance, row in found]
+    })
+
+def _origin():
+    # (latitude, longitude) of the point a proximity search starts from.
+    latitude = request.args.get('lat', type=float)
+    longitude = request.args.get('lon', type=float)
+    if latitude is not None and longitude is not None:
+        if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+            abort(400, 'lat or lon out of range')
+        return latitude, longitude
+    if 'lat' in request.args or 'lon' in request.args:
+        abort(400, 'lat and lon must both be numbers')
+    if 'zip' in request.args:
+        point = geocode(zip_code=request.args['zip'].strip())
+        if point is None:
+            abort(404, 'Unknown ZIP code')
+        return point
+    if 'city' in request.args and 'state' in request.args:
+        point = geocode(request.args['city'], request.args['state'])
+        if point is None:
+            abort(404, 'Unknown city')
+        return point
+    abort(400, 'Pass lat and lon, zip, or city and state')
+
+#----------------------------------------------------------------------------#
+# Artists.
+#----------------------------------------------------------------------------#
+
+@api.route('/artists')
+def list_artists():
+    fields = _fields(ARTIST_FIELDS)
+    query = _id_cursor(Artist, db.session.query(*_columns(Artist, fields)))
+    return _collection(fields, query, lambda row: str(row.id))
+
+@api.route('/artists/<int:artist_id>')
+def get_artist(artist_id):
+    return _detail(Artist, _fields(ARTIST_FIELDS), artist_id)
+
+#----------------------------------------------------------------------------#
+# Shows.
+#----------------------------------------------------------------------------#
+
+@api.route('/shows')
+def list_shows():
+    # Ordered by (start_time, id); filter with ?venue_id= and/or ?artist_id=.
+    fields = _fields(SHOW_FIELDS)
+    columns = _columns(Show, fields)
+    if 'start_time' not in fields:
+        columns.append(Show.start_time)
+    query = _show_cursor(_show_filters(db.session.query(*columns)))
+    return _collection(fields, query, lambda row: encode_cursor(row.start_time, row.id))
+
+@api.route('/shows/<int:show_id>')
+def get_show(show_id):
+    return _detail(Show, _fields(SHOW_FIELDS), show_id)
+
+#----------------------------------------------------------------------------#
+# Calendar.
+#----------------------------------------------------------------------------#
+
+@api.route('/calendar')
+def calendar():
+    # Shows starting on the days from ?from= to ?to= (YYYY-MM-DD, both
+    # inclusive, at most CALENDAR_MAX_DAYS apart) with their venue and
+    # artist names, ordered by (start_time, id); filter with ?venue_id=
+    # and/or ?artist_id=. The literal bounds on start_time let PostgreSQL
+    # prune the query to the monthly partitions of the range.
+    first, last = _date_arg('from'), _date_arg('to')
+    if last < first:
+        abort(400, 'to is before from')
+    if (last - first).days >= current_app.config['CALENDAR_MAX_DAYS']:
+        abort(400, 'The range is longer than {} days'.format(current_app.config['CALENDAR_MAX_DAYS']))
+    start = datetime.combine(first, datetime.min.time())
+    end = datetime.combine(last + timedelta(days=1), datetime.min.time())
+
+    query = db.session.query(
+        Show.id,
+        Show.start_time,
+        Show.duration_minutes,
+        Show.venue_id,
+        Venue.name.label('venue_name'),
+        Show.artist_id,
+        Artist.name.label('artist_name'),
+        Show.version,
+        Venue.version.label('venue_version'),
+        Artist.version.label('artist_version')
+    ).join(Venue, Venue.id == Show.venue_id).join(Artist, Artist.id == Show.artist_id).filter(
+        Show.start_time >= start, Show.start_time < end)
+    query = _show_cursor(_show_filters(query))
+
+    # Renaming a venue or artist bumps its version, and so the ETag.
+    return _collection(CALENDAR_FIELDS, query, lambda row: encode_cursor(row.start_time, row.id),
+                       versions=lambda row: (row.id, row.version, row.venue_version, row.artist_version))
+
+#----------------------------------------------------------------------------#
+# Search.
+#----------------------------------------------------------------------------#
+
+@api.route('/search/venues')
+def search_venues():
+    return _search(find_venues)
+
+@api.route('/search/artists')
+def search_artists():
+    return _search(find_artists)
+
+def _search(find):
+    # Ranked results for ?q=, at most SEARCH_RESULT_LIMIT of them.
+    rows = find(request.args.get('q', ''), limit=current_app.config['SEARCH_RESULT_LIMIT'])
+    return _conditional(_etag(rows), lambda: {
+        'count': len(rows),
+        'data': [{
+            'id': row.id,
+            'name': row.name,
+            'num_upcoming_shows': row.upcoming_shows_count
+        } for row in rows]
+    })
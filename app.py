@@ -5,6 +5,7 @@
 import json
 import dateutil.parser
 import babel
+import babel.dates
 from flask import Flask, render_template, request, Response, flash, redirect, url_for, abort
 from flask.json import jsonify
 from flask_moment import Moment
@@ -12,21 +13,41 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 import logging
 from logging import Formatter, FileHandler
+from flask.logging import default_handler
 from flask_wtf import Form
 from sqlalchemy.orm import backref
 from sqlalchemy.sql.elements import True_
 from forms import *
 from datetime import datetime
+from functools import lru_cache
 
 import sys
 
-from models import db, Venue, Artist, Show
+from models import db, Venue, Artist, Show, ShowArchive, MAX_SHOW_DURATION_MINUTES
+from queries import load_venue_areas, load_venue_detail, load_artists, load_artist_detail, load_shows_page
+from queries import load_genres, load_genre_page
+from queries import probe_venue_areas, probe_venue_detail, probe_artists, probe_artist_detail, probe_shows_page
+from search import find_venues, find_artists
+from cache import PageCache, conditional
+from api import api, api_error, is_api_request
+from importer import import_command
+from export import export, export_cli
+from summaries import AreaSummaryRefresher, summaries_cli
+from partitions import partitions_cli
+from archive import archive_cli
+from instrumentation import SQLInstrumentation, structured_handler
+from pooling import init_pool, pool_stats
+from counters import counts_cli, record_show_created, record_shows_removed
+from bookings import check_booking
+from genres import genres_cli, set_genres
+from geo import geo_cli, locate_venue
 #----------------------------------------------------------------------------#
 # App Config.
 #----------------------------------------------------------------------------#
 
 app = Flask(__name__)
 app.config.from_object('config')
+init_pool(app)
 moment = Moment(app)
 db.init_app(app)
 
@@ -35,6 +56,19 @@ app.config['SQLALCHEMY_DATABASE_URI']
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS']
 
 migrate = Migrate(app, db)
+app.cli.add_command(counts_cli)
+app.cli.add_command(import_command)
+app.cli.add_command(export_cli)
+app.cli.add_command(summaries_cli)
+app.cli.add_command(partitions_cli)
+app.cli.add_command(archive_cli)
+app.cli.add_command(genres_cli)
+app.cli.add_command(geo_cli)
+app.register_blueprint(api)
+app.register_blueprint(export)
+page_cache = PageCache(app)
+sql_instrumentation = SQLInstrumentation(app)
+area_summary = AreaSummaryRefresher(app)
 
 #----------------------------------------------------------------------------#
 # Models.
@@ -50,16 +84,75 @@ migrate = Migrate(app, db)
 # Filters.
 #----------------------------------------------------------------------------#
 
-def format_datetime(value, format='medium'):
-  date = dateutil.parser.parse(value)
-  if format == 'full':
-      format="EEEE MMMM, d, y 'at' h:mma"
-  elif format == 'medium':
-      format="EE MM, dd, y h:mma"
-  return babel.dates.format_datetime(date, format, locale='en')
+DATETIME_FORMATS = {
+  'full': "EEEE MMMM, d, y 'at' h:mma",
+  'medium': "EE MM, dd, y h:mma",
+}
+
+@lru_cache(maxsize=None)
+def datetime_pattern(format, locale):
+  # Parsing babel patterns and locales is far more expensive than applying
+  # them, so each (format, locale) pair is only resolved once.
+  locale = babel.Locale.parse(locale)
+  pattern = DATETIME_FORMATS.get(format, format)
+  if pattern in ('short', 'medium', 'long', 'full'):
+      # Babel's named formats: the locale's date and time patterns, joined
+      # the way babel.dates.format_datetime joins them.
+      pattern = babel.dates.get_datetime_format(pattern, locale=locale) \
+          .replace('{0}', babel.dates.get_time_format(pattern, locale=locale).pattern) \
+          .replace('{1}', babel.dates.get_date_format(pattern, locale=locale).pattern)
+  return babel.dates.parse_pattern(pattern), locale
+
+def format_datetime(value, format='medium', locale='en'):
+  # Takes a datetime; strings are still parsed for older callers.
+  if isinstance(value, str):
+      value = dateutil.parser.parse(value)
+  pattern, locale = datetime_pattern(format, locale)
+  return pattern.apply(value, locale)
 
 app.jinja_env.filters['datetime'] = format_datetime
 
+#----------------------------------------------------------------------------#
+# Cache invalidation.
+#----------------------------------------------------------------------------#
+
+# Rendered pages are tagged with what they show: 'venues', 'artists' and
+# 'shows' for the listings, 'venue:<id>' and 'artist:<id>' for detail pages.
+# A venue or artist detail page also lists the other side of its shows, so
+# changing a venue invalidates the pages of the artists playing there and
+# vice versa.
+#
+# The venues listing is rendered from the area summary, which is refreshed
+# shortly after venue and show writes; its pages are invalidated again once
+# the refresh has landed.
+
+area_summary.listeners.append(lambda: page_cache.invalidate('venues'))
+
+def venue_tags(venue_id):
+    # The tags of the pages showing the venue; read them before deleting its
+    # shows.
+    if not page_cache.enabled:
+        return []
+    artist_ids = db.session.query(Show.artist_id).filter(Show.venue_id == venue_id).distinct()
+    return ['venues', 'shows', 'venue:{}'.format(venue_id)] + [
+        'artist:{}'.format(artist_id) for artist_id, in artist_ids]
+
+def invalidate_venue(venue_id, tags=None):
+    # Call after committing, so that no request can cache the old page again.
+    area_summary.request_refresh()
+    page_cache.invalidate(*(venue_tags(venue_id) if tags is None else tags))
+
+def invalidate_artist(artist_id):
+    if not page_cache.enabled:
+        return
+    venue_ids = db.session.query(Show.venue_id).filter(Show.artist_id == artist_id).distinct()
+    page_cache.invalidate('artists', 'shows', 'artist:{}'.format(artist_id),
+        *['venue:{}'.format(venue_id) for venue_id, in venue_ids])
+
+def invalidate_show(venue_id, artist_id):
+    area_summary.request_refresh()
+    page_cache.invalidate('venues', 'shows', 'venue:{}'.format(venue_id), 'artist:{}'.format(artist_id))
+
 #----------------------------------------------------------------------------#
 # Controllers.
 #----------------------------------------------------------------------------#
@@ -71,27 +164,12 @@ def index():
 #  Venues-----------------------------------------------------------------------------
 #  -----------------------------------------------------------------------------------
 @app.route('/venues')
+@conditional(probe_venue_areas)
+@page_cache.cached(lambda: ['venues'])
 def venues():
     # DONE: replace with real venues data.
     # num_upcoming_shows should be aggregated based on number of upcoming shows per venue.
-    
-    data = []    
-    areas = db.session.query(Venue.city, Venue.state).distinct(Venue.city, Venue.state).order_by('state').all()
-    for area in areas:
-        venues = Venue.query.filter_by(state=area.state).filter_by(city=area.city).order_by('name').all()
-        venue_data = []
-        data.append({
-            'city':area.city,
-            'state':area.state,
-            'venues': venue_data,
-        })
-        for venue in venues:
-            shows = Show.query.filter_by(venue_id=venue.id).order_by('id').all()
-            venue_data.append({
-                'id': venue.id,
-                'name': venue.name,
-                'num_upcoming_shows': len(shows)
-            })
+    data = load_venue_areas()
 
     return render_template('pages/venues.html', areas=data)
 
@@ -101,25 +179,15 @@ def search_venues():
     # seach for Hop should return "The Musical Hop".
     # search for "Music" should return "The Musical Hop" and "Park Square Live Music & Coffee"
 
-    search_term = request.form.get('search_term', None)
-    
-    venues = Venue.query.filter(Venue.name.ilike("%{}%".format(search_term))).all()
+    search_term = request.form.get('search_term', '')
     
-    data = []
+    venues = find_venues(search_term, limit=app.config['SEARCH_RESULT_LIMIT'])
 
-    for venue in venues:
-        num_upcoming_shows = 0
-
-        shows = Show.query.filter('venue_id' == venue.id).all()
-        for show in shows:
-            if(show.start_time > datetime.now()):
-                num_upcoming_shows += 1            
-        
-        data.append({
-            'id': venue.id,
-            'name': venue.name,
-            'num_upcoming_shows': num_upcoming_shows
-        })
+    data = [{
+        'id': venue.id,
+        'name': venue.name,
+        'num_upcoming_shows': venue.upcoming_shows_count
+    } for venue in venues]
 
     response = {
         "count": len(venues),
@@ -132,43 +200,13 @@ def search_venues():
 @app.route('/venues/<int:venue_id>')
 # shows the venue page with the given venue_id
 # DID it: replace with real venue data from the venues table, using venue_id
+@conditional(probe_venue_detail)
+@page_cache.cached(lambda venue_id: ['venue:{}'.format(venue_id)])
 def show_venue(venue_id):
+    venue_data = load_venue_detail(venue_id)
+    if venue_data is None:
+        abort(404)
 
-    past_shows = db.session.query(Artist, Show).join(Show).join(Venue).filter(Show.venue_id == venue_id, Show.artist_id == Artist.id, Show.start_time < datetime.now()).all()
-    
-    upcoming_shows = db.session.query(Artist, Show).join(Show).join(Venue).filter(Show.venue_id == venue_id, Show.artist_id == Artist.id, Show.start_time > datetime.now()).all()
-
-    venue = Venue.query.get_or_404(venue_id)
-
-    venue_data = {
-        'id':venue_id,
-        'name':venue.name,
-        'genres':venue.genres,
-        'city':venue.city,
-        'state':venue.state,
-        'address': venue.address,
-        'phone': venue.phone,
-        'website':venue.website_link,
-        'facebook_link':venue.facebook_link,
-        'image_link':venue.image_link,
-        'seeking_talent':venue.seeking_talent,
-        'seeking_description':venue.seeking_description,
-        'past_shows': [{
-            'artist_id': artist.id,
-            'artist_name': artist.name,
-            'artist_image_link': artist.image_link,
-            'start_time': show.start_time.strftime("%m/%d/%Y, %H:%M")
-        } for artist, show in past_shows],
-        'upcoming_shows': [{
-            'artist_id':artist.id,
-            'artist_name':artist.name,
-            'artist_image_link':artist.image_link,
-            'start_time': show.start_time.strftime("%m/%d/%Y, %H:%M")
-        } for artist, show in upcoming_shows],
-        'past_shows_count': len(past_shows),
-        'upcoming_shows_count': len(upcoming_shows)
-    }
-  
     return render_template('pages/show_venue.html', venue=venue_data)
 
 # --------------------------------------------------------------------------------
@@ -198,14 +236,19 @@ def create_venue_submission():
             seeking_description=form.seeking_description.data, 
             seeking_talent=form.seeking_talent.data)        
         
+        locate_venue(newVenue)
         db.session.add(newVenue)
+        db.session.flush()
+        set_genres(Venue, newVenue.id, newVenue.genres)
         db.session.commit()
+        page_cache.invalidate('venues')
+        area_summary.request_refresh()
         # on successful db insert, flash success
         flash('Venue ' + request.form['name'] + ' was successfully listed!')
     except:
         error = True
         db.session.rollback()
-        print(sys.exc_info())
+        app.logger.exception('Could not create venue')
     finally:
         db.session.close()
     if error:
@@ -221,25 +264,32 @@ def create_venue_submission():
 def delete_venue(venue_id):
     error = False
     try:
-        venue = Venue.query.get(venue_id)
-
-        shows = Show.query.filter_by(venue_id=venue.id).order_by('id').all()
-        
-        for show in shows:
-            db.session.delete(show)
-
-        db.session.delete(venue)
-        db.session.commit()
+        # Set-based deletes: the venue's shows are never loaded. The foreign
+        # keys cascade too; deleting them here first keeps the counters
+        # right and works where foreign keys are not enforced.
+        tags = venue_tags(venue_id)
+        record_shows_removed(Show.venue_id == venue_id)
+        set_genres(Venue, venue_id, [])
+        for model in (Show, ShowArchive):
+            model.query.filter(model.venue_id == venue_id).delete(synchronize_session=False)
+        found = Venue.query.filter(Venue.id == venue_id).delete(synchronize_session=False)
+        if found:
+            db.session.commit()
+            invalidate_venue(venue_id, tags)
+        else:
+            db.session.rollback()
     except:
         db.session.rollback()
         error = True
-        print(sys.exc_info())
+        app.logger.exception('Could not delete venue %s', venue_id)
     finally:
         db.session.close()
     if error:
         abort(500)
+    if not found:
+        abort(404)
     
-    return(render_template(url_for('index')))
+    return redirect(url_for('index'))
 
   # DONE: Complete this endpoint for taking a venue_id, and using
   # SQLAlchemy ORM to delete a record. Handle cases where the session commit could fail.
@@ -251,8 +301,10 @@ def delete_venue(venue_id):
 #  Artists ---------------------------------------------------------------------------
 #  -----------------------------------------------------------------------------------
 @app.route('/artists')
+@conditional(probe_artists)
+@page_cache.cached(lambda: ['artists'])
 def artists():
-    artist_data = Artist.query.all()
+    artist_data = load_artists()
 
   # DONE: replace with real data returned from querying the database
     return render_template('pages/artists.html', artists=artist_data)
@@ -265,71 +317,31 @@ def search_artists():
 
     search_term = request.form.get('search_term', '')
 
-    artists = Artist.query.filter(Artist.name.ilike("%{}%".format(search_term))).all()
-    
-    data = []
-
-    for artist in artists:
-        num_upcoming_shows = 0
+    artists = find_artists(search_term, limit=app.config['SEARCH_RESULT_LIMIT'])
 
-        shows = Show.query.filter('artist_id' == artist.id).all()
-        for show in shows:
-            if(show.start_time > datetime.now()):
-                num_upcoming_shows += 1
-        
-        data.append({
-            'id': artist.id,
-            'name': artist.name,
-            'num_upcoming_shows': num_upcoming_shows
-        })
+    data = [{
+        'id': artist.id,
+        'name': artist.name,
+        'num_upcoming_shows': artist.upcoming_shows_count
+    } for artist in artists]
 
-        response = {
-            'count':len(artists),
-            'data':data
-        }
+    response = {
+        'count':len(artists),
+        'data':data
+    }
 
     return render_template('pages/search_artists.html', results=response, search_term=request.form.get('search_term', ''))
 
 @app.route('/artists/<int:artist_id>')
+@conditional(probe_artist_detail)
+@page_cache.cached(lambda artist_id: ['artist:{}'.format(artist_id)])
 def show_artist(artist_id):
   # shows the artist page with the given artist_id
   # DONE: replace with real artist data from the artist table, using artist_id
-    artist = Artist.query.get(artist_id)
-    
-    past_shows = db.session.query(Artist, Show).join(Show).join(Venue).filter(Show.venue_id == Venue.id, Show.artist_id == Artist.id, Show.start_time < datetime.now()).all()
-    
-    upcoming_shows = db.session.query(Artist, Show).join(Show).join(Venue).filter(Show.venue_id == Venue.id, Show.artist_id == Artist.id, Show.start_time > datetime.now()).all()
-
-    venue = Venue.query.filter_by(id=Venue.id).first_or_404()
-
-    artist_data = {
-        'id':artist.id,
-        'name':artist.name,
-        'city':artist.city,
-        'state':artist.state,
-        'genres':artist.genres,
-        'phone':artist.phone,
-        'website_link':artist.website_link,
-        'facebook_link':artist.facebook_link,
-        'image_link':artist.image_link,
-        'seeking_venue':artist.seeking_venue,
-        'seeking_description':artist.seeking_description,
-        'past_shows': [{
-            'artist_id': artist.id,
-            'artist_name': artist.name,
-            'venue_image_link': venue.image_link,
-            'start_time': show.start_time.strftime("%m/%d/%Y, %H:%M")
-        } for artist, show in past_shows],
-        'upcoming_shows': [{
-            'artist_id':artist.id,
-            'artist_name':artist.name,
-            'venue_image_link':venue.image_link,
-            'start_time': show.start_time.strftime("%m/%d/%Y, %H:%M")
-        } for artist, show in upcoming_shows],
-        'past_shows_count': len(past_shows),
-        'upcoming_shows_count': len(upcoming_shows)
-    }
-    
+    artist_data = load_artist_detail(artist_id)
+    if artist_data is None:
+        abort(404)
+
     return render_template('pages/show_artist.html', artist=artist_data)
 
 # ------------------------------------------------------------------------------------
@@ -341,7 +353,7 @@ def edit_artist(artist_id):
     form = ArtistForm()    
     
     # DONE: populate form with fields from artist with ID <artist_id>
-    artist = Artist.query.get(artist_id)
+    artist = Artist.profile('edit').get_or_404(artist_id)
     return render_template('forms/edit_artist.html', form=form, artist=artist)
 
 @app.route('/artists/<int:artist_id>/edit', methods=['POST'])
@@ -351,13 +363,14 @@ def edit_artist_submission(artist_id):
     # DONE: take values from the form submitted, and update existing
     # artist record with ID <artist_id> using the new attributes
     try:
-        artist = Artist.query.get(artist_id)
+        artist = Artist.profile('edit').get(artist_id)
         # Updating records
         artist.name = form.name.data
         artist.city = form.city.data
         artist.state = form.state.data
         artist.phone = form.phone.data
         artist.genres = form.genres.data
+        set_genres(Artist, artist_id, artist.genres)
         artist.facebook_link = form.facebook_link.data
         artist.image_link = form.image_link.data
         artist.website_link = form.website_link.data
@@ -365,6 +378,7 @@ def edit_artist_submission(artist_id):
         artist.seeking_venue = form.seeking_venue.data
         #Saving transaction
         db.session.commit()
+        invalidate_artist(artist_id)
         error = True
     except:
         # rolling back transaction
@@ -380,7 +394,7 @@ def edit_artist_submission(artist_id):
 def edit_venue(venue_id):
     form = VenueForm()
 
-    venue = Venue.query.get(venue_id)
+    venue = Venue.profile('edit').get_or_404(venue_id)
 
     # DONE: populate form with values from venue with ID <venue_id>    
     return render_template('forms/edit_venue.html', form=form, venue=venue)
@@ -392,21 +406,25 @@ def edit_venue_submission(venue_id):
     # venue record with ID <venue_id> using the new attributes
     error = False
     try:
-        venue = Venue.query.get(venue_id)
+        venue = Venue.profile('edit').get(venue_id)
         # Updating records
         venue.name = form.name.data
         venue.city = form.city.data
         venue.state = form.state.data
         venue.address = form.address.data
+        # Before set_genres, whose queries flush the new city and address.
+        locate_venue(venue)
         venue.phone = form.phone.data
         venue.image_link = form.image_link.data
         venue.facebook_link = form.facebook_link.data
         venue.genres = form.genres.data
+        set_genres(Venue, venue_id, venue.genres)
         venue.website_link = form.website_link.data
         venue.seeking_description = form.seeking_description.data
         venue.seeking_talent = form.seeking_talent.data
        #Saving transaction
         db.session.commit()
+        invalidate_venue(venue_id)
     except:
         db.session.rollback()
         error = True
@@ -443,13 +461,16 @@ def create_artist_submission():
             seeking_venue=form.seeking_venue.data)
         
         db.session.add(newArtist)
+        db.session.flush()
+        set_genres(Artist, newArtist.id, newArtist.genres)
         db.session.commit()
+        page_cache.invalidate('artists')
         
         flash('Artist ' + request.form['name'] + ' was successfully listed!')
     except:
         error = True
         db.session.rollback()
-        print(sys.exc_info())
+        app.logger.exception('Could not create artist')
     finally:
         db.session.close()
     if error:
@@ -458,28 +479,43 @@ def create_artist_submission():
     
     return render_template('pages/home.html')
 
+# ------------------------------------------------------------------------------------
+#  Genres ----------------------------------------------------------------------------
+#  -----------------------------------------------------------------------------------
+
+@app.route('/genres')
+def genres():
+    return render_template('pages/genres.html', genres=load_genres())
+
+# A path converter, since genre names may contain slashes (e.g. "R&B/Soul").
+@app.route('/genres/<path:name>')
+def show_genre(name):
+    # Venues and artists of the genre; narrow them with ?state= and ?city=.
+    genre_data = load_genre_page(name, state=request.args.get('state') or None,
+                                 city=request.args.get('city') or None,
+                                 limit=app.config['GENRE_PAGE_LIMIT'])
+    if genre_data is None:
+        abort(404)
+    return render_template('pages/show_genre.html', genre=genre_data)
+
 # ------------------------------------------------------------------------------------
 #  Shows -----------------------------------------------------------------------------
 #  -----------------------------------------------------------------------------------
 
 @ app.route('/shows')
+@conditional(probe_shows_page)
+@page_cache.cached(lambda: ['shows'])
 def shows():
-    shows = Show.query.order_by(Show.start_time.desc()).all()
-    data = []
-    for show in shows:
-        venue = Venue.query.filter_by(id=show.venue_id).first_or_404()
-        artist = Artist.query.filter_by(id=show.artist_id).first_or_404()
-
-        data.append({
-            'venue_id': venue.id,
-            'venue_name': venue.name,
-            'artist_id': artist.id,
-            'artist_name': artist.name,
-            'artist_image_link': artist.image_link,
-            'start_time': show.start_time.strftime("%m/%d/%Y, %H:%M")
-        })
-
-    return render_template('pages/shows.html', shows=data)
+    try:
+        page = load_shows_page(
+            after=request.args.get('after'),
+            before=request.args.get('before'),
+            per_page=app.config['SHOWS_PER_PAGE'])
+    except ValueError:
+        abort(400)
+
+    return render_template('pages/shows.html', shows=page['shows'],
+        prev_cursor=page['prev_cursor'], next_cursor=page['next_cursor'])
 
 @app.route('/shows/create')
 def create_shows():
@@ -491,22 +527,51 @@ def create_shows():
 def create_show_submission():
     form = ShowForm()
     error = False
+    conflicts = []
+    invalid = [message for field, message in (
+        (form.artist_id, 'the artist ID must be a number'),
+        (form.venue_id, 'the venue ID must be a number'),
+        (form.start_time, 'the start time must look like YYYY-MM-DD HH:MM:SS'),
+        (form.duration_minutes, 'the duration must be between 1 and {} minutes'.format(MAX_SHOW_DURATION_MINUTES))
+    ) if not field.validate(form)]
+    if not invalid:
+        if db.session.get(Artist, form.artist_id.data) is None:
+            invalid.append('there is no artist {}'.format(form.artist_id.data))
+        if db.session.get(Venue, form.venue_id.data) is None:
+            invalid.append('there is no venue {}'.format(form.venue_id.data))
+    if invalid:
+        for message in invalid:
+            flash('Show could not be listed: {}.'.format(message))
+        return render_template('forms/new_show.html', form=form), 400
     # called to create new shows in the db, upon submitting new show listing form
     # DONE: insert form data as a new Show record in the db, instead
     try:
-        newShow = Show(artist_id=form.artist_id.data, venue_id=form.venue_id.data, start_time=form.start_time.data)
-        db.session.add(newShow)
-        db.session.commit()
-        flash('Show was successfully listed!')
+        newShow = Show(artist_id=form.artist_id.data, venue_id=form.venue_id.data,
+                       start_time=form.start_time.data, duration_minutes=form.duration_minutes.data)
+        conflicts = [(show.venue_id == newShow.venue_id, show.start_time, show.end_time) for show in check_booking(
+            newShow.venue_id, newShow.artist_id, newShow.start_time, newShow.duration_minutes)]
+        if conflicts:
+            db.session.rollback()
+        else:
+            db.session.add(newShow)
+            record_show_created(newShow)
+            db.session.commit()
+            invalidate_show(newShow.venue_id, newShow.artist_id)
+            flash('Show was successfully listed!')
     except:
         error = True
         db.session.rollback()
-        print(sys.exc_info())
+        app.logger.exception('Could not create show')
     finally:
         db.session.close()
     if error:
         flash('An error occurred. Show could not be listed.')
         abort(500)
+    if conflicts:
+        for same_venue, start_time, end_time in conflicts:
+            flash('Show could not be listed: the {} is already booked from {:%Y-%m-%d %H:%M} to {:%Y-%m-%d %H:%M}.'.format(
+                'venue' if same_venue else 'artist', start_time, end_time))
+        return render_template('forms/new_show.html', form=form), 409
     return render_template('pages/home.html')
     # DONE: on successful db insert, flash success
     # DONE: on unsuccessful db insert, flash an error instead.
@@ -514,15 +579,40 @@ def create_show_submission():
     # see: http://flask.pocoo.org/docs/1.0/patterns/flashing/
 
 
+@app.route('/internal/cache')
+def cache_stats():
+    return jsonify(page_cache.stats())
+
+
+@app.route('/internal/pool')
+def connection_pool_stats():
+    stats = pool_stats(db.engine)
+    if 'replicas' in app.extensions:
+        stats['replicas'] = app.extensions['replicas'].stats()
+    return jsonify(stats)
+
+
 @app.errorhandler(404)
 def not_found_error(error):
+    if is_api_request():
+        return api_error(error)
     return render_template('errors/404.html'), 404
 
+@app.errorhandler(405)
+def method_not_allowed_error(error):
+    if is_api_request():
+        return api_error(error)
+    return error
+
 @app.errorhandler(500)
 def server_error(error):
     return render_template('errors/500.html'), 500
 
 
+# Application log entries are written as JSON lines, like the SQL log.
+app.logger.removeHandler(default_handler)
+app.logger.addHandler(structured_handler())
+
 if not app.debug:
     file_handler = FileHandler('error.log')
     file_handler.setFormatter(
@@ -0,0 +1,92 @@
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import literal
+
+from counters import record_shows_removed
+from models import db, Show, ShowArchive
+from partitions import drop_empty_partitions, month_start
+
+#----------------------------------------------------------------------------#
+# Show archival.
+#----------------------------------------------------------------------------#
+
+# Shows that started more than SHOW_ARCHIVE_AFTER_DAYS ago are moved from
+# show to show_archive, keeping the tables behind the pages and the API
+# small while the history stays available (e.g. `flask export shows
+# --archived`). Archived shows leave their venue's and artist's past
+# counters, like deleted ones, so the counters keep matching the show
+# table and the detail pages.
+#
+# Shows are moved in batches of SHOW_ARCHIVE_BATCH_SIZE, each in its own
+# transaction: rows locked by a concurrent writer are skipped for the next
+# run rather than waited on. On PostgreSQL the monthly partitions left
+# empty are dropped afterwards.
+#
+# Meant to run daily from cron (`flask archive shows`).
+
+ARCHIVE_COLUMNS = (
+    'id', 'artist_id', 'venue_id', 'start_time', 'duration_minutes', 'version', 'updated_at', 'archived_at'
+)
+
+def archive_batch(cutoff, batch_size, now=None):
+    # Moves up to `batch_size` of the oldest shows that started before
+    # `cutoff`; returns how many. Commits.
+    now = now or datetime.utcnow()
+    ids = [show_id for show_id, in db.session.query(Show.id).filter(
+        Show.start_time < cutoff
+    ).order_by(Show.start_time, Show.id).limit(batch_size).with_for_update(skip_locked=True)]
+    if not ids:
+        db.session.rollback()
+        return 0
+
+    # The start_time bound lets PostgreSQL prune to the archived months.
+    batch = (Show.start_time < cutoff) & Show.id.in_(ids)
+    record_shows_removed(batch)
+    db.session.execute(ShowArchive.__table__.insert().from_select(ARCHIVE_COLUMNS, db.session.query(
+        Show.id, Show.artist_id, Show.venue_id, Show.start_time, Show.duration_minutes, Show.version, Show.updated_at,
+        literal(now)
+    ).filter(batch)))
+    db.session.query(Show).filter(batch).delete(synchronize_session=False)
+    db.session.commit()
+    return len(ids)
+
+def archive_shows(cutoff, batch_size, progress=None):
+    # Returns (shows archived, partitions dropped).
+    archived = 0
+    while True:
+        moved = archive_batch(cutoff, batch_size)
+        if not moved:
+            break
+        archived += moved
+        if progress is not None:
+            progress(archived)
+
+    with db.engine.begin() as connection:
+        dropped = drop_empty_partitions(connection, month_start(cutoff))
+    return archived, dropped
+
+#----------------------------------------------------------------------------#
+# Commands.
+#----------------------------------------------------------------------------#
+
+archive_cli = AppGroup('archive', help='Move old data out of the live tables.')
+
+@archive_cli.command('shows')
+@click.option('--older-than-days', type=int, help='Archive shows that started more than this many days ago. [default: SHOW_ARCHIVE_AFTER_DAYS]')
+@click.option('--batch-size', type=int, help='Shows moved per transaction. [default: SHOW_ARCHIVE_BATCH_SIZE]')
+def archive_shows_command(older_than_days, batch_size):
+    '''Move old shows into show_archive.'''
+    if older_than_days is None:
+        older_than_days = current_app.config['SHOW_ARCHIVE_AFTER_DAYS']
+    cutoff = datetime.now() - timedelta(days=older_than_days)
+    archived, dropped = archive_shows(
+        cutoff, batch_size or current_app.config['SHOW_ARCHIVE_BATCH_SIZE'],
+        lambda archived: click.echo('\rshows: {} archived'.format(archived), nl=False))
+    if archived:
+        click.echo()
+    for name in dropped:
+        click.echo('Dropped {}.'.format(name))
+    click.echo('Archived {} shows that started before {:%Y-%m-%d %H:%M}.'.format(archived, cutoff))
@@ -0,0 +1,140 @@
+from contextlib import asynccontextmanager
+from urllib.parse import parse_qs
+
+from a2wsgi import WSGIMiddleware
+from flask import render_template
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from starlette.applications import Starlette
+from starlette.responses import HTMLResponse
+from starlette.routing import Mount, Route
+
+from app import app as flask_app
+from queries import load_venue_areas, load_venue_detail, load_artists, load_artist_detail, load_shows_page
+from search import find_venues, find_artists
+
+#----------------------------------------------------------------------------#
+# ASGI entry point.
+#----------------------------------------------------------------------------#
+
+# Serves the read-heavy pages (listings, detail pages and searches) on an
+# async SQLAlchemy engine, so one process keeps many requests in flight
+# while they wait on PostgreSQL; everything else is passed through to the
+# Flask app unchanged:
+#
+#     uvicorn asgi:app --workers 4
+#
+# Pages are built by the same loaders as the Flask views, run on the sync
+# side of an AsyncSession with run_sync, and rendered with the Flask
+# templates. Every page is a single loader call, so `run` awaits one
+# query at a time per request; the concurrency is across requests. The
+# conditional GET, page cache, replica routing and SQL instrumentation of
+# the Flask views do not apply to the pages served here.
+
+ASYNC_DRIVERS = {
+    'postgresql': 'postgresql+asyncpg',
+    'sqlite': 'sqlite+aiosqlite'
+}
+
+def async_database_uri(config):
+    if config.get('ASYNC_DATABASE_URI'):
+        return config['ASYNC_DATABASE_URI']
+    url = make_url(config['SQLALCHEMY_DATABASE_URI'])
+    return url.set(drivername=ASYNC_DRIVERS[url.get_backend_name()])
+
+def _engine_options(config):
+    # The sync pool class cannot serve an async engine; sizes still apply.
+    options = dict(config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    options.pop('poolclass', None)
+    return options
+
+engine = create_async_engine(async_database_uri(flask_app.config), **_engine_options(flask_app.config))
+Session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+async def run(loader, *args, **kwargs):
+    async with Session() as session:
+        return await session.run_sync(lambda sync_session: loader(*args, session=sync_session, **kwargs))
+
+def render(request, template, status_code=200, **context):
+    # Renders a Flask template in a request context built from this
+    # request, so url_for, flashed messages and the filters work as usual.
+    with flask_app.test_request_context(
+            request.url.path, query_string=request.url.query, headers=list(request.headers.items())):
+        body = render_template(template, **context)
+    return HTMLResponse(body, status_code=status_code)
+
+def not_found(request):
+    return render(request, 'errors/404.html', status_code=404)
+
+async def search_term(request):
+    form = parse_qs((await request.body()).decode())
+    return form.get('search_term', [''])[0]
+
+#----------------------------------------------------------------------------#
+# Pages.
+#----------------------------------------------------------------------------#
+
+async def venues(request):
+    return render(request, 'pages/venues.html', areas=await run(load_venue_areas))
+
+async def show_venue(request):
+    venue = await run(load_venue_detail, request.path_params['venue_id'])
+    if venue is None:
+        return not_found(request)
+    return render(request, 'pages/show_venue.html', venue=venue)
+
+async def artists(request):
+    return render(request, 'pages/artists.html', artists=await run(load_artists))
+
+async def show_artist(request):
+    artist = await run(load_artist_detail, request.path_params['artist_id'])
+    if artist is None:
+        return not_found(request)
+    return render(request, 'pages/show_artist.html', artist=artist)
+
+async def shows(request):
+    try:
+        page = await run(load_shows_page,
+                         after=request.query_params.get('after'),
+                         before=request.query_params.get('before'),
+                         per_page=flask_app.config['SHOWS_PER_PAGE'])
+    except ValueError:
+        return HTMLResponse('Bad Request', status_code=400)
+    return render(request, 'pages/shows.html', shows=page['shows'],
+                  prev_cursor=page['prev_cursor'], next_cursor=page['next_cursor'])
+
+def _search_page(find, template):
+    async def search(request):
+        term = await search_term(request)
+        rows = await run(find, term, limit=flask_app.config['SEARCH_RESULT_LIMIT'])
+        results = {
+            'count': len(rows),
+            'data': [{
+                'id': row.id,
+                'name': row.name,
+                'num_upcoming_shows': row.upcoming_shows_count
+            } for row in rows]
+        }
+        return render(request, template, results=results, search_term=term)
+    return search
+
+@asynccontextmanager
+async def lifespan(app):
+    yield
+    await engine.dispose()
+
+app = Starlette(
+    routes=[
+        Route('/venues', venues),
+        Route('/venues/{venue_id:int}', show_venue),
+        Route('/venues/search', _search_page(find_venues, 'pages/search_venues.html'), methods=['POST']),
+        Route('/artists', artists),
+        Route('/artists/{artist_id:int}', show_artist),
+        Route('/artists/search', _search_page(find_artists, 'pages/search_artists.html'), methods=['POST']),
+        Route('/shows', shows),
+        # Every other route, and other methods on the routes above.
+        Mount('/', WSGIMiddleware(flask_app)),
+    ],
+    lifespan=lifespan
+)
@@ -0,0 +1,75 @@
+'''Compares payload size and latency of the HTML pages and the JSON API.
+
+Every pair of equivalent routes is requested through the Flask test client
+against the configured database; the API routes are also timed when
+revalidated with If-None-Match, which should answer 304 with no body:
+
+    python -m benchmarks.api_vs_html --requests 200
+'''
+import argparse
+import statistics
+import time
+
+from app import app
+from models import db, Venue, Artist
+
+
+def pairs(venue_id, artist_id, search_term):
+    # (label, HTML request, API request); a request is (method, path, form data).
+    return [
+        ('venue listing', ('GET', '/venues', None), ('GET', '/api/v1/venues', None)),
+        ('artist listing', ('GET', '/artists', None), ('GET', '/api/v1/artists', None)),
+        ('show feed', ('GET', '/shows', None), ('GET', '/api/v1/shows', None)),
+        ('venue detail', ('GET', '/venues/{}'.format(venue_id), None), ('GET', '/api/v1/venues/{}'.format(venue_id), None)),
+        ('artist detail', ('GET', '/artists/{}'.format(artist_id), None), ('GET', '/api/v1/artists/{}'.format(artist_id), None)),
+        ('venue search', ('POST', '/venues/search', {'search_term': search_term}),
+            ('GET', '/api/v1/search/venues?q={}'.format(search_term), None)),
+    ]
+
+
+def measure(client, request, count, headers=None):
+    method, path, data = request
+    timings = []
+    for _ in range(count):
+        started = time.perf_counter()
+        response = client.open(path, method=method, data=data, headers=headers)
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return {
+        'status': response.status_code,
+        'bytes': len(response.get_data()),
+        'etag': response.headers.get('ETag'),
+        'p50': statistics.median(timings),
+        'p95': timings[int(len(timings) * 0.95) - 1] if len(timings) >= 20 else timings[-1],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=100, help='requests per route')
+    parser.add_argument('--search-term', default='a')
+    args = parser.parse_args()
+
+    with app.app_context():
+        venue = db.session.query(Venue.id).order_by(Venue.id).first()
+        artist = db.session.query(Artist.id).order_by(Artist.id).first()
+        if venue is None or artist is None:
+            parser.error('the database needs at least one venue and one artist')
+        db.session.remove()
+
+    client = app.test_client()
+    row = '{:<15} {:<10} {:>6} {:>10} {:>10} {:>10}'
+    print(row.format('route', 'variant', 'status', 'bytes', 'p50 ms', 'p95 ms'))
+    for label, html, api in pairs(venue.id, artist.id, args.search_term):
+        results = [('html', measure(client, html, args.requests))]
+        results.append(('api', measure(client, api, args.requests)))
+        etag = results[-1][1]['etag']
+        if etag:
+            results.append(('api 304', measure(client, api, args.requests, headers={'If-None-Match': etag})))
+        for variant, result in results:
+            print(row.format(label, variant, result['status'], result['bytes'],
+                '{:.2f}'.format(result['p50']), '{:.2f}'.format(result['p95'])))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,190 @@
+'''Fills the database with a reproducible synthetic catalogue.
+
+Venues, artists and shows are generated from a seed at one of the preset
+scales (or explicit row counts) and written in batches, with COPY on
+PostgreSQL. The stored show counters are filled in as the shows are
+written. Point DATABASE_URL at the target database:
+
+    DATABASE_URL=sqlite:///bench.db python -m benchmarks.dataset --scale small --create
+    python -m benchmarks.dataset --scale medium --reset --seed 7
+'''
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from app import app
+from genres import DEFAULT_GENRES
+from geo import geocode
+from importer import ARTIST_COLUMNS, VENUE_COLUMNS, batches, write_entities, write_shows
+from models import db, Venue, Artist, Show, ShowArchive, Genre, venue_genre, artist_genre, DEFAULT_SHOW_DURATION_MINUTES
+from partitions import ensure_show_partitions
+from summaries import refresh_area_summary
+
+# (venues, artists, shows)
+SCALES = {
+    'tiny': (100, 200, 2000),
+    'small': (1000, 2000, 20000),
+    'medium': (10000, 20000, 400000),
+    'large': (100000, 200000, 4000000),
+}
+
+CITIES = [
+    ('San Francisco', 'CA'), ('Los Angeles', 'CA'), ('Oakland', 'CA'), ('Seattle', 'WA'),
+    ('Portland', 'OR'), ('Austin', 'TX'), ('Houston', 'TX'), ('Chicago', 'IL'),
+    ('New York', 'NY'), ('Brooklyn', 'NY'), ('Boston', 'MA'), ('Nashville', 'TN'),
+    ('Memphis', 'TN'), ('New Orleans', 'LA'), ('Atlanta', 'GA'), ('Miami', 'FL'),
+    ('Denver', 'CO'), ('Minneapolis', 'MN'), ('Detroit', 'MI'), ('Philadelphia', 'PA'),
+]
+
+GENRES = list(DEFAULT_GENRES)
+
+ADJECTIVES = [
+    'Musical', 'Dueling', 'Blue', 'Golden', 'Electric', 'Velvet', 'Rusty', 'Silver',
+    'Midnight', 'Crimson', 'Hollow', 'Wild', 'Lucky', 'Broken', 'Gentle', 'Neon',
+]
+
+NOUNS = [
+    'Hop', 'Pianos', 'Room', 'Lounge', 'Hall', 'Cellar', 'Garden', 'Barn',
+    'Tavern', 'Theatre', 'Club', 'Stage', 'Attic', 'Dock', 'Factory', 'Parlor',
+]
+
+FIRST_NAMES = [
+    'Matt', 'Ana', 'Guns', 'Lily', 'Omar', 'June', 'Theo', 'Rosa',
+    'Kai', 'Nina', 'Ezra', 'Mae', 'Otis', 'Iris', 'Leon', 'Vera',
+]
+
+LAST_NAMES = [
+    'Quevado', 'Petals', 'Park', 'Stone', 'Rivers', 'Hart', 'Vale', 'Moreno',
+    'Bishop', 'Reyes', 'Frost', 'Lane', 'Ocampo', 'Sato', 'Wilde', 'Brooks',
+]
+
+
+def _contact(rng, kind, index):
+    return {
+        'phone': '{:03d}-{:03d}-{:04d}'.format(rng.randint(200, 999), rng.randint(100, 999), rng.randint(0, 9999)),
+        'genres': rng.sample(GENRES, rng.randint(1, 3)),
+        'facebook_link': 'https://www.facebook.com/{}{}'.format(kind, index),
+        'image_link': 'https://images.example.com/{}/{}.jpg'.format(kind, index),
+        'website_link': 'https://{}{}.example.com'.format(kind, index),
+        'seeking_description': 'Looking for new collaborators.' if rng.random() < 0.3 else None,
+    }
+
+
+def venues(rng, count):
+    for index in range(1, count + 1):
+        city, state = rng.choice(CITIES)
+        row = {
+            'external_id': 'venue-{}'.format(index),
+            'name': 'The {} {} {}'.format(rng.choice(ADJECTIVES), rng.choice(NOUNS), index),
+            'city': city,
+            'state': state,
+            'address': '{} {} St'.format(rng.randint(1, 9999), rng.choice(LAST_NAMES)),
+            'seeking_talent': rng.random() < 0.3,
+        }
+        # Spread the venues around the city centre (about 10 km).
+        point = geocode(city, state)
+        if point is not None:
+            row['latitude'] = point[0] + rng.uniform(-0.1, 0.1)
+            row['longitude'] = point[1] + rng.uniform(-0.1, 0.1)
+        row.update(_contact(rng, 'venue', index))
+        yield row
+
+
+def artists(rng, count):
+    for index in range(1, count + 1):
+        city, state = rng.choice(CITIES)
+        row = {
+            'external_id': 'artist-{}'.format(index),
+            'name': '{} {} {}'.format(rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES), index),
+            'city': city,
+            'state': state,
+            'seeking_venue': rng.random() < 0.3,
+        }
+        row.update(_contact(rng, 'artist', index))
+        yield row
+
+
+def _skewed_index(rng, count):
+    # One draw in five comes from a Pareto distribution over the first ids,
+    # so a few rows get far more shows than the rest.
+    if rng.random() < 0.2:
+        return min(int(rng.paretovariate(1.2)) - 1, count - 1)
+    return rng.randrange(count)
+
+
+def shows(rng, count, venue_ids, artist_ids, anchor, now):
+    # Start times fall on the hour within a year either side of `anchor`.
+    for _ in range(count):
+        start_time = anchor + timedelta(hours=rng.randint(-365 * 24, 365 * 24))
+        yield {
+            'venue_id': venue_ids[_skewed_index(rng, len(venue_ids))],
+            'artist_id': artist_ids[rng.randrange(len(artist_ids))],
+            'start_time': start_time,
+            'duration_minutes': DEFAULT_SHOW_DURATION_MINUTES,
+            'is_upcoming': start_time > now,
+        }
+
+
+def _load(label, write, rows, batch_size):
+    started = time.perf_counter()
+    written = 0
+    for batch in batches(rows, batch_size):
+        write(batch)
+        db.session.commit()
+        written += len(batch)
+    elapsed = time.perf_counter() - started
+    print('{}: {} rows in {:.1f}s'.format(label, written, elapsed))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', choices=sorted(SCALES, key=lambda name: SCALES[name]), default='small')
+    parser.add_argument('--venues', type=int, help='override the number of venues of the scale')
+    parser.add_argument('--artists', type=int, help='override the number of artists of the scale')
+    parser.add_argument('--shows', type=int, help='override the number of shows of the scale')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--anchor', type=datetime.fromisoformat,
+                        help='centre of the generated show times (default: today at midnight)')
+    parser.add_argument('--batch-size', type=int, default=10000)
+    parser.add_argument('--create', action='store_true', help='create the tables first (for a fresh SQLite file)')
+    parser.add_argument('--reset', action='store_true', help='delete all venues, artists and shows first')
+    args = parser.parse_args()
+
+    venue_count, artist_count, show_count = SCALES[args.scale]
+    venue_count = args.venues or venue_count
+    artist_count = args.artists or artist_count
+    show_count = args.shows if args.shows is not None else show_count
+    now = datetime.now()
+    anchor = args.anchor or now.replace(hour=0, minute=0, second=0, microsecond=0)
+    rng = random.Random(args.seed)
+
+    with app.app_context():
+        if args.create:
+            db.create_all()
+        if args.reset:
+            for table in (Show.__table__, ShowArchive.__table__, venue_genre, artist_genre,
+                          Venue.__table__, Artist.__table__):
+                db.session.execute(table.delete())
+            db.session.query(Genre).update({Genre.venue_count: 0, Genre.artist_count: 0})
+            db.session.commit()
+
+        _load('venues', lambda rows: write_entities(Venue, VENUE_COLUMNS, rows),
+              venues(rng, venue_count), args.batch_size)
+        _load('artists', lambda rows: write_entities(Artist, ARTIST_COLUMNS, rows),
+              artists(rng, artist_count), args.batch_size)
+
+        # Ids of the rows just written, in generation order.
+        venue_ids = [row.id for row in db.session.query(Venue.id).filter(
+            Venue.external_id.like('venue-%')).order_by(Venue.id)]
+        artist_ids = [row.id for row in db.session.query(Artist.id).filter(
+            Artist.external_id.like('artist-%')).order_by(Artist.id)]
+        _load('shows', write_shows, shows(rng, show_count, venue_ids, artist_ids, anchor, now), args.batch_size)
+
+        with db.engine.begin() as connection:
+            ensure_show_partitions(connection)
+            refresh_area_summary(connection)
+
+
+if __name__ == '__main__':
+    main()
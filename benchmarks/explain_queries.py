@@ -0,0 +1,85 @@
+'''Prints the EXPLAIN plan of every statement each route issues.
+
+Each route is requested through the Flask test client while the statements
+it sends to the database are recorded, then every recorded statement is
+explained with the parameters it actually ran with. Save the output before
+and after `flask db upgrade` and diff the two to see an index take effect:
+
+    python -m benchmarks.explain_queries > before.txt
+    flask db upgrade
+    python -m benchmarks.explain_queries > after.txt
+    diff before.txt after.txt
+'''
+import argparse
+
+from sqlalchemy import event
+
+from app import app
+from models import db, Venue, Artist
+
+
+def routes(venue_id, artist_id, search_term):
+    return [
+        ('GET', '/venues', None),
+        ('GET', '/artists', None),
+        ('GET', '/shows', None),
+        ('GET', '/venues/{}'.format(venue_id), None),
+        ('GET', '/artists/{}'.format(artist_id), None),
+        ('POST', '/venues/search', {'search_term': search_term}),
+        ('POST', '/artists/search', {'search_term': search_term}),
+    ]
+
+
+def record_statements(client, method, path, data):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        response = client.open(path, method=method, data=data)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+    return response.status_code, statements
+
+
+def explain(statement, parameters, analyze):
+    connection = db.engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute('EXPLAIN {}{}'.format('ANALYZE ' if analyze else '', statement), parameters)
+        return [row[0] for row in cursor.fetchall()]
+    finally:
+        connection.rollback()
+        connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--analyze', action='store_true', help='run EXPLAIN ANALYZE instead of EXPLAIN')
+    parser.add_argument('--search-term', default='a', help='term posted to the search routes')
+    args = parser.parse_args()
+
+    with app.app_context():
+        venue = db.session.query(Venue.id).order_by(Venue.id).first()
+        artist = db.session.query(Artist.id).order_by(Artist.id).first()
+        if venue is None or artist is None:
+            parser.error('the database needs at least one venue and one artist')
+        db.session.remove()
+
+        client = app.test_client()
+        for method, path, data in routes(venue.id, artist.id, args.search_term):
+            status, statements = record_statements(client, method, path, data)
+            print('=' * 78)
+            print('{} {} -> {} ({} statements)'.format(method, path, status, len(statements)))
+            for statement, parameters in statements:
+                print('-' * 78)
+                print(statement.strip())
+                print()
+                for line in explain(statement, parameters, args.analyze):
+                    print('  ' + line)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,184 @@
+'''Compares the WSGI and ASGI serving modes under concurrent load.
+
+Starts each server as a single process on the configured database: the
+Flask app on the threaded development server (what app.run uses) and the
+ASGI entry point on uvicorn. It then drives the listing, detail and
+search pages at each concurrency level for a fixed duration. Throughput,
+latency percentiles, errors and the peak resident memory of the server
+are printed and optionally saved as JSON:
+
+    python -m benchmarks.load_test --concurrency 1,16,64 --duration 10
+    python -m benchmarks.load_test --modes asgi --output asgi.json
+'''
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from urllib.parse import urlencode
+
+HOST = '127.0.0.1'
+
+SERVERS = {
+    'wsgi': lambda port: [sys.executable, '-m', 'benchmarks.load_test', '--serve-wsgi', str(port)],
+    'asgi': lambda port: [sys.executable, '-m', 'uvicorn', 'asgi:app', '--host', HOST,
+                          '--port', str(port), '--log-level', 'warning'],
+}
+
+
+def serve_wsgi(port):
+    from werkzeug.serving import run_simple
+    from app import app
+    run_simple(HOST, port, app, threaded=True)
+
+
+def request_mix():
+    # (method, path, form data) for the read-heavy pages, with ids of the
+    # venue and artist that have the most upcoming shows.
+    from app import app
+    from models import db, Venue, Artist
+    with app.app_context():
+        venue = db.session.query(Venue.id).order_by(Venue.upcoming_shows_count.desc(), Venue.id).first()
+        artist = db.session.query(Artist.id).order_by(Artist.upcoming_shows_count.desc(), Artist.id).first()
+        if venue is None or artist is None:
+            raise SystemExit('the database is empty; fill it with python -m benchmarks.dataset')
+    return [
+        ('GET', '/venues', None),
+        ('GET', '/venues/{}'.format(venue.id), None),
+        ('GET', '/artists', None),
+        ('GET', '/artists/{}'.format(artist.id), None),
+        ('GET', '/shows', None),
+        ('POST', '/venues/search', {'search_term': 'Hop'}),
+        ('POST', '/artists/search', {'search_term': 'a'}),
+    ]
+
+
+async def fetch(port, method, path, data):
+    # One request on its own connection; returns the status code.
+    reader, writer = await asyncio.open_connection(HOST, port)
+    body = urlencode(data).encode() if data else b''
+    head = '{} {} HTTP/1.1\r\nHost: {}\r\nConnection: close\r\n'.format(method, path, HOST)
+    if body:
+        head += 'Content-Type: application/x-www-form-urlencoded\r\nContent-Length: {}\r\n'.format(len(body))
+    writer.write(head.encode() + b'\r\n' + body)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    return int(response.split(b' ', 2)[1])
+
+
+def rss_mb(pid):
+    try:
+        with open('/proc/{}/status'.format(pid)) as status:
+            for line in status:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        return None
+
+
+async def load(port, pid, mix, concurrency, duration):
+    timings, errors = [], 0
+    peak_rss = rss_mb(pid)
+    deadline = time.perf_counter() + duration
+
+    async def client(offset):
+        nonlocal errors
+        turn = offset
+        while time.perf_counter() < deadline:
+            method, path, data = mix[turn % len(mix)]
+            turn += 1
+            started = time.perf_counter()
+            try:
+                status = await fetch(port, method, path, data)
+            except OSError:
+                status = None
+            if status == 200:
+                timings.append((time.perf_counter() - started) * 1000)
+            else:
+                errors += 1
+
+    async def sample_memory():
+        nonlocal peak_rss
+        while time.perf_counter() < deadline:
+            peak_rss = max(filter(None, (peak_rss, rss_mb(pid))), default=None)
+            await asyncio.sleep(0.25)
+
+    started = time.perf_counter()
+    await asyncio.gather(sample_memory(), *(client(offset) for offset in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    timings.sort()
+    def percentile(fraction):
+        return timings[min(int(len(timings) * fraction), len(timings) - 1)] if timings else None
+    return {
+        'concurrency': concurrency,
+        'requests': len(timings),
+        'errors': errors,
+        'requests_per_second': len(timings) / elapsed,
+        'p50_ms': percentile(0.50),
+        'p95_ms': percentile(0.95),
+        'p99_ms': percentile(0.99),
+        'peak_rss_mb': peak_rss,
+    }
+
+
+def wait_for_port(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection((HOST, port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise SystemExit('the server did not start on port {}'.format(port))
+
+
+def run_mode(mode, port, mix, levels, duration, warmup):
+    server = subprocess.Popen(SERVERS[mode](port), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                              cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    try:
+        wait_for_port(port)
+        asyncio.run(load(port, server.pid, mix, max(levels), warmup))
+        return [asyncio.run(load(port, server.pid, mix, level, duration)) for level in levels]
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--modes', default='wsgi,asgi', help='comma-separated: wsgi, asgi')
+    parser.add_argument('--concurrency', default='1,8,32,64', help='comma-separated concurrency levels')
+    parser.add_argument('--duration', type=float, default=10, help='seconds per concurrency level')
+    parser.add_argument('--warmup', type=float, default=2, help='seconds of untimed load first')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--serve-wsgi', type=int, metavar='PORT', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve_wsgi:
+        return serve_wsgi(args.serve_wsgi)
+
+    mix = request_mix()
+    levels = [int(level) for level in args.concurrency.split(',')]
+    results = {}
+    print('{:<6} {:>11} {:>9} {:>7} {:>8} {:>8} {:>8} {:>8}'.format(
+        'mode', 'concurrency', 'req/s', 'errors', 'p50 ms', 'p95 ms', 'p99 ms', 'RSS MB'))
+    for mode in args.modes.split(','):
+        results[mode] = run_mode(mode, args.port, mix, levels, args.duration, args.warmup)
+        for result in results[mode]:
+            print('{:<6} {:>11} {:>9.1f} {:>7} {:>8.1f} {:>8.1f} {:>8.1f} {:>8.1f}'.format(
+                mode, result['concurrency'], result['requests_per_second'], result['errors'],
+                result['p50_ms'] or 0, result['p95_ms'] or 0, result['p99_ms'] or 0, result['peak_rss_mb'] or 0))
+
+    if args.output:
+        with open(args.output, 'w') as handle:
+            json.dump(results, handle, indent=2)
+
+
+if __name__ == '__main__':
+    main()
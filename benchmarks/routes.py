@@ -0,0 +1,183 @@
+'''Benchmarks every read route of the app through the Flask test client.
+
+Each GET route registered on the app is requested --requests times, with
+path arguments and query strings (QUERIES) taken from rows of the
+configured database, and so are the search forms. Routes that write are left out. Latency percentiles, query
+counts and response sizes are printed and saved as JSON so that runs can
+be compared:
+
+    python -m benchmarks.dataset --scale small --reset
+    python -m benchmarks.routes --requests 200 --output before.json
+    python -m benchmarks.routes --requests 200 --output after.json --compare before.json
+'''
+import argparse
+import json
+import logging
+import platform
+import statistics
+import subprocess
+import time
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app import app
+from models import db, Venue, Artist, Show, Genre
+
+# Endpoints that are not pages of the app, or that stream whole tables.
+SKIPPED_ENDPOINTS = {'static', 'export.export_shows'}
+
+SEARCHES = [
+    ('/venues/search', 'Hop'),
+    ('/venues/search', 'San Francisco, CA'),
+    ('/artists/search', 'a'),
+]
+
+# Query strings of the GET routes that need one, by endpoint, formatted
+# with the sample.
+QUERIES = {
+    'api.search_venues': 'q=Hop',
+    'api.search_artists': 'q=a',
+    'api.calendar': 'from={calendar_from}&to={calendar_to}',
+    'api.venues_near': 'lat={latitude}&lon={longitude}&radius_km=25',
+}
+
+
+class QueryCounter(object):
+
+    def __init__(self):
+        self.count = 0
+        event.listen(Engine, 'before_cursor_execute', self._count)
+
+    def _count(self, *args):
+        self.count += 1
+
+
+def requests_to_time(sample):
+    # (label, method, path, form data) for every GET route and search.
+    requests = []
+    for rule in sorted(app.url_map.iter_rules(), key=lambda rule: rule.rule):
+        if rule.endpoint in SKIPPED_ENDPOINTS or 'GET' not in rule.methods:
+            continue
+        if not set(rule.arguments) <= set(sample):
+            print('skipping {}: no sample for {}'.format(rule.rule, ', '.join(sorted(rule.arguments))))
+            continue
+        path = app.url_map.bind('localhost').build(rule.endpoint, {name: sample[name] for name in rule.arguments})
+        if rule.endpoint in QUERIES:
+            try:
+                path += '?' + QUERIES[rule.endpoint].format(**sample)
+            except KeyError as error:
+                print('skipping {}: no sample for {}'.format(rule.rule, error.args[0]))
+                continue
+        requests.append(('GET ' + rule.rule, 'GET', path, None))
+    for path, term in SEARCHES:
+        requests.append(('POST {} {!r}'.format(path, term), 'POST', path, {'search_term': term}))
+    return requests
+
+
+def percentile(ordered, fraction):
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+def measure(client, counter, method, path, data, count, warmup):
+    for _ in range(warmup):
+        client.open(path, method=method, data=data)
+
+    timings = []
+    queries = []
+    for _ in range(count):
+        counter.count = 0
+        started = time.perf_counter()
+        response = client.open(path, method=method, data=data)
+        timings.append((time.perf_counter() - started) * 1000)
+        queries.append(counter.count)
+    timings.sort()
+    return {
+        'path': path,
+        'status': response.status_code,
+        'bytes': len(response.get_data()),
+        'queries': max(queries),
+        'mean_ms': statistics.mean(timings),
+        'p50_ms': percentile(timings, 0.50),
+        'p90_ms': percentile(timings, 0.90),
+        'p99_ms': percentile(timings, 0.99),
+        'max_ms': timings[-1],
+    }
+
+
+def environment():
+    try:
+        commit = subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'time': datetime.now().isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'database': db.engine.dialect.name,
+        'venues': db.session.query(Venue).count(),
+        'artists': db.session.query(Artist).count(),
+        'shows': db.session.query(Show).count(),
+    }
+
+
+def print_results(results, baseline=None):
+    baseline = (baseline or {}).get('routes', {})
+    print('{:<48} {:>6} {:>8} {:>8} {:>8} {:>8}'.format('route', 'status', 'queries', 'p50 ms', 'p90 ms', 'p99 ms'))
+    for label, result in results['routes'].items():
+        line = '{:<48} {:>6} {:>8} {:>8.2f} {:>8.2f} {:>8.2f}'.format(
+            label[:48], result['status'], result['queries'],
+            result['p50_ms'], result['p90_ms'], result['p99_ms'])
+        before = baseline.get(label)
+        if before:
+            line += '  p50 {:+.0%}, queries {:+d}'.format(
+                result['p50_ms'] / before['p50_ms'] - 1, result['queries'] - before['queries'])
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=100, help='timed requests per route')
+    parser.add_argument('--warmup', type=int, default=5, help='untimed requests per route')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--compare', help='JSON file of an earlier run to compare with')
+    args = parser.parse_args()
+
+    with app.app_context():
+        venue = db.session.query(Venue.id, Venue.latitude, Venue.longitude).order_by(Venue.upcoming_shows_count.desc(), Venue.id).first()
+        artist = db.session.query(Artist.id).order_by(Artist.upcoming_shows_count.desc(), Artist.id).first()
+        show = db.session.query(Show.id).order_by(Show.id).first()
+        genre = db.session.query(Genre.name).order_by(Genre.venue_count.desc(), Genre.name).first()
+        if venue is None or artist is None or show is None or genre is None:
+            parser.error('the database is empty; fill it with python -m benchmarks.dataset')
+        sample = {'venue_id': venue.id, 'artist_id': artist.id, 'show_id': show.id, 'name': genre.name}
+        # A month of shows from today, within CALENDAR_MAX_DAYS.
+        today = date.today()
+        sample.update(calendar_from=today.isoformat(), calendar_to=(today + timedelta(days=30)).isoformat())
+        # Venues around the sample venue, if it has been located.
+        if venue.latitude is not None:
+            sample.update(latitude=venue.latitude, longitude=venue.longitude)
+        results = {'environment': environment(), 'routes': {}}
+        db.session.remove()
+
+    # Keep the repeated-statement warnings but not a log line per request.
+    logging.getLogger('fyyur.sql').setLevel(logging.WARNING)
+    client = app.test_client()
+    counter = QueryCounter()
+    for label, method, path, data in requests_to_time(sample):
+        results['routes'][label] = measure(client, counter, method, path, data, args.requests, args.warmup)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as handle:
+            baseline = json.load(handle)
+    print_results(results, baseline)
+
+    if args.output:
+        with open(args.output, 'w') as handle:
+            json.dump(results, handle, indent=2)
+
+
+if __name__ == '__main__':
+    main()
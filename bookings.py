@@ -0,0 +1,59 @@
+from datetime import timedelta
+
+from sqlalchemy import text
+
+from models import db, Show, MAX_SHOW_DURATION_MINUTES
+
+#----------------------------------------------------------------------------#
+# Show bookings.
+#----------------------------------------------------------------------------#
+
+# A venue hosts one show at a time and an artist plays one show at a time:
+# a new show may not overlap [start_time, start_time + duration) of another
+# show at the same venue or by the same artist.
+#
+# Durations are capped at MAX_SHOW_DURATION_MINUTES (a check constraint), so
+# only shows starting less than that before the new one ends can overlap
+# it. Candidates are therefore read with two bounded range scans, on
+# (venue_id, start_time) and (artist_id, start_time), whatever the size of
+# the table, and compared in Python.
+#
+# PostgreSQL cannot put an exclusion constraint on the partitioned show
+# table, so on PostgreSQL a booking first takes transaction-level advisory
+# locks on its venue and its artist: concurrent bookings of either are
+# checked one after the other, and the first to commit wins. Elsewhere the
+# database serializes writers itself.
+
+# Advisory lock classes; the second key is the venue or artist id. Venues
+# are always locked before artists, so bookings cannot deadlock.
+VENUE_LOCK = 1
+ARTIST_LOCK = 2
+
+def lock_bookings(venue_id, artist_id):
+    # Held until the end of the current transaction.
+    if db.engine.dialect.name != 'postgresql':
+        return
+    for lock, key in ((VENUE_LOCK, venue_id), (ARTIST_LOCK, artist_id)):
+        db.session.execute(text("SELECT pg_advisory_xact_lock(:lock, :key)"), {'lock': lock, 'key': key})
+
+def find_conflicts(venue_id, artist_id, start_time, duration_minutes, exclude_id=None):
+    # The shows at the venue or by the artist overlapping the given slot,
+    # ordered by start_time.
+    end_time = start_time + timedelta(minutes=duration_minutes)
+    earliest = start_time - timedelta(minutes=MAX_SHOW_DURATION_MINUTES)
+
+    def candidates(column, value):
+        query = db.session.query(Show).filter(
+            column == value, Show.start_time > earliest, Show.start_time < end_time)
+        if exclude_id is not None:
+            query = query.filter(Show.id != exclude_id)
+        return query
+
+    shows = candidates(Show.venue_id, venue_id).union(candidates(Show.artist_id, artist_id))
+    return [show for show in shows.order_by(Show.start_time) if show.end_time > start_time]
+
+def check_booking(venue_id, artist_id, start_time, duration_minutes):
+    # Call in the transaction that inserts the show, before inserting it;
+    # returns the conflicting shows, empty if the slot is free.
+    lock_bookings(venue_id, artist_id)
+    return find_conflicts(venue_id, artist_id, start_time, duration_minutes)
@@ -0,0 +1,221 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import timezone
+from functools import wraps
+
+from flask import Response, g, make_response, request, session
+
+#----------------------------------------------------------------------------#
+# Backends.
+#----------------------------------------------------------------------------#
+
+# A backend stores opaque values under string keys with a TTL, plus integer
+# counters used as tag versions. A counter must never go back to a version
+# that pages were cached under, or an invalidation would be lost.
+
+class LRUBackend(object):
+    # Bounded in-process cache. Each worker process has its own copy, so an
+    # invalidation only reaches the process that performed the write; the
+    # others catch up when their entries expire.
+    #
+    # Counters are bounded by max_entries too, least recently used first. A
+    # missing counter reads as the highest version evicted so far: never
+    # lower than the evicted counter's own, so its pages cached under older
+    # versions stay unreachable (and at worst its current pages miss).
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._counters = OrderedDict()
+        self._evicted_version = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_counters(self, keys):
+        with self._lock:
+            versions = []
+            for key in keys:
+                if key in self._counters:
+                    self._counters.move_to_end(key)
+                versions.append(self._counters.get(key, self._evicted_version))
+            return versions
+
+    def incr(self, key):
+        with self._lock:
+            self._counters[key] = self._counters.get(key, self._evicted_version) + 1
+            self._counters.move_to_end(key)
+            while len(self._counters) > self.max_entries:
+                _, version = self._counters.popitem(last=False)
+                self._evicted_version = max(self._evicted_version, version)
+            return self._counters[key]
+
+
+class RedisBackend(object):
+    # Shared cache for multi-process deployments. Any client with the
+    # redis-py interface (get, set(ex=), mget, incr) can be plugged in.
+
+    def __init__(self, client, prefix='fyyur:'):
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key):
+        return self.client.get(self.prefix + key)
+
+    def set(self, key, value, ttl):
+        self.client.set(self.prefix + key, value, ex=ttl)
+
+    def get_counters(self, keys):
+        if not keys:
+            return []
+        values = self.client.mget([self.prefix + key for key in keys])
+        return [int(value or 0) for value in values]
+
+    def incr(self, key):
+        return self.client.incr(self.prefix + key)
+
+#----------------------------------------------------------------------------#
+# Page cache.
+#----------------------------------------------------------------------------#
+
+class PageCache(object):
+    # Caches rendered GET responses keyed by URL. Every page is tagged with
+    # the entities it renders (e.g. 'venues', 'venue:3'); invalidating a tag
+    # bumps its version, which changes the key of every page carrying it so
+    # stale entries are never served again and simply age out.
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self.backend = None
+        self.ttl = 60
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._stats_lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app, backend=None):
+        self.enabled = app.config.get('PAGE_CACHE_ENABLED', False)
+        self.ttl = app.config.get('PAGE_CACHE_TTL', 60)
+        if backend is None:
+            if app.config.get('PAGE_CACHE_BACKEND', 'lru') == 'redis':
+                import redis
+                backend = RedisBackend(redis.Redis.from_url(app.config['PAGE_CACHE_REDIS_URL']))
+            else:
+                backend = LRUBackend(app.config.get('PAGE_CACHE_MAX_ENTRIES', 1024))
+        self.backend = backend
+
+    def _count(self, name):
+        with self._stats_lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def _key(self, tags):
+        # Under conditional() the key also carries the page's ETag, so a body
+        # is only served under the validator it was rendered for, even where
+        # another process made the change and the tags were never bumped here.
+        versions = self.backend.get_counters(['tag:' + tag for tag in tags])
+        return 'page:{}:{}:{}'.format(
+            request.full_path,
+            ','.join('{}={}'.format(tag, version) for tag, version in zip(tags, versions)),
+            g.get('page_etag', ''))
+
+    def cached(self, tags):
+        # `tags` is called with the view arguments and returns the list of
+        # tags the page depends on.
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                # Pages carrying flashed messages are personal; render them.
+                if not self.enabled or request.method != 'GET' or '_flashes' in session:
+                    return view(*args, **kwargs)
+
+                key = self._key(tags(*args, **kwargs))
+                body = self.backend.get(key)
+                if body is not None:
+                    self._count('hits')
+                    return Response(body, mimetype='text/html')
+
+                self._count('misses')
+                response = view(*args, **kwargs)
+                if not isinstance(response, Response):
+                    response = Response(response, mimetype='text/html')
+                if response.status_code == 200:
+                    self.backend.set(key, response.get_data(), self.ttl)
+                return response
+            return wrapper
+        return decorator
+
+    def invalidate(self, *tags):
+        if not self.enabled:
+            return
+        for tag in tags:
+            self.backend.incr('tag:' + tag)
+        self._count('invalidations')
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'enabled': self.enabled,
+            'backend': type(self.backend).__name__,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / lookups if lookups else None,
+            'invalidations': self.invalidations
+        }
+
+#----------------------------------------------------------------------------#
+# Conditional GET.
+#----------------------------------------------------------------------------#
+
+def conditional(probe):
+    # Answers If-None-Match from `probe`, called with the view arguments,
+    # before the view runs; see the probes in queries.py. Pages get a weak
+    # ETag and Last-Modified, and no-cache so that browsers and CDNs
+    # revalidate instead of serving them stale.
+    #
+    # If-Modified-Since alone never gets a 304: deleted rows and shows that
+    # have started change the probe token without advancing any updated_at,
+    # so only the ETag can tell that the page is unchanged.
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method != 'GET' or '_flashes' in session:
+                return view(*args, **kwargs)
+
+            probed = probe(*args, **kwargs)
+            if probed is None:
+                return view(*args, **kwargs)
+            last_modified, token = probed
+            last_modified = last_modified.replace(microsecond=0, tzinfo=timezone.utc)
+            etag = hashlib.sha1('{}|{!r}'.format(request.full_path, token).encode()).hexdigest()
+            g.page_etag = etag
+
+            not_modified = request.if_none_match.contains_weak(etag)
+            response = Response(status=304) if not_modified else make_response(view(*args, **kwargs))
+            if response.status_code in (200, 304):
+                response.set_etag(etag, weak=True)
+                response.last_modified = last_modified
+                response.cache_control.no_cache = True
+            return response
+        return wrapper
+    return decorator
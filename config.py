@@ -1,6 +1,11 @@
 import os
 
-SECRET_KEY = os.urandom(32)
+# Set SECRET_KEY in the environment wherever more than one process serves
+# the app (e.g. gunicorn workers): session cookies, and with them flashed
+# messages and read-your-writes (see routing.py), are only valid in the
+# process whose key signed them. The random fallback suits a single
+# development server.
+SECRET_KEY = os.environ.get('SECRET_KEY') or os.urandom(32)
 # Grabs the folder where the script runs.
 basedir = os.path.abspath(os.path.dirname(__file__))
 
@@ -11,5 +16,104 @@ DEBUG = True
 
 # DONE IMPLEMENT DATABASE URL
 # SQLALCHEMY_DATABASE_URI = '<Put your local database url>'
-SQLALCHEMY_DATABASE_URI = 'postgresql://vari@localhost:5432/fyyurapp'
-SQLALCHEMY_TRACK_MODIFICATIONS = False
\ No newline at end of file
+SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'postgresql://vari@localhost:5432/fyyurapp')
+SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+# Connection pool (see pooling.py). Every process, e.g. every gunicorn
+# worker, has its own pool, so workers * (pool_size + max_overflow) must stay
+# below the server's max_connections. DB_POOL_PROFILE picks one of the
+# profiles below and the DB_POOL_* variables override single settings.
+DB_POOL_PROFILES = {
+    'development': {
+        'pool_size': 5,
+        'max_overflow': 10,
+        'pool_timeout': 30,
+        'pool_recycle': -1,
+        'pool_pre_ping': False
+    },
+    # Small per-worker pools that fail fast instead of queueing requests,
+    # and that survive connections dropped by the server or a proxy.
+    'production': {
+        'pool_size': 5,
+        'max_overflow': 5,
+        'pool_timeout': 5,
+        'pool_recycle': 1800,
+        'pool_pre_ping': True
+    }
+}
+
+def _pool_options(profile):
+    options = dict(DB_POOL_PROFILES[profile])
+    for option, variable, cast in (('pool_size', 'DB_POOL_SIZE', int),
+                                   ('max_overflow', 'DB_MAX_OVERFLOW', int),
+                                   ('pool_timeout', 'DB_POOL_TIMEOUT', float),
+                                   ('pool_recycle', 'DB_POOL_RECYCLE', int)):
+        if variable in os.environ:
+            options[option] = cast(os.environ[variable])
+    if 'DB_POOL_PRE_PING' in os.environ:
+        options['pool_pre_ping'] = os.environ['DB_POOL_PRE_PING'].lower() in ('1', 'true', 'yes')
+    return options
+
+DB_POOL_PROFILE = os.environ.get('DB_POOL_PROFILE', 'development')
+SQLALCHEMY_ENGINE_OPTIONS = _pool_options(DB_POOL_PROFILE)
+
+# Optional read replicas (see routing.py), as a comma-separated list of URLs.
+# Reads of GET requests go to a healthy replica, except for users who wrote
+# in the last READ_YOUR_WRITES_SECONDS.
+SQLALCHEMY_REPLICA_URIS = [uri for uri in os.environ.get('DATABASE_REPLICA_URLS', '').split(',') if uri]
+REPLICA_HEALTH_CHECK_INTERVAL = 10
+READ_YOUR_WRITES_SECONDS = 5
+
+# Number of shows per page on the /shows feed
+SHOWS_PER_PAGE = 30
+
+# Maximum number of venues or artists returned by a name search
+SEARCH_RESULT_LIMIT = 50
+
+# Maximum number of venues, and of artists, listed on a /genres/<name> page
+GENRE_PAGE_LIMIT = 100
+
+# Seconds the genre choices of the venue and artist forms are kept per
+# process (see genres.py)
+GENRE_CHOICES_TTL = 60
+
+# Rendered-page cache for the listing and detail pages (see cache.py).
+# The 'lru' backend is per process; 'redis' is shared between workers.
+PAGE_CACHE_ENABLED = os.environ.get('PAGE_CACHE_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+PAGE_CACHE_BACKEND = os.environ.get('PAGE_CACHE_BACKEND', 'lru')
+PAGE_CACHE_REDIS_URL = os.environ.get('PAGE_CACHE_REDIS_URL', 'redis://localhost:6379/0')
+PAGE_CACHE_MAX_ENTRIES = 1024
+PAGE_CACHE_TTL = 60
+
+# Seconds between the last of a burst of venue or show writes and the
+# debounced refresh of the venue area summary behind /venues, and the
+# longest a burst may postpone it (see summaries.py)
+AREA_SUMMARY_REFRESH_DELAY = 5
+AREA_SUMMARY_REFRESH_MAX_DELAY = 30
+
+# Shows that started more than SHOW_ARCHIVE_AFTER_DAYS ago are moved to
+# show_archive by `flask archive shows` (see archive.py), this many per
+# transaction
+SHOW_ARCHIVE_AFTER_DAYS = 365
+SHOW_ARCHIVE_BATCH_SIZE = 1000
+
+# Default and maximum page sizes of the /api/v1 collections
+API_PAGE_SIZE = 50
+API_MAX_PAGE_SIZE = 200
+
+# Longest date range accepted by /api/v1/calendar; ranges are bounded so
+# that a calendar query only scans a few monthly show partitions
+CALENDAR_MAX_DAYS = 92
+
+# Largest radius searched by /api/v1/venues/near, in kilometres
+NEARBY_MAX_RADIUS_KM = 500
+
+# Per-request SQL instrumentation (see instrumentation.py), off by default:
+# it logs every request with its slowest statements. A statement run more
+# than SQL_REPEAT_THRESHOLD times in one request is logged as a warning.
+# SQL_SERVER_TIMING also sends the SQL time to the client in a Server-Timing
+# header; leave it off where clients are not trusted.
+SQL_INSTRUMENTATION_ENABLED = os.environ.get('SQL_INSTRUMENTATION_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+SQL_SERVER_TIMING = os.environ.get('SQL_SERVER_TIMING', 'false').lower() in ('1', 'true', 'yes')
+SQL_REPEAT_THRESHOLD = 5
+SQL_SLOWEST_STATEMENTS = 3
@@ -0,0 +1,151 @@
+from datetime import datetime
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import case, func
+
+from models import db, Venue, Artist, Show
+from summaries import refresh_area_summary
+
+#----------------------------------------------------------------------------#
+# Show counters.
+#----------------------------------------------------------------------------#
+
+# Venue and Artist store their upcoming_shows_count and past_shows_count so
+# listing and search pages read them instead of counting shows. Show.is_upcoming
+# records which of the two counters a show is currently counted in; it is set
+# when the show is created and flipped by rollover_shows once the show starts.
+#
+# Counters are only ever changed with relative UPDATE statements in the same
+# transaction as the show write, so concurrent writers cannot lose increments.
+
+def _adjust(model, entity_id, upcoming=0, past=0):
+    db.session.query(model).filter(model.id == entity_id).update({
+        model.upcoming_shows_count: model.upcoming_shows_count + upcoming,
+        model.past_shows_count: model.past_shows_count + past
+    }, synchronize_session=False)
+
+def record_show_created(show, now=None):
+    # Call after adding `show` to the session and before committing.
+    now = now or datetime.now()
+    show.is_upcoming = show.start_time is not None and show.start_time > now
+    upcoming, past = (1, 0) if show.is_upcoming else (0, 1)
+    _adjust(Venue, show.venue_id, upcoming, past)
+    _adjust(Artist, show.artist_id, upcoming, past)
+
+def _grouped_counts(column, criterion):
+    # (id, upcoming, past) per value of `column` among the shows matching
+    # `criterion`, split on the stored is_upcoming flag.
+    return db.session.query(
+        column,
+        func.sum(case((Show.is_upcoming, 1), else_=0)),
+        func.sum(case((Show.is_upcoming, 0), else_=1))
+    ).filter(criterion).group_by(column).all()
+
+def record_shows_removed(criterion):
+    # Call before deleting the shows matching `criterion`, in the same
+    # transaction as the delete.
+    for model, column in ((Venue, Show.venue_id), (Artist, Show.artist_id)):
+        for entity_id, upcoming, past in _grouped_counts(column, criterion):
+            _adjust(model, entity_id, -upcoming, -past)
+
+def rollover_shows(now=None):
+    # Moves shows that have started since the last run from the upcoming to
+    # the past counters. Returns the number of shows moved.
+    now = now or datetime.now()
+    started = Show.is_upcoming & (Show.start_time <= now)
+
+    moved = 0
+    for model, column in ((Venue, Show.venue_id), (Artist, Show.artist_id)):
+        for entity_id, upcoming, _ in _grouped_counts(column, started):
+            _adjust(model, entity_id, -upcoming, upcoming)
+            if model is Venue:
+                moved += upcoming
+
+    db.session.query(Show).filter(started).update(
+        {Show.is_upcoming: False}, synchronize_session=False)
+    return moved
+
+def check_counts(now=None, repair=False):
+    # Recomputes both counters from show start times and returns the rows
+    # whose stored values disagree, as
+    # (table, id, stored (upcoming, past), actual (upcoming, past)).
+    # With repair=True the counters and any stale is_upcoming flags are
+    # overwritten with the recomputed values.
+    now = now or datetime.now()
+    upcoming = Show.start_time > now
+
+    drift = []
+    for model, column in ((Venue, Show.venue_id), (Artist, Show.artist_id)):
+        actual = db.session.query(
+            column.label('id'),
+            func.sum(case((upcoming, 1), else_=0)).label('upcoming'),
+            func.sum(case((upcoming, 0), else_=1)).label('past')
+        ).group_by(column).subquery()
+        actual_upcoming = func.coalesce(actual.c.upcoming, 0)
+        actual_past = func.coalesce(actual.c.past, 0)
+
+        rows = db.session.query(
+            model.id,
+            model.upcoming_shows_count,
+            model.past_shows_count,
+            actual_upcoming,
+            actual_past
+        ).outerjoin(actual, actual.c.id == model.id).filter(
+            (model.upcoming_shows_count != actual_upcoming) |
+            (model.past_shows_count != actual_past)
+        ).all()
+
+        for entity_id, stored_upcoming, stored_past, actual_up, actual_pa in rows:
+            drift.append((model.__tablename__, entity_id, (stored_upcoming, stored_past), (actual_up, actual_pa)))
+            if repair:
+                db.session.query(model).filter(model.id == entity_id).update({
+                    model.upcoming_shows_count: actual_up,
+                    model.past_shows_count: actual_pa
+                }, synchronize_session=False)
+
+    if repair:
+        db.session.query(Show).filter(Show.is_upcoming != func.coalesce(upcoming, False)).update(
+            {Show.is_upcoming: func.coalesce(upcoming, False)}, synchronize_session=False)
+    return drift
+
+#----------------------------------------------------------------------------#
+# Commands.
+#----------------------------------------------------------------------------#
+
+counts_cli = AppGroup('counts', help='Maintain the stored upcoming/past show counters.')
+
+@counts_cli.command('rollover')
+def rollover_command():
+    '''Move started shows from the upcoming to the past counters.
+
+    Meant to run periodically, e.g. every few minutes from cron.
+    '''
+    moved = rollover_shows()
+    db.session.commit()
+    if moved:
+        # The /venues page shows the upcoming counts through the summary.
+        with db.engine.begin() as connection:
+            refresh_area_summary(connection)
+    click.echo('Rolled over {} shows.'.format(moved))
+
+@counts_cli.command('check')
+@click.option('--repair', is_flag=True, help='Overwrite drifted counters with the recomputed values.')
+def check_command(repair):
+    '''Report (and optionally repair) counters that disagree with the show table.'''
+    # Shows that started since the last rollover are not drift: roll them
+    # over first, in the same transaction, which is only committed with
+    # --repair.
+    moved = rollover_shows()
+    drift = check_counts(repair=repair)
+    for table, entity_id, stored, actual in drift:
+        click.echo('{} {}: stored upcoming/past {}/{}, actual {}/{}'.format(
+            table, entity_id, stored[0], stored[1], actual[0], actual[1]))
+    if not repair:
+        db.session.rollback()
+    else:
+        db.session.commit()
+        if moved or drift:
+            with db.engine.begin() as connection:
+                refresh_area_summary(connection)
+    click.echo('{} rows drifted{}.'.format(len(drift), ', repaired' if repair and drift else ''))
@@ -0,0 +1,155 @@
+import csv
+import io
+import json
+import sys
+from datetime import datetime
+
+import click
+from flask import Blueprint, Response, abort, request, stream_with_context
+from flask.cli import AppGroup
+
+from models import db, Venue, Artist, Show, ShowArchive
+
+#----------------------------------------------------------------------------#
+# Export.
+#----------------------------------------------------------------------------#
+
+# Dumps of every show with its venue and artist names, for analytics.
+#
+# Rows are read through a server-side cursor (yield_per: a named cursor on
+# PostgreSQL) and written out in chunks as they arrive, so memory stays flat
+# however large the show table is. Both the HTTP endpoints and `flask export`
+# accept a start-time range and venue/artist filters, and can read the
+# archived shows (see archive.py) instead of the live ones.
+
+EXPORT_COLUMNS = (
+    'show_id', 'start_time', 'venue_id', 'venue_name', 'artist_id', 'artist_name'
+)
+
+# Rows fetched from the cursor at a time, and written per response chunk.
+EXPORT_CHUNK_SIZE = 1000
+
+FORMATS = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson'
+}
+
+def export_rows(start=None, end=None, venue_id=None, artist_id=None, chunk_size=EXPORT_CHUNK_SIZE, archived=False):
+    # Shows starting in [start, end), ordered by (start_time, id).
+    model = ShowArchive if archived else Show
+    query = db.session.query(
+        model.id.label('show_id'),
+        model.start_time,
+        Venue.id.label('venue_id'),
+        Venue.name.label('venue_name'),
+        Artist.id.label('artist_id'),
+        Artist.name.label('artist_name')
+    ).join(
+        Venue, model.venue_id == Venue.id
+    ).join(
+        Artist, model.artist_id == Artist.id
+    )
+
+    if start is not None:
+        query = query.filter(model.start_time >= start)
+    if end is not None:
+        query = query.filter(model.start_time < end)
+    if venue_id is not None:
+        query = query.filter(model.venue_id == venue_id)
+    if artist_id is not None:
+        query = query.filter(model.artist_id == artist_id)
+
+    return query.order_by(model.start_time, model.id).yield_per(chunk_size)
+
+def _chunked(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def _values(row):
+    return [value.isoformat() if isinstance(value, datetime) else value for value in row]
+
+def render_csv(rows, chunk_size=EXPORT_CHUNK_SIZE):
+    # Yields the header and then one string per chunk of rows.
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for chunk in _chunked(rows, chunk_size):
+        writer.writerows(_values(row) for row in chunk)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def render_jsonl(rows, chunk_size=EXPORT_CHUNK_SIZE):
+    for chunk in _chunked(rows, chunk_size):
+        yield ''.join(
+            json.dumps(dict(zip(EXPORT_COLUMNS, _values(row)))) + '\n' for row in chunk)
+
+RENDERERS = {
+    'csv': render_csv,
+    'jsonl': render_jsonl
+}
+
+def _parse_datetime(value):
+    if value is None:
+        return None
+    return datetime.fromisoformat(value)
+
+#----------------------------------------------------------------------------#
+# Endpoints.
+#----------------------------------------------------------------------------#
+
+export = Blueprint('export', __name__, url_prefix='/export')
+
+@export.route('/shows.<format>')
+def export_shows(format):
+    # /export/shows.csv or /export/shows.jsonl, filtered with ?from=, ?to=
+    # (ISO dates or datetimes), ?venue_id= and ?artist_id=; ?archived=1
+    # exports the archived shows.
+    if format not in FORMATS:
+        abort(404)
+    try:
+        start = _parse_datetime(request.args.get('from'))
+        end = _parse_datetime(request.args.get('to'))
+    except ValueError:
+        abort(400)
+
+    rows = export_rows(start, end,
+                       venue_id=request.args.get('venue_id', type=int),
+                       artist_id=request.args.get('artist_id', type=int),
+                       archived=request.args.get('archived', '') in ('1', 'true'))
+    response = Response(stream_with_context(RENDERERS[format](rows)), mimetype=FORMATS[format])
+    response.headers['Content-Disposition'] = 'attachment; filename=shows.{}'.format(format)
+    return response
+
+#----------------------------------------------------------------------------#
+# Commands.
+#----------------------------------------------------------------------------#
+
+export_cli = AppGroup('export', help='Export data for analytics.')
+
+@export_cli.command('shows')
+@click.option('--format', type=click.Choice(sorted(FORMATS)), default='csv', show_default=True)
+@click.option('--from', 'start', type=click.DateTime(), help='Only shows starting at or after this time.')
+@click.option('--to', 'end', type=click.DateTime(), help='Only shows starting before this time.')
+@click.option('--venue-id', type=int, help='Only shows at this venue.')
+@click.option('--artist-id', type=int, help='Only shows by this artist.')
+@click.option('--archived', is_flag=True, help='Export the archived shows instead.')
+@click.option('--output', type=click.Path(dir_okay=False, writable=True), help='Output file; standard output by default.')
+def export_shows_command(format, start, end, venue_id, artist_id, archived, output):
+    '''Stream shows with their venue and artist names as CSV or JSONL.'''
+    rows = export_rows(start, end, venue_id=venue_id, artist_id=artist_id, archived=archived)
+    handle = open(output, 'w', newline='', encoding='utf-8') if output else sys.stdout
+    try:
+        for chunk in RENDERERS[format](rows):
+            handle.write(chunk)
+    finally:
+        if output:
+            handle.close()
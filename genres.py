@@ -0,0 +1,157 @@
+import time
+from collections import Counter
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import bindparam, event, func
+from sqlalchemy.dialects import postgresql, sqlite
+
+from models import db, Venue, Artist, Genre, venue_genre, artist_genre
+
+#----------------------------------------------------------------------------#
+# Genre catalogue.
+#----------------------------------------------------------------------------#
+
+# Venues and artists keep their genre names in their `genres` array, which
+# the pages and the API render. Each name is also a row of genre, linked
+# through venue_genre / artist_genre, so the /genres pages read one range
+# of an index instead of scanning every array. Genre.venue_count and
+# Genre.artist_count count the links.
+#
+# Every write of a `genres` array goes through set_genres (or add_genres
+# for bulk inserts) in the same transaction. The links are diffed against
+# the new names, and the counts are changed with relative UPDATE statements
+# like the show counters, so concurrent writers cannot lose updates.
+# `flask genres check` recomputes the counts.
+
+# The genres a new catalogue starts with. The genre catalogue migration
+# keeps its own frozen copy.
+DEFAULT_GENRES = (
+    'Alternative', 'Blues', 'Classical', 'Country', 'Electronic', 'Folk',
+    'Funk', 'Hip-Hop', 'Heavy Metal', 'Instrumental', 'Jazz',
+    'Musical Theatre', 'Pop', 'Punk', 'R&B', 'Reggae', 'Rock n Roll', 'Soul',
+    'Other'
+)
+
+LINKS = {
+    Venue: (venue_genre, venue_genre.c.venue_id, Genre.venue_count),
+    Artist: (artist_genre, artist_genre.c.artist_id, Genre.artist_count),
+}
+
+INSERTS = {
+    'postgresql': postgresql.insert,
+    'sqlite': sqlite.insert
+}
+
+@event.listens_for(Genre.__table__, 'after_create')
+def _seed_genres(target, connection, **kw):
+    # create_all (e.g. for a fresh SQLite database) starts the catalogue with
+    # the default genres; on PostgreSQL the migration seeds them.
+    connection.execute(target.insert(), [{'name': name} for name in DEFAULT_GENRES])
+
+_choices = {'pairs': None, 'loaded_at': 0}
+
+def genre_choices():
+    # (value, label) pairs for the genre fields of the forms, kept for
+    # GENRE_CHOICES_TTL seconds so building a form does not query the
+    # catalogue. Names this process adds clear them; names added by other
+    # processes are offered once they expire.
+    now = time.monotonic()
+    if _choices['pairs'] is None or now - _choices['loaded_at'] > current_app.config.get('GENRE_CHOICES_TTL', 60):
+        _choices['pairs'] = [(name, name) for name, in db.session.query(Genre.name).order_by(Genre.name)]
+        _choices['loaded_at'] = now
+    return list(_choices['pairs'])
+
+def clear_genre_choices():
+    _choices['pairs'] = None
+
+def resolve_genres(names):
+    # Maps genre names to ids, adding the names not in the catalogue yet.
+    names = set(names)
+    if not names:
+        return {}
+    ids = dict(db.session.query(Genre.name, Genre.id).filter(Genre.name.in_(names)))
+    missing = names - set(ids)
+    if missing:
+        # Concurrent writers may add the same name; the loser skips it.
+        insert = INSERTS[db.engine.dialect.name](Genre.__table__).on_conflict_do_nothing(index_elements=['name'])
+        db.session.execute(insert, [{'name': name} for name in sorted(missing)])
+        clear_genre_choices()
+        ids.update(db.session.query(Genre.name, Genre.id).filter(Genre.name.in_(missing)))
+    return ids
+
+def _adjust_counts(model, deltas):
+    # deltas: {genre_id: change in the number of links}
+    deltas = {genre_id: delta for genre_id, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    count = LINKS[model][2]
+    table = Genre.__table__
+    db.session.execute(
+        table.update().where(table.c.id == bindparam('genre_id')).values({
+            count.key: table.c[count.key] + bindparam('delta')}),
+        [{'genre_id': genre_id, 'delta': delta} for genre_id, delta in deltas.items()])
+
+def set_genres(model, entity_id, names):
+    # Links the venue or artist `entity_id` to exactly `names`. Call with
+    # the names assigned to its `genres`, before committing; an empty list
+    # unlinks it, e.g. before deleting it.
+    table, column, _ = LINKS[model]
+    wanted = set(resolve_genres(names or ()).values())
+    current = {genre_id for genre_id, in db.session.query(table.c.genre_id).filter(column == entity_id)}
+
+    added, removed = wanted - current, current - wanted
+    if added:
+        db.session.execute(table.insert(), [{'genre_id': genre_id, column.key: entity_id} for genre_id in added])
+    if removed:
+        db.session.execute(table.delete().where(column == entity_id).where(table.c.genre_id.in_(removed)))
+    deltas = {genre_id: 1 for genre_id in added}
+    deltas.update((genre_id, -1) for genre_id in removed)
+    _adjust_counts(model, deltas)
+
+def add_genres(model, genres_by_id):
+    # Links newly inserted venues or artists, {entity id: names}, in bulk.
+    table, column, _ = LINKS[model]
+    ids = resolve_genres(name for names in genres_by_id.values() for name in names or ())
+    links = {(ids[name], entity_id) for entity_id, names in genres_by_id.items() for name in names or ()}
+    if not links:
+        return
+    db.session.execute(table.insert(), [{'genre_id': genre_id, column.key: entity_id} for genre_id, entity_id in links])
+    _adjust_counts(model, Counter(genre_id for genre_id, _ in links))
+
+def check_genre_counts(repair=False):
+    # Returns the genres whose stored counts disagree with the links, as
+    # (name, stored (venues, artists), actual (venues, artists)); with
+    # repair=True the counts are overwritten.
+    actual = {}
+    for model, (table, _, count) in LINKS.items():
+        links = db.session.query(table.c.genre_id, func.count()).group_by(table.c.genre_id)
+        actual[count.key] = dict(links.all())
+
+    drift = []
+    for genre in db.session.query(Genre).order_by(Genre.name):
+        stored = (genre.venue_count, genre.artist_count)
+        counted = (actual['venue_count'].get(genre.id, 0), actual['artist_count'].get(genre.id, 0))
+        if stored != counted:
+            drift.append((genre.name, stored, counted))
+            if repair:
+                genre.venue_count, genre.artist_count = counted
+    return drift
+
+#----------------------------------------------------------------------------#
+# Commands.
+#----------------------------------------------------------------------------#
+
+genres_cli = AppGroup('genres', help='Maintain the genre catalogue.')
+
+@genres_cli.command('check')
+@click.option('--repair', is_flag=True, help='Overwrite drifted counts with the recomputed values.')
+def check_command(repair):
+    '''Report (and optionally repair) genre counts that disagree with the links.'''
+    drift = check_genre_counts(repair=repair)
+    for name, stored, actual in drift:
+        click.echo('{}: stored venues/artists {}/{}, actual {}/{}'.format(
+            name, stored[0], stored[1], actual[0], actual[1]))
+    db.session.commit()
+    click.echo('{} genres drifted{}.'.format(len(drift), ', repaired' if repair and drift else ''))
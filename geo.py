@@ -0,0 +1,197 @@
+import csv
+import math
+import os
+import re
+from functools import lru_cache
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import inspect, or_
+
+from models import db, Venue
+
+#----------------------------------------------------------------------------#
+# Venue locations.
+#----------------------------------------------------------------------------#
+
+# Venues carry a latitude and longitude, geocoded offline from the bundled
+# data/us_cities.csv (city, state, ZIP and coordinates of its centre): a
+# ZIP code at the end of the address wins, the city and state otherwise.
+# Explicit coordinates (e.g. from an import) are kept as given.
+#
+# Without PostGIS, proximity is indexed with grid buckets: the globe is cut
+# into GRID_DEGREES x GRID_DEGREES cells numbered row by row, and every
+# venue stores the number of its cell in Venue.grid_cell (a plain B-tree
+# index). The cells within a radius form one contiguous range of numbers
+# per row, so a radius search is a handful of index range scans; only the
+# venues found there get an exact (haversine) distance.
+#
+# Changing GRID_DEGREES renumbers the cells: run `flask geo locate --all`.
+# Cells do not wrap around the antimeridian.
+
+GAZETTEER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'us_cities.csv')
+
+GRID_DEGREES = 0.1
+GRID_COLUMNS = int(round(360 / GRID_DEGREES))
+GRID_ROWS = int(round(180 / GRID_DEGREES))
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+ZIP_PATTERN = re.compile(r'\b(\d{5})(?:-\d{4})?\s*$')
+
+def _key(text):
+    # 'St. Louis' and 'saint louis' alike.
+    key = ' '.join((text or '').replace('.', ' ').lower().split())
+    return 'saint ' + key[3:] if key.startswith('st ') else key
+
+@lru_cache(maxsize=1)
+def gazetteer():
+    # ({(city, state): (lat, lon)}, {zip: (lat, lon)}), read once.
+    by_city, by_zip = {}, {}
+    with open(GAZETTEER_PATH, newline='', encoding='utf-8') as handle:
+        for row in csv.DictReader(handle):
+            point = (float(row['latitude']), float(row['longitude']))
+            by_city[_key(row['city']), _key(row['state'])] = point
+            by_zip[row['zip']] = point
+    return by_city, by_zip
+
+def geocode(city=None, state=None, address=None, zip_code=None):
+    # (latitude, longitude) of the ZIP code, or of the one ending the
+    # address, or else of the city; None if none of them is known.
+    by_city, by_zip = gazetteer()
+    if zip_code is None and address:
+        match = ZIP_PATTERN.search(address)
+        zip_code = match.group(1) if match else None
+    if zip_code in by_zip:
+        return by_zip[zip_code]
+    return by_city.get((_key(city), _key(state)))
+
+def grid_cell(latitude, longitude):
+    row = min(int((latitude + 90) // GRID_DEGREES), GRID_ROWS - 1)
+    column = min(int((longitude + 180) // GRID_DEGREES), GRID_COLUMNS - 1)
+    return row * GRID_COLUMNS + column
+
+def locate(city=None, state=None, address=None, latitude=None, longitude=None):
+    # (latitude, longitude, grid_cell) for a venue; all None if it cannot be
+    # placed.
+    if latitude is None or longitude is None:
+        point = geocode(city, state, address)
+        if point is None:
+            return None, None, None
+        latitude, longitude = point
+    latitude, longitude = float(latitude), float(longitude)
+    return latitude, longitude, grid_cell(latitude, longitude)
+
+def locate_venue(venue):
+    # Call after setting a venue's city, state and address, before the
+    # session flushes them: moves are read from the attribute history. A
+    # venue is only geocoded again if it is new, has no location yet or was
+    # moved, and keeps its coordinates if its new place is unknown.
+    state = inspect(venue)
+    moved = not state.persistent or any(
+        state.attrs[name].history.has_changes() for name in ('city', 'state', 'address'))
+    if not moved and venue.latitude is not None and venue.longitude is not None:
+        return
+    point = geocode(venue.city, venue.state, venue.address)
+    if point is None:
+        return
+    venue.latitude, venue.longitude = point
+    venue.grid_cell = grid_cell(*point)
+
+def locate_row(row):
+    # The same for a venue row of a bulk insert; keeps its coordinates if
+    # it has both.
+    row['latitude'], row['longitude'], row['grid_cell'] = locate(
+        row.get('city'), row.get('state'), row.get('address'), row.get('latitude'), row.get('longitude'))
+
+#----------------------------------------------------------------------------#
+# Proximity search.
+#----------------------------------------------------------------------------#
+
+def distance_km(latitude1, longitude1, latitude2, longitude2):
+    # Haversine distance.
+    phi1, phi2 = math.radians(latitude1), math.radians(latitude2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(longitude2 - longitude1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1, math.sqrt(a)))
+
+def _cell_ranges(latitude, longitude, radius_km):
+    # (first, last) cell numbers covering the circle, one range per row.
+    dlat = radius_km / KM_PER_DEGREE
+    # Longitude degrees shrink towards the poles; use the widest row.
+    widest = min(89.9, abs(latitude) + dlat)
+    dlon = min(180, radius_km / (KM_PER_DEGREE * math.cos(math.radians(widest))))
+
+    first_row = max(0, int((latitude - dlat + 90) // GRID_DEGREES))
+    last_row = min(GRID_ROWS - 1, int((latitude + dlat + 90) // GRID_DEGREES))
+    first_column = max(0, int((longitude - dlon + 180) // GRID_DEGREES))
+    last_column = min(GRID_COLUMNS - 1, int((longitude + dlon + 180) // GRID_DEGREES))
+    return [(row * GRID_COLUMNS + first_column, row * GRID_COLUMNS + last_column)
+            for row in range(first_row, last_row + 1)]
+
+def venues_within(latitude, longitude, radius_km, columns, session=None):
+    # [(distance_km, row)] for the venues within `radius_km`, nearest first;
+    # `columns` are selected for each row (latitude and longitude are added).
+    session = session or db.session
+    ranges = _cell_ranges(latitude, longitude, radius_km)
+    selected = {column.key for column in columns}
+    columns = list(columns) + [column for column in (Venue.latitude, Venue.longitude) if column.key not in selected]
+    rows = session.query(*columns).filter(
+        or_(*[Venue.grid_cell.between(first, last) for first, last in ranges])).all()
+    found = [(distance_km(latitude, longitude, row.latitude, row.longitude), row) for row in rows]
+    found = [(distance, row) for distance, row in found if distance <= radius_km]
+    found.sort(key=lambda item: (item[0], item[1].id))
+    return found
+
+def nearest_venues(latitude, longitude, limit, max_radius_km, radius_km=None, columns=(Venue.id,), session=None):
+    # Up to `limit` venues nearest to the point, as [(distance_km, row)]:
+    # within `radius_km` if given, otherwise the k nearest within
+    # `max_radius_km`, found by doubling the radius from a few cells until
+    # `limit` venues are inside it.
+    if radius_km is not None:
+        return venues_within(latitude, longitude, min(radius_km, max_radius_km), columns, session)[:limit]
+
+    radius = min(2 * GRID_DEGREES * KM_PER_DEGREE, max_radius_km)
+    while True:
+        found = venues_within(latitude, longitude, radius, columns, session)
+        if len(found) >= limit or radius >= max_radius_km:
+            return found[:limit]
+        radius = min(radius * 2, max_radius_km)
+
+#----------------------------------------------------------------------------#
+# Commands.
+#----------------------------------------------------------------------------#
+
+geo_cli = AppGroup('geo', help='Maintain venue locations.')
+
+@geo_cli.command('locate')
+@click.option('--all', 'everything', is_flag=True, help='Relocate every venue, not only those without a location.')
+@click.option('--batch-size', default=1000, show_default=True, help='Venues updated per transaction.')
+def locate_command(everything, batch_size):
+    '''Geocode venues and assign their grid cells.'''
+    located = unknown = 0
+    last_id = 0
+    while True:
+        query = db.session.query(Venue.id, Venue.city, Venue.state, Venue.address, Venue.latitude, Venue.longitude)
+        if not everything:
+            query = query.filter(Venue.grid_cell.is_(None))
+        batch = query.filter(Venue.id > last_id).order_by(Venue.id).limit(batch_size).all()
+        if not batch:
+            break
+        updates = []
+        for venue in batch:
+            # --all keeps explicit coordinates and renumbers their cells.
+            kept = (venue.latitude, venue.longitude) if everything else (None, None)
+            latitude, longitude, cell = locate(venue.city, venue.state, venue.address, *kept)
+            if cell is None:
+                unknown += 1
+                continue
+            updates.append({'id': venue.id, 'latitude': latitude, 'longitude': longitude, 'grid_cell': cell})
+        if updates:
+            db.session.bulk_update_mappings(Venue, updates)
+        db.session.commit()
+        located += len(updates)
+        last_id = batch[-1].id
+    click.echo('Located {} venues; {} could not be geocoded.'.format(located, unknown))
@@ -0,0 +1,327 @@
+import csv
+import io
+import json
+import time
+from collections import Counter
+from datetime import datetime
+from itertools import islice
+
+import click
+import dateutil.parser
+from flask.cli import with_appcontext
+from sqlalchemy import bindparam
+
+from genres import add_genres
+from geo import locate_row
+from models import db, Venue, Artist, Show, DEFAULT_SHOW_DURATION_MINUTES, MAX_SHOW_DURATION_MINUTES
+from partitions import ensure_show_partitions
+from summaries import refresh_area_summary
+
+#----------------------------------------------------------------------------#
+# Bulk import.
+#----------------------------------------------------------------------------#
+
+# `flask import` loads venues, artists and shows from CSV or JSONL files.
+# Input is streamed and written in batches: COPY on PostgreSQL, executemany
+# inserts elsewhere. Each batch is committed on its own, together with the
+# counter updates for its shows, so an interrupted import keeps what it had
+# loaded and leaves the counters consistent.
+#
+# Venues and artists carry an `external_id`, the partner's key for them;
+# shows refer to those keys as `venue_key` and `artist_key`. Keys are
+# compared as strings, so JSONL files may use numbers. In CSV files
+# genres are separated by semicolons, and empty cells are NULL.
+#
+# Venues and artists whose external_id is already loaded are skipped, so an
+# interrupted import can be re-run with the same files. Shows have no key:
+# re-running a show import loads its shows again. Venues without a latitude and
+# longitude are geocoded from their address or city (see geo.py).
+
+VENUE_COLUMNS = (
+    'external_id', 'name', 'city', 'state', 'address', 'phone', 'genres',
+    'facebook_link', 'image_link', 'website_link', 'seeking_talent',
+    'seeking_description', 'latitude', 'longitude', 'grid_cell'
+)
+
+ARTIST_COLUMNS = (
+    'external_id', 'name', 'city', 'state', 'phone', 'genres', 'facebook_link',
+    'image_link', 'website_link', 'seeking_venue', 'seeking_description'
+)
+
+SHOW_COLUMNS = ('venue_id', 'artist_id', 'start_time', 'duration_minutes', 'is_upcoming')
+
+BOOLEAN_COLUMNS = ('seeking_talent', 'seeking_venue')
+
+#----------------------------------------------------------------------------#
+# Reading.
+#----------------------------------------------------------------------------#
+
+def read_records(path, format=None):
+    # Yields one dict per record without loading the file into memory.
+    format = format or ('jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv')
+    with open(path, newline='', encoding='utf-8') as handle:
+        if format == 'jsonl':
+            for line in handle:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            for record in csv.DictReader(handle):
+                yield record
+
+def batches(records, size):
+    records = iter(records)
+    while True:
+        batch = list(islice(records, size))
+        if not batch:
+            return
+        yield batch
+
+def _boolean(value):
+    if isinstance(value, bool) or value is None:
+        return bool(value)
+    return value.strip().lower() in ('1', 'true', 't', 'yes', 'y')
+
+def _genres(value):
+    if value is None or isinstance(value, list):
+        return value
+    return [genre.strip() for genre in value.split(';') if genre.strip()]
+
+def _datetime(value):
+    # Start times are stored as naive local time; values with an offset
+    # (e.g. a trailing Z) are converted to it. None if it cannot be parsed.
+    if value is None or value == '':
+        return None
+    if not isinstance(value, datetime):
+        try:
+            value = datetime.fromisoformat(value)
+        except ValueError:
+            try:
+                value = dateutil.parser.parse(value)
+            except (ValueError, OverflowError):
+                return None
+    if value.tzinfo is not None:
+        value = value.astimezone().replace(tzinfo=None)
+    return value
+
+def _external_key(value):
+    return None if value is None or value == '' else str(value)
+
+def _duration(value):
+    # None if the value is not a valid show duration.
+    if value is None or value == '':
+        return DEFAULT_SHOW_DURATION_MINUTES
+    try:
+        minutes = int(value)
+    except (TypeError, ValueError):
+        return None
+    return minutes if 1 <= minutes <= MAX_SHOW_DURATION_MINUTES else None
+
+def _entity_row(record, columns):
+    # Only empty strings become NULL; 0 and false are kept.
+    row = {column: None if record.get(column) == '' else record.get(column) for column in columns}
+    for column in BOOLEAN_COLUMNS:
+        if column in row:
+            row[column] = _boolean(row[column])
+    row['external_id'] = _external_key(row['external_id'])
+    row['genres'] = _genres(row['genres'])
+    return row
+
+#----------------------------------------------------------------------------#
+# Writing.
+#----------------------------------------------------------------------------#
+
+def _copy_value(value):
+    if isinstance(value, list):
+        # PostgreSQL array literal with every element quoted.
+        return '{' + ','.join(
+            '"' + item.replace('\\', '\\\\').replace('"', '\\"') + '"' for item in value
+        ) + '}'
+    return value
+
+def write_rows(table, columns, rows):
+    if not rows:
+        return
+    if db.engine.dialect.name == 'postgresql':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow([_copy_value(row[column]) for column in columns])
+        buffer.seek(0)
+        cursor = db.session.connection().connection.cursor()
+        cursor.copy_expert('COPY {} ({}) FROM STDIN WITH (FORMAT csv)'.format(
+            table.name, ', '.join(columns)), buffer)
+    else:
+        db.session.execute(table.insert(), rows)
+
+def write_entities(model, columns, rows):
+    # Writes venue or artist rows and links them to their genres, in the
+    # current transaction, and returns the number written. Rows are found
+    # again by external_id; the rare ones without one are inserted one at
+    # a time for their ids. Rows whose external_id exists already, or
+    # repeats an earlier row, are skipped.
+    keys = {row['external_id'] for row in rows if row['external_id'] is not None}
+    seen = {key for key, in db.session.query(model.external_id).filter(model.external_id.in_(keys))} if keys else set()
+    fresh = []
+    for row in rows:
+        if row['external_id'] is not None:
+            if row['external_id'] in seen:
+                continue
+            seen.add(row['external_id'])
+        fresh.append(row)
+    rows = fresh
+
+    if model is Venue:
+        for row in rows:
+            locate_row(row)
+    keyed = [row for row in rows if row['external_id'] is not None]
+    write_rows(model.__table__, columns, keyed)
+    ids = dict(db.session.query(model.external_id, model.id).filter(
+        model.external_id.in_([row['external_id'] for row in keyed]))) if keyed else {}
+    genres_by_id = {ids[row['external_id']]: row['genres'] for row in keyed}
+    for row in rows:
+        if row['external_id'] is None:
+            entity_id, = db.session.execute(model.__table__.insert(), row).inserted_primary_key
+            genres_by_id[entity_id] = row['genres']
+    add_genres(model, genres_by_id)
+    return len(rows)
+
+def _add_to_counters(model, counts):
+    # counts: {id: (upcoming, past)}
+    if not counts:
+        return
+    table = model.__table__
+    db.session.execute(
+        table.update().where(table.c.id == bindparam('entity_id')).values(
+            upcoming_shows_count=table.c.upcoming_shows_count + bindparam('upcoming'),
+            past_shows_count=table.c.past_shows_count + bindparam('past')),
+        [{'entity_id': entity_id, 'upcoming': upcoming, 'past': past}
+         for entity_id, (upcoming, past) in counts.items()])
+
+def write_shows(rows):
+    # Writes show rows (with is_upcoming set) and adds them to the counters
+    # of their venues and artists, in the current transaction.
+    write_rows(Show.__table__, SHOW_COLUMNS, rows)
+    venue_counts, artist_counts = Counter(), Counter()
+    for row in rows:
+        venue_counts[row['venue_id'], row['is_upcoming']] += 1
+        artist_counts[row['artist_id'], row['is_upcoming']] += 1
+    for model, counts in ((Venue, venue_counts), (Artist, artist_counts)):
+        _add_to_counters(model, {
+            entity_id: (counts[entity_id, True], counts[entity_id, False])
+            for entity_id, _ in counts
+        })
+
+class KeyResolver(object):
+    # Maps external keys to ids, querying only the keys not seen before.
+
+    def __init__(self, model):
+        self.model = model
+        self.ids = {}
+
+    def resolve(self, keys):
+        missing = set(keys) - set(self.ids) - {None}
+        if missing:
+            self.ids.update(db.session.query(self.model.external_id, self.model.id)
+                .filter(self.model.external_id.in_(missing)).all())
+        return self.ids
+
+#----------------------------------------------------------------------------#
+# Import.
+#----------------------------------------------------------------------------#
+
+def import_entities(model, columns, records, batch_size, progress):
+    # Returns (imported, skipped); rows whose external_id is already loaded
+    # are skipped.
+    imported = skipped = 0
+    for batch in batches(records, batch_size):
+        written = write_entities(model, columns, [_entity_row(record, columns) for record in batch])
+        db.session.commit()
+        imported += written
+        skipped += len(batch) - written
+        progress(imported)
+    return imported, skipped
+
+def import_shows(records, batch_size, progress, now=None):
+    # Returns (imported, skipped); shows whose venue or artist key is
+    # unknown, without a valid start time or with an invalid duration, are
+    # skipped.
+    now = now or datetime.now()
+    venues, artists = KeyResolver(Venue), KeyResolver(Artist)
+    imported = skipped = 0
+
+    for batch in batches(records, batch_size):
+        venue_ids = venues.resolve(_external_key(record.get('venue_key')) for record in batch)
+        artist_ids = artists.resolve(_external_key(record.get('artist_key')) for record in batch)
+
+        rows = []
+        for record in batch:
+            venue_id = venue_ids.get(_external_key(record.get('venue_key')))
+            artist_id = artist_ids.get(_external_key(record.get('artist_key')))
+            start_time = _datetime(record.get('start_time'))
+            duration_minutes = _duration(record.get('duration_minutes'))
+            if venue_id is None or artist_id is None or start_time is None or duration_minutes is None:
+                skipped += 1
+                continue
+            is_upcoming = start_time > now
+            rows.append({
+                'venue_id': venue_id,
+                'artist_id': artist_id,
+                'start_time': start_time,
+                'duration_minutes': duration_minutes,
+                'is_upcoming': is_upcoming
+            })
+
+        write_shows(rows)
+        db.session.commit()
+        imported += len(rows)
+        progress(imported)
+
+    return imported, skipped
+
+#----------------------------------------------------------------------------#
+# Command.
+#----------------------------------------------------------------------------#
+
+@click.command('import')
+@click.option('--venues', 'venues_path', type=click.Path(exists=True, dir_okay=False), help='Venues file (.csv or .jsonl).')
+@click.option('--artists', 'artists_path', type=click.Path(exists=True, dir_okay=False), help='Artists file (.csv or .jsonl).')
+@click.option('--shows', 'shows_path', type=click.Path(exists=True, dir_okay=False), help='Shows file (.csv or .jsonl).')
+@click.option('--format', type=click.Choice(['csv', 'jsonl']), help='Input format; guessed from the extension by default.')
+@click.option('--batch-size', default=10000, show_default=True, help='Rows written per batch and transaction.')
+@with_appcontext
+def import_command(venues_path, artists_path, shows_path, format, batch_size):
+    '''Bulk-load venues, artists and shows.
+
+    Venues and artists are loaded before shows so that shows can refer to
+    them by external key.
+    '''
+    def report(label, started):
+        def progress(count):
+            elapsed = time.perf_counter() - started
+            click.echo('\r{}: {} rows, {:.0f} rows/s'.format(label, count, count / elapsed if elapsed else 0), nl=False)
+        return progress
+
+    for label, model, columns, path in (('venues', Venue, VENUE_COLUMNS, venues_path),
+                                        ('artists', Artist, ARTIST_COLUMNS, artists_path)):
+        if path:
+            started = time.perf_counter()
+            imported, skipped = import_entities(model, columns, read_records(path, format), batch_size, report(label, started))
+            click.echo()
+            if skipped:
+                click.echo('{}: skipped {} rows already loaded'.format(label, skipped))
+
+    if shows_path:
+        started = time.perf_counter()
+        imported, skipped = import_shows(read_records(shows_path, format), batch_size, report('shows', started))
+        click.echo()
+        if skipped:
+            click.echo('shows: skipped {} rows with unknown venue or artist keys, no valid start time or an invalid duration'.format(skipped))
+
+    if shows_path:
+        # Shows outside the existing partitions land in show_default;
+        # give their months partitions of their own.
+        with db.engine.begin() as connection:
+            ensure_show_partitions(connection)
+    if venues_path or shows_path:
+        with db.engine.begin() as connection:
+            refresh_area_summary(connection)
@@ -0,0 +1,147 @@
+import json
+import logging
+import re
+import time
+from collections import Counter
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+#----------------------------------------------------------------------------#
+# Structured logging.
+#----------------------------------------------------------------------------#
+
+class JSONFormatter(logging.Formatter):
+    # One JSON object per line. Fields passed as extra={'data': {...}} are
+    # merged into the object.
+
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        entry.update(getattr(record, 'data', {}))
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def structured_handler(stream=None):
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(JSONFormatter())
+    return handler
+
+#----------------------------------------------------------------------------#
+# SQL instrumentation.
+#----------------------------------------------------------------------------#
+
+# Off unless SQL_INSTRUMENTATION_ENABLED is set. Records every statement a
+# request runs, through engine events, and at the end of the request:
+#   - with SQL_SERVER_TIMING, adds a Server-Timing header with the SQL and
+#     total time,
+#   - logs one structured entry with the query count, SQL time and the
+#     slowest statements,
+#   - logs a warning for every statement shape run more than
+#     SQL_REPEAT_THRESHOLD times, the signature of an N+1 loop.
+#
+# A statement's shape is its SQL with literals and IN lists collapsed, so
+# the same query issued for different rows counts as one shape.
+
+logger = logging.getLogger('fyyur.sql')
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_IN_LISTS = re.compile(r'\bIN\s*\([^()]*\)', re.IGNORECASE)
+_WHITESPACE = re.compile(r'\s+')
+
+def statement_shape(statement):
+    shape = _LITERALS.sub('?', statement)
+    shape = _IN_LISTS.sub('IN (...)', shape)
+    return _WHITESPACE.sub(' ', shape).strip()
+
+
+class SQLInstrumentation(object):
+
+    def __init__(self, app=None):
+        self.repeat_threshold = 5
+        self.slowest = 3
+        self.server_timing = False
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        if not app.config.get('SQL_INSTRUMENTATION_ENABLED', False):
+            return
+        self.server_timing = app.config.get('SQL_SERVER_TIMING', False)
+        self.repeat_threshold = app.config.get('SQL_REPEAT_THRESHOLD', 5)
+        self.slowest = app.config.get('SQL_SLOWEST_STATEMENTS', 3)
+        if not logger.handlers:
+            logger.addHandler(structured_handler())
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+
+        # Listening on the Engine class covers engines created later too.
+        if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+            event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+            event.listen(Engine, 'handle_error', _handle_error)
+        app.before_request(_start_request)
+        app.after_request(self._finish_request)
+
+    def _finish_request(self, response):
+        stats = g.pop('sql_stats', None)
+        if stats is None:
+            return response
+
+        total = time.perf_counter() - stats['started']
+        sql_time = sum(duration for duration, _ in stats['statements'])
+        if self.server_timing:
+            response.headers.add('Server-Timing', 'db;dur={:.1f};desc="{} queries"'.format(
+                sql_time * 1000, len(stats['statements'])))
+            response.headers.add('Server-Timing', 'total;dur={:.1f}'.format(total * 1000))
+
+        slowest = sorted(stats['statements'], key=lambda entry: entry[0], reverse=True)[:self.slowest]
+        logger.info('request', extra={'data': {
+            'method': request.method,
+            'path': request.full_path.rstrip('?'),
+            'status': response.status_code,
+            'queries': len(stats['statements']),
+            'sql_ms': round(sql_time * 1000, 3),
+            'total_ms': round(total * 1000, 3),
+            'slowest': [{'ms': round(duration * 1000, 3), 'statement': statement}
+                        for duration, statement in slowest]
+        }})
+
+        shapes = Counter(statement_shape(statement) for _, statement in stats['statements'])
+        for shape, count in shapes.items():
+            if count > self.repeat_threshold:
+                logger.warning('repeated statement', extra={'data': {
+                    'method': request.method,
+                    'path': request.full_path.rstrip('?'),
+                    'count': count,
+                    'statement': shape
+                }})
+        return response
+
+
+def _start_request():
+    g.sql_stats = {'started': time.perf_counter(), 'statements': []}
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and 'sql_stats' in g:
+        conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get('query_started')
+    if started and has_request_context() and 'sql_stats' in g:
+        g.sql_stats['statements'].append((time.perf_counter() - started.pop(), statement))
+
+def _handle_error(context):
+    # A failed statement never reaches after_cursor_execute; record it here.
+    started = context.connection.info.get('query_started') if context.connection else None
+    if started:
+        duration = time.perf_counter() - started.pop()
+        if has_request_context() and 'sql_stats' in g:
+            g.sql_stats['statements'].append((duration, context.statement))
@@ -0,0 +1,26 @@
+"""row version columns on venue, artist and show
+
+Revision ID: 5d90b3e8f2c6
+Revises: c47a9e0d5b13
+Create Date: 2026-10-18 13:41:09.317455
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d90b3e8f2c6'
+down_revision = 'c47a9e0d5b13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for table in ('venue', 'artist', 'show'):
+        op.add_column(table, sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade():
+    for table in ('show', 'artist', 'venue'):
+        op.drop_column(table, 'version')
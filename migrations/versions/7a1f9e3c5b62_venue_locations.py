@@ -0,0 +1,32 @@
+"""venue latitude, longitude and grid cell
+
+Revision ID: 7a1f9e3c5b62
+Revises: e4a7c2b9d318
+Create Date: 2026-10-18 20:51:37.106429
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7a1f9e3c5b62'
+down_revision = 'e4a7c2b9d318'
+branch_labels = None
+depends_on = None
+
+
+# Existing venues are geocoded afterwards by `flask geo locate` (see geo.py).
+
+def upgrade():
+    op.add_column('venue', sa.Column('latitude', sa.Float(), nullable=True))
+    op.add_column('venue', sa.Column('longitude', sa.Float(), nullable=True))
+    op.add_column('venue', sa.Column('grid_cell', sa.Integer(), nullable=True))
+    op.create_index('ix_venue_grid_cell', 'venue', ['grid_cell'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_venue_grid_cell', table_name='venue')
+    op.drop_column('venue', 'grid_cell')
+    op.drop_column('venue', 'longitude')
+    op.drop_column('venue', 'latitude')
@@ -0,0 +1,36 @@
+"""composite indexes for show lookups and the venue area listing
+
+Revision ID: 8b2e4d7c1a90
+Revises: 3f1c0a9b7e21
+Create Date: 2026-10-18 11:03:17.204816
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b2e4d7c1a90'
+down_revision = '3f1c0a9b7e21'
+branch_labels = None
+depends_on = None
+
+
+# The indexes are built CONCURRENTLY so that writes to show and venue are
+# not blocked while they build. PostgreSQL refuses to do that inside a
+# transaction, hence the autocommit block.
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        op.create_index('ix_show_venue_id_start_time', 'show', ['venue_id', 'start_time'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_show_artist_id_start_time', 'show', ['artist_id', 'start_time'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_show_start_time_id', 'show', ['start_time', 'id'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_venue_state_city_name', 'venue', ['state', 'city', 'name'], unique=False, postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_venue_state_city_name', table_name='venue', postgresql_concurrently=True)
+        op.drop_index('ix_show_start_time_id', table_name='show', postgresql_concurrently=True)
+        op.drop_index('ix_show_artist_id_start_time', table_name='show', postgresql_concurrently=True)
+        op.drop_index('ix_show_venue_id_start_time', table_name='show', postgresql_concurrently=True)
@@ -0,0 +1,32 @@
+"""show duration
+
+Revision ID: 9c3e5a1d7f24
+Revises: d81f4a6b2c57
+Create Date: 2026-10-18 19:20:43.518302
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9c3e5a1d7f24'
+down_revision = 'd81f4a6b2c57'
+branch_labels = None
+depends_on = None
+
+
+# Existing shows get the default duration. Overlapping shows already in the
+# table are left alone; only new bookings are checked (see bookings.py).
+
+def upgrade():
+    op.add_column('show', sa.Column('duration_minutes', sa.Integer(), server_default='120', nullable=False))
+    op.create_check_constraint('ck_show_duration_minutes', 'show', 'duration_minutes BETWEEN 1 AND 1440')
+    op.add_column('show_archive', sa.Column('duration_minutes', sa.Integer(), server_default='120', nullable=False))
+    op.alter_column('show_archive', 'duration_minutes', server_default=None)
+
+
+def downgrade():
+    op.drop_column('show_archive', 'duration_minutes')
+    op.drop_constraint('ck_show_duration_minutes', 'show', type_='check')
+    op.drop_column('show', 'duration_minutes')
@@ -0,0 +1,52 @@
+"""materialized venue area summary for the venues page
+
+Revision ID: a93c5e1f7b08
+Revises: f2b7d06c9e38
+Create Date: 2026-10-18 17:12:40.318552
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a93c5e1f7b08'
+down_revision = 'f2b7d06c9e38'
+branch_labels = None
+depends_on = None
+
+
+# REFRESH ... CONCURRENTLY needs a unique index over plain columns covering
+# every row, hence the coalesced (state, city) key.
+
+def upgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute(
+            "CREATE MATERIALIZED VIEW venue_area_summary AS "
+            "SELECT "
+            "coalesce(state, '') AS state, "
+            "coalesce(city, '') AS city, "
+            "json_agg(json_build_object("
+            "'id', id, 'name', name, 'num_upcoming_shows', upcoming_shows_count"
+            ") ORDER BY name, id) AS venues, "
+            "count(*) AS venue_count, "
+            "max(updated_at) AS updated_at "
+            "FROM venue "
+            "GROUP BY 1, 2")
+        op.execute("CREATE UNIQUE INDEX ix_venue_area_summary_state_city ON venue_area_summary (state, city)")
+    else:
+        op.create_table('venue_area_summary',
+            sa.Column('state', sa.String(length=120), nullable=False),
+            sa.Column('city', sa.String(length=120), nullable=False),
+            sa.Column('venues', sa.JSON(), nullable=False),
+            sa.Column('venue_count', sa.Integer(), nullable=False),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('state', 'city')
+        )
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute("DROP MATERIALIZED VIEW venue_area_summary")
+    else:
+        op.drop_table('venue_area_summary')
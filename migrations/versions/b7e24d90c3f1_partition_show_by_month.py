@@ -0,0 +1,124 @@
+"""partition show by month on start_time
+
+Revision ID: b7e24d90c3f1
+Revises: a93c5e1f7b08
+Create Date: 2026-10-18 17:41:05.662914
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e24d90c3f1'
+down_revision = 'a93c5e1f7b08'
+branch_labels = None
+depends_on = None
+
+
+# show is rebuilt as a table partitioned by RANGE (start_time), one partition
+# per month named show_YYYY_MM, plus show_default for rows outside them.
+# Partitions are created for every month that has shows and for the next
+# twelve months; `flask partitions ensure` keeps creating them ahead of time.
+#
+# A primary key on a partitioned table must include the partition key, so
+# it becomes (id, start_time) and start_time becomes NOT NULL. Shows without
+# a start time are dropped, and taken off their venue's and artist's past
+# counters, which is where they were counted. ids keep coming from the same
+# sequence, so they stay unique.
+#
+# PostgreSQL only; other databases keep the plain table.
+
+COLUMNS = 'id, artist_id, venue_id, start_time, is_upcoming, version, updated_at'
+
+CONSTRAINTS = ('pkey', 'artist_id_fkey', 'venue_id_fkey')
+
+INDEXES = (
+    "CREATE INDEX ix_show_venue_id_start_time ON show (venue_id, start_time)",
+    "CREATE INDEX ix_show_artist_id_start_time ON show (artist_id, start_time)",
+    "CREATE INDEX ix_show_start_time_id ON show (start_time, id)",
+    "CREATE INDEX ix_show_upcoming_start_time ON show (start_time) WHERE is_upcoming",
+    "CREATE INDEX ix_show_updated_at ON show (updated_at)",
+)
+
+
+def _rename_table(name):
+    # Constraint names are not renamed with their table; free them up for
+    # the new show table.
+    op.execute("ALTER TABLE show RENAME TO {}".format(name))
+    for constraint in CONSTRAINTS:
+        op.execute("ALTER TABLE {0} RENAME CONSTRAINT show_{1} TO {0}_{1}".format(name, constraint))
+    for statement in INDEXES:
+        op.execute("DROP INDEX {}".format(statement.split()[2]))
+
+
+def _create_table(start_time, primary_key, partition_by=''):
+    op.execute(
+        "CREATE TABLE show ("
+        "id integer NOT NULL DEFAULT nextval('show_id_seq'::regclass), "
+        "artist_id integer NOT NULL CONSTRAINT show_artist_id_fkey REFERENCES artist (id), "
+        "venue_id integer NOT NULL CONSTRAINT show_venue_id_fkey REFERENCES venue (id), "
+        "start_time timestamp without time zone {}, "
+        "is_upcoming boolean NOT NULL DEFAULT false, "
+        "version integer NOT NULL DEFAULT 1, "
+        "updated_at timestamp without time zone NOT NULL DEFAULT (now() at time zone 'utc'), "
+        "CONSTRAINT show_pkey PRIMARY KEY ({})"
+        "){}".format(start_time, primary_key, partition_by))
+    op.execute("ALTER SEQUENCE show_id_seq OWNED BY show.id")
+
+
+def _next_month(month):
+    return datetime(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def upgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    for table in ('venue', 'artist'):
+        op.execute(
+            "UPDATE {table} SET past_shows_count = past_shows_count - ("
+            "SELECT count(*) FROM show WHERE show.{table}_id = {table}.id AND show.start_time IS NULL) "
+            "WHERE id IN (SELECT {table}_id FROM show WHERE start_time IS NULL)".format(table=table))
+    op.execute("DELETE FROM show WHERE start_time IS NULL")
+
+    _rename_table('show_unpartitioned')
+
+    _create_table('NOT NULL', 'id, start_time', ' PARTITION BY RANGE (start_time)')
+    op.execute("CREATE TABLE show_default PARTITION OF show DEFAULT")
+
+    # start_time is naive local time, see partitions.py.
+    now = datetime.now()
+    month = datetime(now.year, now.month, 1)
+    months = set()
+    for _ in range(13):
+        months.add(month)
+        month = _next_month(month)
+    rows = op.get_bind().execute(sa.text(
+        "SELECT DISTINCT date_trunc('month', start_time) FROM show_unpartitioned"))
+    months.update(row[0] for row in rows)
+    for month in sorted(months):
+        op.execute(
+            "CREATE TABLE show_{:%Y_%m} PARTITION OF show "
+            "FOR VALUES FROM ('{:%Y-%m-%d}') TO ('{:%Y-%m-%d}')".format(month, month, _next_month(month)))
+
+    op.execute("INSERT INTO show ({0}) SELECT {0} FROM show_unpartitioned".format(COLUMNS))
+    op.execute("DROP TABLE show_unpartitioned")
+    for statement in INDEXES:
+        op.execute(statement)
+    op.execute("ANALYZE show")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    _rename_table('show_partitioned')
+
+    _create_table('', 'id')
+    op.execute("INSERT INTO show ({0}) SELECT {0} FROM show_partitioned".format(COLUMNS))
+    op.execute("DROP TABLE show_partitioned")
+    for statement in INDEXES:
+        op.execute(statement)
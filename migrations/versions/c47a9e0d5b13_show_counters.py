@@ -0,0 +1,42 @@
+"""stored upcoming/past show counters on venue and artist
+
+Revision ID: c47a9e0d5b13
+Revises: 8b2e4d7c1a90
+Create Date: 2026-10-18 12:26:51.880342
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c47a9e0d5b13'
+down_revision = '8b2e4d7c1a90'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('show', sa.Column('is_upcoming', sa.Boolean(), server_default=sa.false(), nullable=False))
+    for table in ('venue', 'artist'):
+        op.add_column(table, sa.Column('upcoming_shows_count', sa.Integer(), server_default='0', nullable=False))
+        op.add_column(table, sa.Column('past_shows_count', sa.Integer(), server_default='0', nullable=False))
+    op.create_index('ix_show_upcoming_start_time', 'show', ['start_time'], unique=False, postgresql_where=sa.text('is_upcoming'))
+
+    # Backfill from the existing shows.
+    # Shows without a start_time count as past, as in counters.check_counts.
+    op.execute("UPDATE show SET is_upcoming = COALESCE(start_time > CURRENT_TIMESTAMP, false)")
+    for table in ('venue', 'artist'):
+        op.execute(
+            "UPDATE {table} SET "
+            "upcoming_shows_count = (SELECT count(*) FROM show WHERE show.{table}_id = {table}.id AND show.is_upcoming), "
+            "past_shows_count = (SELECT count(*) FROM show WHERE show.{table}_id = {table}.id AND NOT show.is_upcoming)"
+            .format(table=table))
+
+
+def downgrade():
+    op.drop_index('ix_show_upcoming_start_time', table_name='show')
+    for table in ('artist', 'venue'):
+        op.drop_column(table, 'past_shows_count')
+        op.drop_column(table, 'upcoming_shows_count')
+    op.drop_column('show', 'is_upcoming')
@@ -0,0 +1,62 @@
+"""cascade show deletes and add show_archive
+
+Revision ID: d81f4a6b2c57
+Revises: b7e24d90c3f1
+Create Date: 2026-10-18 18:32:17.204518
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd81f4a6b2c57'
+down_revision = 'b7e24d90c3f1'
+branch_labels = None
+depends_on = None
+
+
+def _show_foreign_keys(ondelete):
+    for column, table in (('artist_id', 'artist'), ('venue_id', 'venue')):
+        name = 'show_{}_fkey'.format(column)
+        op.drop_constraint(name, 'show', type_='foreignkey')
+        op.create_foreign_key(name, 'show', table, [column], ['id'], ondelete=ondelete)
+
+
+def upgrade():
+    _show_foreign_keys('CASCADE')
+
+    op.create_table('show_archive',
+        sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('artist_id', sa.Integer(), nullable=False),
+        sa.Column('venue_id', sa.Integer(), nullable=False),
+        sa.Column('start_time', sa.DateTime(), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.Column('archived_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['artist_id'], ['artist.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['venue_id'], ['venue.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_show_archive_venue_id_start_time', 'show_archive', ['venue_id', 'start_time'], unique=False)
+    op.create_index('ix_show_archive_artist_id_start_time', 'show_archive', ['artist_id', 'start_time'], unique=False)
+    op.create_index('ix_show_archive_start_time_id', 'show_archive', ['start_time', 'id'], unique=False)
+
+
+def downgrade():
+    # Archived shows go back into show, and onto the past counters.
+    op.execute(
+        "INSERT INTO show (id, artist_id, venue_id, start_time, is_upcoming, version, updated_at) "
+        "SELECT id, artist_id, venue_id, start_time, false, version, updated_at FROM show_archive")
+    for table in ('venue', 'artist'):
+        op.execute(
+            "UPDATE {table} SET past_shows_count = past_shows_count + ("
+            "SELECT count(*) FROM show_archive WHERE show_archive.{table}_id = {table}.id) "
+            "WHERE id IN (SELECT {table}_id FROM show_archive)".format(table=table))
+
+    op.drop_index('ix_show_archive_start_time_id', table_name='show_archive')
+    op.drop_index('ix_show_archive_artist_id_start_time', table_name='show_archive')
+    op.drop_index('ix_show_archive_venue_id_start_time', table_name='show_archive')
+    op.drop_table('show_archive')
+
+    _show_foreign_keys(None)
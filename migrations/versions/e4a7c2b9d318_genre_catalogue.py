@@ -0,0 +1,74 @@
+"""genre catalogue with venue and artist links
+
+Revision ID: e4a7c2b9d318
+Revises: 9c3e5a1d7f24
+Create Date: 2026-10-18 20:06:12.840175
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4a7c2b9d318'
+down_revision = '9c3e5a1d7f24'
+branch_labels = None
+depends_on = None
+
+
+# The catalogue starts with the genres the forms offered, plus every other
+# name found in the venue and artist genre arrays, which are then linked
+# and counted. The arrays stay as they are (see genres.py).
+#
+# GENRES is genres.DEFAULT_GENRES as it was at this revision, copied so the
+# migration does not import app code: later edits to the app's list must
+# not change what this revision seeds. Do not update it.
+
+GENRES = (
+    'Alternative', 'Blues', 'Classical', 'Country', 'Electronic', 'Folk',
+    'Funk', 'Hip-Hop', 'Heavy Metal', 'Instrumental', 'Jazz',
+    'Musical Theatre', 'Pop', 'Punk', 'R&B', 'Reggae', 'Rock n Roll', 'Soul',
+    'Other'
+)
+
+
+def upgrade():
+    genre = op.create_table('genre',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=120), nullable=False),
+        sa.Column('venue_count', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('artist_count', sa.Integer(), server_default='0', nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('name')
+    )
+    for table in ('venue', 'artist'):
+        op.create_table('{}_genre'.format(table),
+            sa.Column('genre_id', sa.Integer(), nullable=False),
+            sa.Column('{}_id'.format(table), sa.Integer(), nullable=False),
+            sa.ForeignKeyConstraint(['genre_id'], ['genre.id'], ondelete='CASCADE'),
+            sa.ForeignKeyConstraint(['{}_id'.format(table)], ['{}.id'.format(table)], ondelete='CASCADE'),
+            sa.PrimaryKeyConstraint('genre_id', '{}_id'.format(table))
+        )
+        op.create_index('ix_{0}_genre_{0}_id'.format(table), '{}_genre'.format(table), ['{}_id'.format(table)], unique=False)
+
+    op.bulk_insert(genre, [{'name': name} for name in GENRES])
+
+    # Backfill from the arrays.
+    for table in ('venue', 'artist'):
+        op.execute(
+            "INSERT INTO genre (name) SELECT DISTINCT unnest(genres) FROM {table} "
+            "ON CONFLICT (name) DO NOTHING".format(table=table))
+        op.execute(
+            "INSERT INTO {table}_genre (genre_id, {table}_id) "
+            "SELECT DISTINCT genre.id, {table}.id FROM {table} "
+            "JOIN genre ON genre.name = ANY ({table}.genres)".format(table=table))
+        op.execute(
+            "UPDATE genre SET {table}_count = ("
+            "SELECT count(*) FROM {table}_genre WHERE {table}_genre.genre_id = genre.id)".format(table=table))
+
+
+def downgrade():
+    for table in ('artist', 'venue'):
+        op.drop_index('ix_{0}_genre_{0}_id'.format(table), table_name='{}_genre'.format(table))
+        op.drop_table('{}_genre'.format(table))
+    op.drop_table('genre')
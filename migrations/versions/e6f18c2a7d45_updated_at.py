@@ -0,0 +1,32 @@
+"""updated_at timestamps on venue, artist and show
+
+Revision ID: e6f18c2a7d45
+Revises: 5d90b3e8f2c6
+Create Date: 2026-10-18 14:22:36.650172
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e6f18c2a7d45'
+down_revision = '5d90b3e8f2c6'
+branch_labels = None
+depends_on = None
+
+
+# Timestamps are naive UTC, as written by the models. The server default
+# backfills existing rows and covers rows inserted outside the ORM.
+
+def upgrade():
+    for table in ('venue', 'artist', 'show'):
+        op.add_column(table, sa.Column('updated_at', sa.DateTime(), nullable=False,
+            server_default=sa.text("(now() at time zone 'utc')")))
+        op.create_index(op.f('ix_{}_updated_at'.format(table)), table, ['updated_at'], unique=False)
+
+
+def downgrade():
+    for table in ('show', 'artist', 'venue'):
+        op.drop_index(op.f('ix_{}_updated_at'.format(table)), table_name=table)
+        op.drop_column(table, 'updated_at')
@@ -0,0 +1,30 @@
+"""external catalogue keys on venue and artist
+
+Revision ID: f2b7d06c9e38
+Revises: e6f18c2a7d45
+Create Date: 2026-10-18 15:08:52.471920
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2b7d06c9e38'
+down_revision = 'e6f18c2a7d45'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('venue', sa.Column('external_id', sa.String(length=120), nullable=True))
+    op.create_unique_constraint('venue_external_id_key', 'venue', ['external_id'])
+    op.add_column('artist', sa.Column('external_id', sa.String(length=120), nullable=True))
+    op.create_unique_constraint('artist_external_id_key', 'artist', ['external_id'])
+
+
+def downgrade():
+    op.drop_constraint('artist_external_id_key', 'artist', type_='unique')
+    op.drop_column('artist', 'external_id')
+    op.drop_constraint('venue_external_id_key', 'venue', type_='unique')
+    op.drop_column('venue', 'external_id')
@@ -1,14 +1,35 @@
-from flask import current_app
-from flask_sqlalchemy import SQLAlchemy
+from datetime import datetime, timedelta
 
-db = SQLAlchemy()
+from sqlalchemy.orm import load_only, noload, raiseload
+
+from routing import RoutingSQLAlchemy
+
+db = RoutingSQLAlchemy()
+
+#----------------------------------------------------------------------------#
+# Loading profiles.
+#----------------------------------------------------------------------------#
+
+class LoadingProfiles(object):
+    # Named sets of loader options, so each route loads only the columns and
+    # relationships it renders, e.g. Artist.profile('list').all().
+    loading_profiles = {}
+
+    @classmethod
+    def profile(cls, name):
+        return cls.query.options(*cls.loading_profiles[name])
 
 #----------------------------------------------------------------------------#
 # Models.
 #----------------------------------------------------------------------------#
 
-class Venue(db.Model):
+class Venue(LoadingProfiles, db.Model):
     __tablename__ = 'venue'
+    __table_args__ = (
+        db.Index('ix_venue_name_trgm', 'name', postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'}),
+        db.Index('ix_venue_city_trgm', 'city', postgresql_using='gin', postgresql_ops={'city': 'gin_trgm_ops'}),
+        db.Index('ix_venue_state_city_name', 'state', 'city', 'name'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String)
@@ -16,49 +37,164 @@ class Venue(db.Model):
     state = db.Column(db.String(120))
     address = db.Column(db.String(120))
     phone = db.Column(db.String(120))
-    genres = db.Column(db.ARRAY(db.String), nullable=True)
+    genres = db.Column(db.ARRAY(db.String).with_variant(db.JSON, 'sqlite'), nullable=True)
     facebook_link = db.Column(db.String(120))
     image_link = db.Column(db.String(500))
     website_link = db.Column(db.String(120))
     seeking_talent = db.Column(db.Boolean, default=False)
     seeking_description = db.Column(db.String(500))
-    shows_venue = db.relationship('Show', backref='venue', lazy="joined", cascade="all, delete")
+    # Key of the row in the partner catalogue it was imported from (see importer.py).
+    external_id = db.Column(db.String(120), unique=True)
+    # Set together by geo.py; grid_cell is the proximity search index.
+    latitude = db.Column(db.Float)
+    longitude = db.Column(db.Float)
+    grid_cell = db.Column(db.Integer, index=True)
+    # Maintained by counters.py; never assign directly.
+    upcoming_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    past_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # Bumped by every UPDATE of the row, including the bulk counter updates.
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1', onupdate=db.literal_column('version + 1'))
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+    # Shows are deleted by the database (ON DELETE CASCADE), never loaded for it.
+    shows_venue = db.relationship('Show', backref='venue', lazy="select", cascade="all, delete", passive_deletes=True)
 
     def __repr__(self):
         return f'<Venue ID: {self.id}, name:{self.name}, city:{self.city}, state:{self.state}, address:{self.address}, phone:{self.phone}, genres:{self.genres},facebook_link:{self.facebook_link}, image_link:{self.image_link}, website_link:{self.website_link}, seeking_talent:{self.seeking_talent}, seeking_description:{self.seeking_description}>'
 
     # Done: implement any missing fields, as a database migration using Flask-Migrate
 
-class Artist(db.Model):
+class Artist(LoadingProfiles, db.Model):
     __tablename__ = 'artist'
+    __table_args__ = (
+        db.Index('ix_artist_name_trgm', 'name', postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'}),
+        db.Index('ix_artist_city_trgm', 'city', postgresql_using='gin', postgresql_ops={'city': 'gin_trgm_ops'}),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String)
     city = db.Column(db.String(120))
     state = db.Column(db.String(120))
     phone = db.Column(db.String(120))
-    genres = db.Column(db.ARRAY(db.String), nullable=True)
+    genres = db.Column(db.ARRAY(db.String).with_variant(db.JSON, 'sqlite'), nullable=True)
     facebook_link = db.Column(db.String(120))
     image_link = db.Column(db.String(500))
     website_link = db.Column(db.String(120))
     seeking_description = db.Column(db.String(500))
     seeking_venue = db.Column(db.Boolean, default=False)
-    shows_artist = db.relationship('Show', backref='artist', lazy="joined", cascade="all, delete")
+    # Key of the row in the partner catalogue it was imported from (see importer.py).
+    external_id = db.Column(db.String(120), unique=True)
+    # Maintained by counters.py; never assign directly.
+    upcoming_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    past_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # Bumped by every UPDATE of the row, including the bulk counter updates.
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1', onupdate=db.literal_column('version + 1'))
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+    # Shows are deleted by the database (ON DELETE CASCADE), never loaded for it.
+    shows_artist = db.relationship('Show', backref='artist', lazy="select", cascade="all, delete", passive_deletes=True)
 
     def __repr__(self):
         return f'<Artist ID: {self.id}, name:{self.name}, city:{self.city}, state:{self.state}, phone:{self.phone}, genres:{self.genres}, facebook_link:{self.facebook_link}, image_link:{self.image_link}, website_link:{self.website_link}, seeking_venue:{self.seeking_venue}, seeking_description:{self.seeking_description}>'
 
     # DONE: implement any missing fields, as a database migration using Flask-Migrate
 
+class Genre(db.Model):
+    # The genre catalogue. Venue.genres and Artist.genres keep the names for
+    # display; venue_genre and artist_genre index them for browsing (see
+    # genres.py, which keeps both in step along with the counts).
+    __tablename__ = 'genre'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(120), nullable=False, unique=True)
+    # Maintained by genres.py; never assign directly.
+    venue_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    artist_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+    def __repr__(self):
+        return f'<Genre ID: {self.id}, name:{self.name}>'
+
+# Keyed genre first, so browsing a genre is a range of the primary key.
+venue_genre = db.Table('venue_genre',
+    db.Column('genre_id', db.Integer, db.ForeignKey('genre.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('venue_id', db.Integer, db.ForeignKey('venue.id', ondelete='CASCADE'), primary_key=True, index=True)
+)
+
+artist_genre = db.Table('artist_genre',
+    db.Column('genre_id', db.Integer, db.ForeignKey('genre.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('artist_id', db.Integer, db.ForeignKey('artist.id', ondelete='CASCADE'), primary_key=True, index=True)
+)
+
+# Bounds of Show.duration_minutes; bookings.py relies on the maximum to keep
+# its overlap check to a bounded index range.
+DEFAULT_SHOW_DURATION_MINUTES = 120
+MAX_SHOW_DURATION_MINUTES = 24 * 60
+
 # DONE Implement Show and Artist models, and complete all model relationships and properties, as a database migration.
 class Show(db.Model):
     __tablename__ = 'show'
+    __table_args__ = (
+        db.Index('ix_show_venue_id_start_time', 'venue_id', 'start_time'),
+        db.Index('ix_show_artist_id_start_time', 'artist_id', 'start_time'),
+        db.Index('ix_show_start_time_id', 'start_time', 'id'),
+        db.Index('ix_show_upcoming_start_time', 'start_time', postgresql_where=db.text('is_upcoming')),
+        db.CheckConstraint(
+            'duration_minutes BETWEEN 1 AND {}'.format(MAX_SHOW_DURATION_MINUTES), name='ck_show_duration_minutes'),
+    )
 
+    # On PostgreSQL the table is partitioned by month on start_time (see
+    # partitions.py), which makes its primary key (id, start_time) there;
+    # ids still come from one sequence, so id alone identifies a show.
     id = db.Column(db.Integer, primary_key=True)
-    artist_id = db.Column(db.Integer, db.ForeignKey('artist.id'), nullable=False)
-    venue_id = db.Column(db.Integer, db.ForeignKey('venue.id'), nullable=False)
-    start_time = db.Column(db.DateTime, nullable=True)
+    artist_id = db.Column(db.Integer, db.ForeignKey('artist.id', ondelete='CASCADE'), nullable=False)
+    venue_id = db.Column(db.Integer, db.ForeignKey('venue.id', ondelete='CASCADE'), nullable=False)
+    start_time = db.Column(db.DateTime, nullable=False)
+    duration_minutes = db.Column(db.Integer, nullable=False, default=DEFAULT_SHOW_DURATION_MINUTES,
+                                 server_default=str(DEFAULT_SHOW_DURATION_MINUTES))
+    # Whether the show is counted in its venue's and artist's upcoming_shows_count.
+    is_upcoming = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())
+    # Bumped by every UPDATE of the row, including the bulk counter updates.
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1', onupdate=db.literal_column('version + 1'))
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+
+    @property
+    def end_time(self):
+        return self.start_time + timedelta(minutes=self.duration_minutes)
 
     def __repr__(self):
         return f'<Show_ID:{self.id}, artist_id:{self.artist_id}, venue_id:{self.venue_id}>'
 
+class ShowArchive(db.Model):
+    # Past shows moved out of show by archive.py, keeping their ids. They
+    # are no longer counted in past_shows_count nor listed on the pages.
+    __tablename__ = 'show_archive'
+    __table_args__ = (
+        db.Index('ix_show_archive_venue_id_start_time', 'venue_id', 'start_time'),
+        db.Index('ix_show_archive_artist_id_start_time', 'artist_id', 'start_time'),
+        db.Index('ix_show_archive_start_time_id', 'start_time', 'id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    artist_id = db.Column(db.Integer, db.ForeignKey('artist.id', ondelete='CASCADE'), nullable=False)
+    venue_id = db.Column(db.Integer, db.ForeignKey('venue.id', ondelete='CASCADE'), nullable=False)
+    start_time = db.Column(db.DateTime, nullable=False)
+    duration_minutes = db.Column(db.Integer, nullable=False)
+    version = db.Column(db.Integer, nullable=False)
+    updated_at = db.Column(db.DateTime, nullable=False)
+    archived_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<ShowArchive_ID:{self.id}, artist_id:{self.artist_id}, venue_id:{self.venue_id}>'
+
+# list:   id and name only, for the listing pages
+# detail: every column; show lists are loaded separately by the detail pages
+# edit:   every column; shows are never needed and must not be lazy loaded
+Venue.loading_profiles = {
+    'list': (load_only(Venue.id, Venue.name), noload(Venue.shows_venue)),
+    'detail': (noload(Venue.shows_venue),),
+    'edit': (raiseload(Venue.shows_venue),),
+}
+
+Artist.loading_profiles = {
+    'list': (load_only(Artist.id, Artist.name), noload(Artist.shows_artist)),
+    'detail': (noload(Artist.shows_artist),),
+    'edit': (raiseload(Artist.shows_artist),),
+}
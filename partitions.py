@@ -0,0 +1,124 @@
+from datetime import datetime
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import text
+
+from models import db
+
+#----------------------------------------------------------------------------#
+# Show partitions.
+#----------------------------------------------------------------------------#
+
+# On PostgreSQL show is partitioned by month on start_time (see the
+# partitioning migration): show_YYYY_MM holds the shows starting that month
+# and show_default anything outside the existing partitions. Queries bounded
+# on start_time, like the calendar API, only scan the partitions they need.
+#
+# ensure_show_partitions keeps partitions ahead of time and is meant to run
+# daily from cron (`flask partitions ensure`). It also splits out of
+# show_default any month that has landed there, e.g. from an import of old
+# shows. drop_empty_partitions removes the months emptied by the show
+# archival (see archive.py). Both take an advisory lock, so concurrent runs
+# do not collide.
+#
+# show.start_time is naive local time (like datetime.now() in counters.py and
+# archive.py), so the current month is taken from the local clock too; near
+# the turn of a month a UTC clock would pick the wrong month.
+
+PARTITION_LOCK = 'show_partitions'
+
+def month_start(moment):
+    return datetime(moment.year, moment.month, 1)
+
+def next_month(month):
+    return datetime(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+def partition_name(month):
+    return 'show_{:%Y_%m}'.format(month)
+
+def show_partitions(connection):
+    return {name for name, in connection.execute(text(
+        "SELECT child.relname FROM pg_inherits "
+        "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+        "WHERE pg_inherits.inhparent = 'show'::regclass"))}
+
+def create_month_partition(connection, month):
+    # Rows of this month already in show_default would violate the new
+    # partition's bounds, so they are moved out and back in around it.
+    bounds = {'start': month, 'end': next_month(month)}
+    connection.execute(text(
+        "CREATE TEMPORARY TABLE show_moving ON COMMIT DROP AS "
+        "SELECT * FROM show_default WHERE start_time >= :start AND start_time < :end"), bounds)
+    connection.execute(text(
+        "DELETE FROM show_default WHERE start_time >= :start AND start_time < :end"), bounds)
+    connection.execute(text(
+        "CREATE TABLE {} PARTITION OF show FOR VALUES FROM ('{:%Y-%m-%d}') TO ('{:%Y-%m-%d}')".format(
+            partition_name(month), bounds['start'], bounds['end'])))
+    connection.execute(text("INSERT INTO show SELECT * FROM show_moving"))
+    connection.execute(text("DROP TABLE show_moving"))
+
+def _lock(connection):
+    connection.execute(text("SELECT pg_advisory_xact_lock(hashtext(:lock))"), {'lock': PARTITION_LOCK})
+
+def ensure_show_partitions(connection, months_ahead=12, now=None):
+    # Creates the partitions of the current month, the next `months_ahead`
+    # months and every month found in show_default. Returns their names.
+    if connection.dialect.name != 'postgresql':
+        return []
+    _lock(connection)
+
+    month = month_start(now or datetime.now())
+    months = set()
+    for _ in range(months_ahead + 1):
+        months.add(month)
+        month = next_month(month)
+    months.update(month for month, in connection.execute(text(
+        "SELECT DISTINCT date_trunc('month', start_time) FROM show_default")))
+
+    existing = show_partitions(connection)
+    created = []
+    for month in sorted(months):
+        if partition_name(month) not in existing:
+            create_month_partition(connection, month)
+            created.append(partition_name(month))
+    return created
+
+def drop_empty_partitions(connection, before):
+    # Drops the empty partitions of the months ending on or before `before`.
+    # Returns their names. Dropping a partition locks show itself, so it is
+    # locked up front (briefly blocking show queries) rather than after the
+    # partitions, which could deadlock with concurrent inserts.
+    if connection.dialect.name != 'postgresql':
+        return []
+    _lock(connection)
+
+    candidates = sorted(
+        name for name in show_partitions(connection)
+        if name != 'show_default' and next_month(datetime.strptime(name, 'show_%Y_%m')) <= before)
+    if not candidates:
+        return []
+    connection.execute(text("LOCK TABLE show IN ACCESS EXCLUSIVE MODE"))
+
+    dropped = []
+    for name in candidates:
+        if connection.execute(text("SELECT NOT EXISTS (SELECT 1 FROM {})".format(name))).scalar():
+            connection.execute(text("DROP TABLE {}".format(name)))
+            dropped.append(name)
+    return dropped
+
+#----------------------------------------------------------------------------#
+# Commands.
+#----------------------------------------------------------------------------#
+
+partitions_cli = AppGroup('partitions', help='Maintain the monthly show partitions.')
+
+@partitions_cli.command('ensure')
+@click.option('--months-ahead', default=12, show_default=True, help='Months to create beyond the current one.')
+def ensure_command(months_ahead):
+    '''Create missing show partitions ahead of time.'''
+    with db.engine.begin() as connection:
+        created = ensure_show_partitions(connection, months_ahead)
+    for name in created:
+        click.echo('Created {}.'.format(name))
+    click.echo('{} partitions created.'.format(len(created)))
@@ -0,0 +1,100 @@
+import os
+import threading
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.pool import QueuePool
+
+#----------------------------------------------------------------------------#
+# Connection pool.
+#----------------------------------------------------------------------------#
+
+# The engine uses TimedQueuePool, a QueuePool that also records how long
+# checkouts wait for a connection (including opening a new one when the pool
+# is below its limit) and how many give up after pool_timeout. pool_stats()
+# reports those numbers together with the pool's current occupancy.
+#
+# Pools are per process: under gunicorn each worker reports its own.
+
+class CheckoutStats(object):
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, waited, timed_out=False):
+        with self._lock:
+            self.checkouts += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+            if timed_out:
+                self.timeouts += 1
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                'checkouts': self.checkouts,
+                'timeouts': self.timeouts,
+                'wait_total_ms': round(self.wait_total * 1000, 3),
+                'wait_mean_ms': round(self.wait_total * 1000 / self.checkouts, 3) if self.checkouts else None,
+                'wait_max_ms': round(self.wait_max * 1000, 3)
+            }
+
+
+class TimedQueuePool(QueuePool):
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkout_stats = CheckoutStats()
+        # QueuePool._do_get calls itself when it loses a race for a slot;
+        # only the outermost call is timed.
+        self._timing = threading.local()
+
+    def _do_get(self):
+        if getattr(self._timing, 'active', False):
+            return super()._do_get()
+
+        self._timing.active = True
+        started = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            self._timing.active = False
+            self.checkout_stats.record(time.perf_counter() - started, timed_out)
+
+
+def init_pool(app):
+    # Call before the engine is first used. SQLite keeps SQLAlchemy's
+    # default pool, which takes none of the sizing options.
+    if app.config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite'):
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {}
+    else:
+        app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', {})['poolclass'] = TimedQueuePool
+
+
+def pool_stats(engine):
+    pool = engine.pool
+    stats = {
+        'pid': os.getpid(),
+        'pool': type(pool).__name__
+    }
+    if isinstance(pool, QueuePool):
+        stats.update({
+            'size': pool.size(),
+            'checked_out': pool.checkedout(),
+            'idle': pool.checkedin(),
+            # overflow() counts up from -size as connections are opened.
+            'overflow': max(pool.overflow(), 0),
+            'max_overflow': pool._max_overflow,
+            'timeout': pool.timeout()
+        })
+    if isinstance(pool, TimedQueuePool):
+        stats.update(pool.checkout_stats.as_dict())
+    return stats
@@ -0,0 +1,337 @@
+from datetime import datetime
+
+from sqlalchemy import and_, case, func, or_, select
+
+from models import db, Venue, Artist, Show, Genre, venue_genre, artist_genre
+from summaries import area_summary
+
+#----------------------------------------------------------------------------#
+# Loaders.
+#----------------------------------------------------------------------------#
+
+# Each loader returns plain dicts shaped the way the templates in
+# templates/pages expect them, so controllers only pass the result through.
+# Loaders run on db.session unless given another `session`, e.g. the sync
+# session of an AsyncSession.run_sync call (see asgi.py).
+
+def load_venue_areas(session=None):
+    # Venues grouped by (city, state) with their upcoming show counts, read
+    # from the precomputed area summary (see summaries.py): one row per area.
+    session = session or db.session
+    rows = session.execute(select(
+        area_summary.c.city,
+        area_summary.c.state,
+        area_summary.c.venues
+    ).order_by(
+        area_summary.c.state, area_summary.c.city
+    )).all()
+
+    return [{
+        'city': row.city,
+        'state': row.state,
+        'venues': row.venues
+    } for row in rows]
+
+def _split_shows(rows, now, show_data):
+    # Splits the (entity, show columns...) rows of a detail query into past
+    # and upcoming shows in one pass. Rows come ordered by start_time, so
+    # upcoming shows are soonest first and past shows most recent first.
+    past_shows, upcoming_shows = [], []
+    for row in rows:
+        if row.start_time is None:
+            continue
+        if row.start_time > now:
+            upcoming_shows.append(show_data(row))
+        else:
+            past_shows.append(show_data(row))
+    past_shows.reverse()
+    return past_shows, upcoming_shows
+
+def load_venue_detail(venue_id, now=None, session=None):
+    # The venue page: the venue, its shows and each show's artist come back
+    # from a single statement bounded to this venue. Returns None if there
+    # is no such venue.
+    now = now or datetime.now()
+    session = session or db.session
+
+    rows = session.query(
+        Venue,
+        Show.start_time,
+        Artist.id.label('artist_id'),
+        Artist.name.label('artist_name'),
+        Artist.image_link.label('artist_image_link')
+    ).outerjoin(
+        Show, Show.venue_id == Venue.id
+    ).outerjoin(
+        Artist, Artist.id == Show.artist_id
+    ).filter(
+        Venue.id == venue_id
+    ).options(
+        *Venue.loading_profiles['detail']
+    ).order_by(Show.start_time).all()
+
+    if not rows:
+        return None
+    venue = rows[0].Venue
+
+    past_shows, upcoming_shows = _split_shows(rows, now, lambda row: {
+        'artist_id': row.artist_id,
+        'artist_name': row.artist_name,
+        'artist_image_link': row.artist_image_link,
+        'start_time': row.start_time
+    })
+
+    return {
+        'id': venue.id,
+        'name': venue.name,
+        'genres': venue.genres,
+        'city': venue.city,
+        'state': venue.state,
+        'address': venue.address,
+        'phone': venue.phone,
+        'website': venue.website_link,
+        'facebook_link': venue.facebook_link,
+        'image_link': venue.image_link,
+        'seeking_talent': venue.seeking_talent,
+        'seeking_description': venue.seeking_description,
+        'past_shows': past_shows,
+        'upcoming_shows': upcoming_shows,
+        'past_shows_count': len(past_shows),
+        'upcoming_shows_count': len(upcoming_shows)
+    }
+
+def load_artist_detail(artist_id, now=None, session=None):
+    # The artist page, loaded the same way as load_venue_detail: the artist,
+    # its shows and the venue of each show in one statement.
+    now = now or datetime.now()
+    session = session or db.session
+
+    rows = session.query(
+        Artist,
+        Show.start_time,
+        Venue.id.label('venue_id'),
+        Venue.name.label('venue_name'),
+        Venue.image_link.label('venue_image_link')
+    ).outerjoin(
+        Show, Show.artist_id == Artist.id
+    ).outerjoin(
+        Venue, Venue.id == Show.venue_id
+    ).filter(
+        Artist.id == artist_id
+    ).options(
+        *Artist.loading_profiles['detail']
+    ).order_by(Show.start_time).all()
+
+    if not rows:
+        return None
+    artist = rows[0].Artist
+
+    past_shows, upcoming_shows = _split_shows(rows, now, lambda row: {
+        'venue_id': row.venue_id,
+        'venue_name': row.venue_name,
+        'venue_image_link': row.venue_image_link,
+        'start_time': row.start_time
+    })
+
+    return {
+        'id': artist.id,
+        'name': artist.name,
+        'city': artist.city,
+        'state': artist.state,
+        'genres': artist.genres,
+        'phone': artist.phone,
+        'website_link': artist.website_link,
+        'facebook_link': artist.facebook_link,
+        'image_link': artist.image_link,
+        'seeking_venue': artist.seeking_venue,
+        'seeking_description': artist.seeking_description,
+        'past_shows': past_shows,
+        'upcoming_shows': upcoming_shows,
+        'past_shows_count': len(past_shows),
+        'upcoming_shows_count': len(upcoming_shows)
+    }
+
+def load_artists(session=None):
+    # The artist listing: only the columns the page renders.
+    session = session or db.session
+    return session.query(Artist).options(
+        *Artist.loading_profiles['list']
+    ).order_by(Artist.name).all()
+
+#----------------------------------------------------------------------------#
+# Genres.
+#----------------------------------------------------------------------------#
+
+def load_genres(session=None):
+    session = session or db.session
+    return session.query(Genre).order_by(Genre.name).all()
+
+def load_genre_page(name, state=None, city=None, limit=100, session=None):
+    # A genre with up to `limit` of its venues and of its artists, optionally
+    # only those in `state` and `city`. Both lists are read through the
+    # genre's range of venue_genre / artist_genre rather than the arrays.
+    # Returns None if there is no such genre.
+    session = session or db.session
+    genre = session.query(Genre).filter(Genre.name == name).first()
+    if genre is None:
+        return None
+
+    page = {
+        'name': genre.name,
+        'venue_count': genre.venue_count,
+        'artist_count': genre.artist_count,
+        'state': state,
+        'city': city,
+        'limit': limit
+    }
+    for key, model, link, column in (('venues', Venue, venue_genre, venue_genre.c.venue_id),
+                                     ('artists', Artist, artist_genre, artist_genre.c.artist_id)):
+        query = session.query(
+            model.id, model.name, model.city, model.state, model.upcoming_shows_count
+        ).join(link, column == model.id).filter(link.c.genre_id == genre.id)
+        if state:
+            query = query.filter(model.state == state)
+        if city:
+            query = query.filter(model.city == city)
+        page[key] = query.order_by(model.name, model.id).limit(limit).all()
+    return page
+
+#----------------------------------------------------------------------------#
+# Shows.
+#----------------------------------------------------------------------------#
+
+# The /shows feed is ordered by (start_time, id) descending and paginated
+# with keyset cursors instead of offsets, so fetching any page costs the
+# same whatever its position in the feed.
+
+def encode_cursor(start_time, show_id):
+    return '{},{}'.format(start_time.isoformat(), show_id)
+
+def decode_cursor(cursor):
+    # Raises ValueError on malformed cursors.
+    start_time, _, show_id = cursor.rpartition(',')
+    return datetime.fromisoformat(start_time), int(show_id)
+
+def load_shows_page(after=None, before=None, per_page=30, session=None):
+    # A page of shows with their venue and artist columns fetched in the
+    # same statement. `after` pages towards older shows and `before`
+    # towards newer ones; both are cursors produced by encode_cursor.
+    session = session or db.session
+    query = session.query(
+        Show.id,
+        Show.start_time,
+        Venue.id.label('venue_id'),
+        Venue.name.label('venue_name'),
+        Artist.id.label('artist_id'),
+        Artist.name.label('artist_name'),
+        Artist.image_link.label('artist_image_link')
+    ).join(
+        Venue, Show.venue_id == Venue.id
+    ).join(
+        Artist, Show.artist_id == Artist.id
+    ).filter(
+        Show.start_time.isnot(None)
+    )
+
+    if before is not None:
+        start_time, show_id = decode_cursor(before)
+        query = query.filter(or_(
+            Show.start_time > start_time,
+            and_(Show.start_time == start_time, Show.id > show_id)
+        )).order_by(Show.start_time.asc(), Show.id.asc())
+    else:
+        if after is not None:
+            start_time, show_id = decode_cursor(after)
+            query = query.filter(or_(
+                Show.start_time < start_time,
+                and_(Show.start_time == start_time, Show.id < show_id)
+            ))
+        query = query.order_by(Show.start_time.desc(), Show.id.desc())
+
+    # One extra row tells us whether there is a further page.
+    rows = query.limit(per_page + 1).all()
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+
+    if before is not None:
+        rows.reverse()
+        has_newer, has_older = has_more, True
+    else:
+        has_newer, has_older = after is not None, has_more
+
+    shows = [{
+        'venue_id': row.venue_id,
+        'venue_name': row.venue_name,
+        'artist_id': row.artist_id,
+        'artist_name': row.artist_name,
+        'artist_image_link': row.artist_image_link,
+        'start_time': row.start_time
+    } for row in rows]
+
+    return {
+        'shows': shows,
+        'prev_cursor': encode_cursor(rows[0].start_time, rows[0].id) if rows and has_newer else None,
+        'next_cursor': encode_cursor(rows[-1].start_time, rows[-1].id) if rows and has_older else None
+    }
+
+#----------------------------------------------------------------------------#
+# Freshness probes.
+#----------------------------------------------------------------------------#
+
+# Each probe is a single aggregate query, much cheaper than the loader of the
+# same page, returning (last_modified, token) where `token` changes whenever
+# the rendered page would. Used by cache.conditional to answer conditional
+# GETs before rendering. A probe returns None if the page's entity is missing.
+# The updated_at columns are indexed, so max(updated_at) is an index lookup.
+
+def _latest(*timestamps):
+    return max((timestamp for timestamp in timestamps if timestamp is not None), default=None)
+
+def probe_venue_areas():
+    # Read from the area summary the page is rendered from, so the validators
+    # only change once a refresh has reached it. A deleted venue lowers the
+    # count even if no other row changed.
+    latest, count = db.session.execute(select(
+        func.max(area_summary.c.updated_at), func.sum(area_summary.c.venue_count))).one()
+    return latest or datetime.min, (latest, count)
+
+def probe_artists():
+    latest, count = db.session.query(func.max(Artist.updated_at), func.count(Artist.id)).one()
+    return latest or datetime.min, (latest, count)
+
+def probe_shows_page():
+    # Deleting shows (with their venue) also updates the counters, and so
+    # the updated_at, of the artists that played there.
+    row = db.session.query(
+        db.session.query(func.max(Show.updated_at)).scalar_subquery(),
+        db.session.query(func.max(Venue.updated_at)).scalar_subquery(),
+        db.session.query(func.max(Artist.updated_at)).scalar_subquery()
+    ).one()
+    return _latest(*row) or datetime.min, tuple(row)
+
+def _probe_detail(model, show_column, other_model, other_column, entity_id, now):
+    # The entity, its shows and the other side of each show; the number of
+    # shows already started changes the past/upcoming split.
+    row = db.session.query(
+        model.updated_at,
+        func.max(Show.updated_at),
+        func.max(other_model.updated_at),
+        func.count(Show.id),
+        func.count(case((Show.start_time <= now, Show.id)))
+    ).outerjoin(
+        Show, show_column == model.id
+    ).outerjoin(
+        other_model, other_model.id == other_column
+    ).filter(
+        model.id == entity_id
+    ).group_by(model.id, model.updated_at).first()
+
+    if row is None:
+        return None
+    return _latest(*row[:3]), tuple(row)
+
+def probe_venue_detail(venue_id, now=None):
+    return _probe_detail(Venue, Show.venue_id, Artist, Show.artist_id, venue_id, now or datetime.now())
+
+def probe_artist_detail(artist_id, now=None):
+    return _probe_detail(Artist, Show.artist_id, Venue, Show.venue_id, artist_id, now or datetime.now())
@@ -0,0 +1,157 @@
+import itertools
+import logging
+import os
+import threading
+import time
+
+from flask import current_app, g, has_request_context, request, session as user_session
+from flask_sqlalchemy import SQLAlchemy, SignallingSession
+from sqlalchemy import event, exc, orm, text
+
+from pooling import pool_stats
+
+#----------------------------------------------------------------------------#
+# Read/write splitting.
+#----------------------------------------------------------------------------#
+
+# With SQLALCHEMY_REPLICA_URIS set, SELECTs issued while serving a GET or
+# HEAD request go to a read replica; every other statement, and everything
+# outside a request (commands, migrations), goes to the primary. A request
+# sticks to one replica, chosen round-robin among those passing their last
+# health check, so its queries see a single snapshot; with no healthy
+# replica it reads from the primary.
+#
+# Read-your-writes: once a request has written, the user's session cookie
+# routes their reads to the primary for READ_YOUR_WRITES_SECONDS, longer
+# than replication is expected to lag. Other users may still read the old
+# rows from a replica during that time, and the page cache can keep such a
+# page for up to PAGE_CACHE_TTL. The cookie is signed with SECRET_KEY, which
+# must therefore be the same in every worker (set it in the environment);
+# with a per-process key, another worker rejects the cookie and reads from
+# a replica.
+
+logger = logging.getLogger('fyyur.routing')
+
+PRIMARY_UNTIL = '_db_primary_until'
+
+
+class Replica(object):
+
+    def __init__(self, bind):
+        self.bind = bind
+        self.healthy = True
+        self.checked_at = None
+
+
+class ReplicaSet(object):
+
+    def __init__(self, db, app, binds, check_interval=10):
+        self.db = db
+        self.app = app
+        self.replicas = [Replica(bind) for bind in binds]
+        self.check_interval = check_interval
+        self._turns = itertools.count()
+        self._lock = threading.Lock()
+        self._by_engine = {}
+
+    def engine(self, replica):
+        engine = self.db.get_engine(self.app, bind=replica.bind)
+        if engine not in self._by_engine:
+            self._by_engine[engine] = replica
+            event.listen(engine, 'handle_error', self._on_error)
+        return engine
+
+    def _on_error(self, context):
+        # A lost connection takes the replica out of rotation until its
+        # next health check.
+        replica = self._by_engine.get(context.engine)
+        if context.is_disconnect and replica is not None:
+            replica.healthy = False
+            replica.checked_at = time.monotonic()
+
+    def _check(self, replica):
+        with self._lock:
+            now = time.monotonic()
+            if replica.checked_at is not None and now - replica.checked_at < self.check_interval:
+                return replica.healthy
+            replica.checked_at = now
+        try:
+            with self.engine(replica).connect() as connection:
+                connection.execute(text('SELECT 1'))
+        except exc.SQLAlchemyError as error:
+            if replica.healthy:
+                logger.warning('replica %s failed its health check: %s', replica.bind, getattr(error, 'orig', None) or error)
+            replica.healthy = False
+        else:
+            if not replica.healthy:
+                logger.info('replica %s is back', replica.bind)
+            replica.healthy = True
+        return replica.healthy
+
+    def choose(self):
+        # The engine of the next healthy replica, or None.
+        start = next(self._turns)
+        for offset in range(len(self.replicas)):
+            replica = self.replicas[(start + offset) % len(self.replicas)]
+            if self._check(replica):
+                return self.engine(replica)
+        return None
+
+    def stats(self):
+        return [dict(pool_stats(self.engine(replica)), bind=replica.bind, healthy=replica.healthy)
+                for replica in self.replicas]
+
+
+class RoutingSession(SignallingSession):
+
+    def get_bind(self, mapper=None, clause=None):
+        if not self._flushing and _is_read(clause):
+            engine = _read_engine(self.app)
+            if engine is not None:
+                return engine
+        elif has_request_context() and (self._flushing or getattr(clause, 'is_dml', False)):
+            g.db_wrote = True
+        return super().get_bind(mapper, clause)
+
+
+class RoutingSQLAlchemy(SQLAlchemy):
+
+    def init_app(self, app):
+        uris = app.config.get('SQLALCHEMY_REPLICA_URIS') or []
+        binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+        names = []
+        for number, uri in enumerate(uris, 1):
+            name = 'replica{}'.format(number)
+            binds[name] = uri
+            names.append(name)
+        app.config['SQLALCHEMY_BINDS'] = binds or None
+        super().init_app(app)
+
+        if names:
+            if 'SECRET_KEY' not in os.environ:
+                logger.warning('SECRET_KEY is not set in the environment; read-your-writes only '
+                               'holds within the worker that served the write')
+            app.extensions['replicas'] = ReplicaSet(
+                self, app, names, app.config.get('REPLICA_HEALTH_CHECK_INTERVAL', 10))
+            app.after_request(_remember_write)
+
+    def create_session(self, options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+
+def _is_read(clause):
+    return getattr(clause, 'is_select', False) and getattr(clause, '_for_update_arg', None) is None
+
+def _read_engine(app):
+    replicas = app.extensions.get('replicas')
+    if replicas is None or not has_request_context() or request.method not in ('GET', 'HEAD'):
+        return None
+    if 'db_read_engine' not in g:
+        recent_write = user_session.get(PRIMARY_UNTIL, 0) > time.time()
+        g.db_read_engine = None if recent_write else replicas.choose()
+    return g.db_read_engine
+
+def _remember_write(response):
+    if g.pop('db_wrote', False):
+        user_session[PRIMARY_UNTIL] = time.time() + current_app.config.get('READ_YOUR_WRITES_SECONDS', 5)
+    return response
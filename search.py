@@ -0,0 +1,48 @@
+import re
+
+from sqlalchemy import func
+
+from models import db, Venue, Artist
+
+#----------------------------------------------------------------------------#
+# Search.
+#----------------------------------------------------------------------------#
+
+# Name search is a case-insensitive substring match. On PostgreSQL the
+# name and city columns carry pg_trgm GIN indexes (see the search indexes
+# migration), which serve ILIKE '%term%' without a sequential scan, and
+# matches are ranked by trigram similarity to the search term.
+
+# "San Francisco, CA" searches by city and state instead of by name.
+AREA_TERM = re.compile(r'^\s*(?P<city>[^,]+?)\s*,\s*(?P<state>[A-Za-z]{2})\s*$')
+
+def _like_pattern(term):
+    escaped = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return '%{}%'.format(escaped)
+
+def _search(model, term, limit, session=None):
+    term = (term or '').strip()
+    dialect = (session.bind if session is not None else db.engine).dialect.name
+    session = session or db.session
+    query = session.query(model.id, model.name, model.upcoming_shows_count, model.version)
+
+    area = AREA_TERM.match(term)
+    if area:
+        query = query.filter(
+            model.city.ilike(_like_pattern(area.group('city')), escape='\\'),
+            model.state == area.group('state').upper())
+        return query.order_by(model.name).limit(limit).all()
+
+    query = query.filter(model.name.ilike(_like_pattern(term), escape='\\'))
+    if dialect == 'postgresql':
+        rank = func.similarity(model.name, term).desc()
+    else:
+        # Without pg_trgm, prefer the shortest names containing the term.
+        rank = func.length(model.name)
+    return query.order_by(rank, model.name).limit(limit).all()
+
+def find_venues(term, limit=50, session=None):
+    return _search(Venue, term, limit, session)
+
+def find_artists(term, limit=50, session=None):
+    return _search(Artist, term, limit, session)
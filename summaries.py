@@ -0,0 +1,157 @@
+import logging
+import threading
+import time
+from itertools import groupby
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import Column, DateTime, Integer, JSON, MetaData, String, Table, event, func, select, text
+
+from models import db, Venue
+
+#----------------------------------------------------------------------------#
+# Venue area summary.
+#----------------------------------------------------------------------------#
+
+# The /venues page lists venues grouped by (city, state). venue_area_summary
+# holds that rollup precomputed, one row per area with its venues as a JSON
+# list, so the page reads a few hundred rows instead of every venue. On
+# PostgreSQL it is a materialized view refreshed CONCURRENTLY (readers are
+# never blocked); elsewhere it is a plain table rebuilt in a transaction.
+#
+# The summary is refreshed:
+#   - a few seconds after venue and show writes, debounced so that a burst
+#     of writes in one process triggers a single refresh (at most
+#     AREA_SUMMARY_REFRESH_MAX_DELAY seconds after its first write),
+#   - by `flask summaries refresh`, meant to run from cron alongside
+#     `flask counts rollover`, which also refreshes it when shows started.
+#
+# The table is not part of db.Model.metadata, so create_all and migration
+# autogenerate leave the materialized view alone.
+
+logger = logging.getLogger('fyyur.summaries')
+
+metadata = MetaData()
+
+area_summary = Table(
+    'venue_area_summary', metadata,
+    Column('state', String(120), primary_key=True),
+    Column('city', String(120), primary_key=True),
+    # [{'id', 'name', 'num_upcoming_shows'}, ...] ordered by name
+    Column('venues', JSON, nullable=False),
+    Column('venue_count', Integer, nullable=False),
+    Column('updated_at', DateTime)
+)
+
+def _rebuild_table(connection):
+    # The same rollup as the materialized view (see its migration).
+    rows = connection.execute(select(
+        func.coalesce(Venue.state, '').label('state'),
+        func.coalesce(Venue.city, '').label('city'),
+        Venue.id,
+        Venue.name,
+        Venue.upcoming_shows_count,
+        Venue.updated_at
+    ).order_by(text('state'), text('city'), Venue.name, Venue.id)).all()
+
+    summaries = []
+    for (state, city), venues in groupby(rows, key=lambda row: (row.state, row.city)):
+        venues = list(venues)
+        summaries.append({
+            'state': state,
+            'city': city,
+            'venues': [{
+                'id': venue.id,
+                'name': venue.name,
+                'num_upcoming_shows': venue.upcoming_shows_count
+            } for venue in venues],
+            'venue_count': len(venues),
+            'updated_at': max(venue.updated_at for venue in venues)
+        })
+
+    connection.execute(area_summary.delete())
+    if summaries:
+        connection.execute(area_summary.insert(), summaries)
+
+def refresh_area_summary(connection):
+    if connection.dialect.name == 'postgresql':
+        connection.execute(text('REFRESH MATERIALIZED VIEW CONCURRENTLY venue_area_summary'))
+    else:
+        _rebuild_table(connection)
+
+@event.listens_for(db.Model.metadata, 'after_create')
+def _create_fallback_table(target, connection, **kw):
+    # create_all (e.g. for a fresh SQLite database) also creates the plain
+    # summary table; on PostgreSQL the migration creates the view.
+    if connection.dialect.name != 'postgresql':
+        area_summary.create(connection, checkfirst=True)
+
+
+class AreaSummaryRefresher(object):
+
+    def __init__(self, app=None):
+        self.app = None
+        self.delay = 5
+        self.max_delay = 30
+        self.listeners = []
+        self._timer = None
+        self._generation = 0
+        self._deadline = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.delay = app.config.get('AREA_SUMMARY_REFRESH_DELAY', 5)
+        self.max_delay = app.config.get('AREA_SUMMARY_REFRESH_MAX_DELAY', 30)
+
+    def refresh(self):
+        # Refreshes now, in its own transaction, then calls the listeners.
+        with db.engine.begin() as connection:
+            refresh_area_summary(connection)
+        for listener in self.listeners:
+            listener()
+
+    def request_refresh(self):
+        # Debounced: every call restarts the timer, so the refresh runs
+        # `delay` seconds after the last write of a burst, but no later than
+        # `max_delay` seconds after the first, so that a steady stream of
+        # writes cannot postpone it forever. Writes that land while a
+        # refresh is running schedule the next one, so none are missed.
+        with self._lock:
+            now = time.monotonic()
+            if self._timer is None:
+                self._deadline = now + self.max_delay
+            else:
+                self._timer.cancel()
+            self._generation += 1
+            self._timer = threading.Timer(max(0, min(self.delay, self._deadline - now)),
+                                          self._run, args=(self._generation,))
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _run(self, generation):
+        with self._lock:
+            # A timer cancelled too late to stop it has been replaced.
+            if generation != self._generation:
+                return
+            self._timer = None
+        with self.app.app_context():
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception('Could not refresh the venue area summary')
+
+#----------------------------------------------------------------------------#
+# Commands.
+#----------------------------------------------------------------------------#
+
+summaries_cli = AppGroup('summaries', help='Maintain precomputed page summaries.')
+
+@summaries_cli.command('refresh')
+def refresh_command():
+    '''Refresh the venue area summary behind the /venues page.'''
+    with db.engine.begin() as connection:
+        refresh_area_summary(connection)
+    click.echo('Refreshed venue_area_summary.')
@@ -0,0 +1,107 @@
+import os
+import sys
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# app.py reads the database URL when it is imported, so point it at a
+# throwaway SQLite file first.
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'fyyur.db')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app as fyyur_app
+from importer import ARTIST_COLUMNS, VENUE_COLUMNS, write_entities, write_shows
+from models import db, Venue, Artist, Show, ShowArchive, Genre, venue_genre, artist_genre
+from summaries import area_summary, refresh_area_summary
+
+#----------------------------------------------------------------------------#
+# Fixtures.
+#----------------------------------------------------------------------------#
+
+@pytest.fixture(scope='session')
+def app():
+    fyyur_app.config.update(TESTING=True, WTF_CSRF_ENABLED=False)
+    with fyyur_app.app_context():
+        db.create_all()
+        yield fyyur_app
+        db.session.remove()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+class Catalogue(object):
+    # Writes venues, artists and shows the way `flask import` does, so the
+    # counters, genre links and area summary are maintained.
+
+    def __init__(self):
+        self.count = 0
+        self.now = datetime.now()
+
+    def _entity(self, model, columns, **values):
+        self.count += 1
+        row = dict.fromkeys(columns)
+        row.update(external_id='test-{}'.format(self.count), name='Test {}'.format(self.count),
+                   genres=['Jazz'], **values)
+        write_entities(model, columns, [row])
+        return db.session.query(model.id).filter(model.external_id == row['external_id']).scalar()
+
+    def venue(self, city='San Francisco', state='CA'):
+        return self._entity(Venue, VENUE_COLUMNS, city=city, state=state, address='1 Main St')
+
+    def artist(self, city='San Francisco', state='CA'):
+        return self._entity(Artist, ARTIST_COLUMNS, city=city, state=state)
+
+    def shows(self, venue_id, artist_id, upcoming=0, past=0):
+        # One show a day, starting from tomorrow or from yesterday.
+        starts = ([self.now + timedelta(days=day + 1) for day in range(upcoming)] +
+                  [self.now - timedelta(days=day + 1) for day in range(past)])
+        write_shows([{
+            'venue_id': venue_id,
+            'artist_id': artist_id,
+            'start_time': start_time,
+            'duration_minutes': 60,
+            'is_upcoming': start_time > self.now
+        } for start_time in starts])
+
+    def commit(self):
+        db.session.commit()
+        with db.engine.begin() as connection:
+            refresh_area_summary(connection)
+
+
+@pytest.fixture
+def catalogue(app):
+    yield Catalogue()
+    db.session.rollback()
+    for table in (Show.__table__, ShowArchive.__table__, venue_genre, artist_genre,
+                  Venue.__table__, Artist.__table__, area_summary):
+        db.session.execute(table.delete())
+    db.session.query(Genre).update({Genre.venue_count: 0, Genre.artist_count: 0})
+    db.session.commit()
+
+
+@contextmanager
+def _count_statements():
+    # Collects (statement, parameters) for every statement sent to a database.
+    statements = []
+
+    def record(connection, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(Engine, 'before_cursor_execute', record)
+    try:
+        yield statements
+    finally:
+        event.remove(Engine, 'before_cursor_execute', record)
+
+
+@pytest.fixture
+def count_statements():
+    return _count_statements
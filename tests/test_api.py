@@ -0,0 +1,122 @@
+from datetime import timedelta
+
+import pytest
+
+from counters import rollover_shows
+from models import db, Venue
+
+#----------------------------------------------------------------------------#
+# JSON API.
+#----------------------------------------------------------------------------#
+
+def test_conditional_get(client, catalogue):
+    venue_id = catalogue.venue()
+    catalogue.commit()
+
+    response = client.get('/api/v1/venues/{}'.format(venue_id))
+    assert response.status_code == 200
+    assert response.get_json()['data']['id'] == venue_id
+    etag = response.headers['ETag']
+
+    again = client.get('/api/v1/venues/{}'.format(venue_id), headers={'If-None-Match': etag})
+    assert again.status_code == 304
+    assert again.data == b''
+    assert again.headers['ETag'] == etag
+
+
+def test_etag_changes_after_an_edit(client, catalogue):
+    venue_id = catalogue.venue()
+    catalogue.commit()
+    path = '/api/v1/venues/{}'.format(venue_id)
+    etag = client.get(path).headers['ETag']
+
+    db.session.get(Venue, venue_id).name = 'Renamed'
+    db.session.commit()
+
+    response = client.get(path, headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.get_json()['data']['name'] == 'Renamed'
+    assert response.headers['ETag'] != etag
+
+
+def test_etag_changes_after_a_counter_bump(client, catalogue):
+    venue_id, artist_id = catalogue.venue(), catalogue.artist()
+    catalogue.shows(venue_id, artist_id, upcoming=1)
+    catalogue.commit()
+    path = '/api/v1/venues?fields=upcoming_shows_count,past_shows_count'
+    before = client.get(path)
+    assert before.get_json()['data'] == [{'id': venue_id, 'upcoming_shows_count': 1, 'past_shows_count': 0}]
+
+    # The show starts; its counters move with a bulk UPDATE.
+    assert rollover_shows(now=catalogue.now + timedelta(days=2)) == 1
+    db.session.commit()
+
+    after = client.get(path, headers={'If-None-Match': before.headers['ETag']})
+    assert after.status_code == 200
+    assert after.get_json()['data'] == [{'id': venue_id, 'upcoming_shows_count': 0, 'past_shows_count': 1}]
+
+
+def test_fields_projection(client, catalogue):
+    venue_id = catalogue.venue(city='Austin', state='TX')
+    catalogue.commit()
+
+    data = client.get('/api/v1/venues/{}?fields=city, state'.format(venue_id)).get_json()['data']
+    assert data == {'id': venue_id, 'city': 'Austin', 'state': 'TX'}
+
+    response = client.get('/api/v1/venues?fields=city,password,owner')
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'Bad Request', 'message': 'Unknown fields: owner, password'}
+
+
+def test_pagination(app, client, catalogue, monkeypatch):
+    venue_ids = [catalogue.venue() for _ in range(5)]
+    catalogue.commit()
+    monkeypatch.setitem(app.config, 'API_MAX_PAGE_SIZE', 3)
+
+    seen, cursor = [], None
+    while True:
+        page = client.get('/api/v1/venues', query_string=dict(limit=2, fields='id', **(
+            {'cursor': cursor} if cursor else {}))).get_json()
+        assert len(page['data']) <= 2
+        seen.extend(row['id'] for row in page['data'])
+        cursor = page['next_cursor']
+        if cursor is None:
+            break
+    assert seen == venue_ids
+
+    # Limits are clamped to [1, API_MAX_PAGE_SIZE].
+    for limit, expected in ((0, 1), (-4, 1), (100, 3)):
+        page = client.get('/api/v1/venues?limit={}'.format(limit)).get_json()
+        assert len(page['data']) == expected
+        assert page['next_cursor'] is not None
+
+    # The last page has no next cursor.
+    last = client.get('/api/v1/venues?cursor={}'.format(venue_ids[-2])).get_json()
+    assert [row['id'] for row in last['data']] == venue_ids[-1:]
+    assert last['next_cursor'] is None
+
+
+@pytest.mark.parametrize('path, code, error', [
+    ('/api/v1/venues/999999', 404, 'Not Found'),
+    ('/api/v1/nothing', 404, 'Not Found'),
+    ('/api/v1/venues?cursor=abc', 400, 'Bad Request'),
+    ('/api/v1/shows?cursor=abc', 400, 'Bad Request'),
+    ('/api/v1/venues/near', 400, 'Bad Request'),
+])
+def test_errors_are_json(client, catalogue, path, code, error):
+    response = client.get(path)
+    assert response.status_code == code
+    assert response.is_json
+    assert response.get_json()['error'] == error
+
+
+def test_method_not_allowed_is_json(client):
+    response = client.post('/api/v1/venues')
+    assert response.status_code == 405
+    assert response.get_json()['error'] == 'Method Not Allowed'
+    assert 'GET' in response.headers['Allow']
+
+
+def test_other_errors_stay_html(client):
+    assert client.get('/nothing').mimetype == 'text/html'
+    assert client.post('/venues/1').status_code == 405
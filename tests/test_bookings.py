@@ -0,0 +1,109 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from bookings import find_conflicts
+from models import db, Venue, Artist, Show, MAX_SHOW_DURATION_MINUTES
+
+#----------------------------------------------------------------------------#
+# Show bookings.
+#----------------------------------------------------------------------------#
+
+EIGHT_PM = datetime(2030, 6, 1, 20, 0)
+
+
+@pytest.fixture
+def booked(catalogue):
+    # A venue and an artist with one two-hour show at 8 PM, and a second
+    # venue and artist without shows.
+    venue, artist = catalogue.venue(), catalogue.artist()
+    other_venue, other_artist = catalogue.venue(), catalogue.artist()
+    show = Show(venue_id=venue, artist_id=artist, start_time=EIGHT_PM, duration_minutes=120)
+    db.session.add(show)
+    db.session.commit()
+    return venue, artist, other_venue, other_artist, show.id
+
+
+def _conflicts(venue, artist, start_time, minutes=60):
+    return [show.id for show in find_conflicts(venue, artist, start_time, minutes)]
+
+
+def test_same_venue_overlap(booked):
+    venue, artist, other_venue, other_artist, show = booked
+    assert _conflicts(venue, other_artist, EIGHT_PM + timedelta(minutes=90)) == [show]
+    assert _conflicts(venue, other_artist, EIGHT_PM - timedelta(minutes=30)) == [show]
+
+
+def test_same_artist_overlap(booked):
+    venue, artist, other_venue, other_artist, show = booked
+    assert _conflicts(other_venue, artist, EIGHT_PM + timedelta(minutes=119), minutes=1) == [show]
+    assert _conflicts(other_venue, other_artist, EIGHT_PM) == []
+
+
+def test_back_to_back_slots_are_allowed(booked):
+    venue, artist, other_venue, other_artist, show = booked
+    assert _conflicts(venue, artist, EIGHT_PM + timedelta(minutes=120)) == []
+    assert _conflicts(venue, artist, EIGHT_PM - timedelta(minutes=60), minutes=60) == []
+    assert _conflicts(venue, artist, EIGHT_PM - timedelta(minutes=60), minutes=61) == [show]
+
+
+def test_longest_show_is_within_the_look_back(catalogue):
+    venue, artist = catalogue.venue(), catalogue.artist()
+    start = EIGHT_PM - timedelta(minutes=MAX_SHOW_DURATION_MINUTES)
+    day_long = Show(venue_id=venue, artist_id=artist, start_time=start, duration_minutes=MAX_SHOW_DURATION_MINUTES)
+    db.session.add(day_long)
+    db.session.commit()
+
+    assert _conflicts(venue, catalogue.artist(), EIGHT_PM - timedelta(minutes=1)) == [day_long.id]
+    assert _conflicts(venue, catalogue.artist(), EIGHT_PM) == []
+
+
+def test_excluded_show_does_not_conflict_with_itself(booked):
+    venue, artist, other_venue, other_artist, show = booked
+    assert find_conflicts(venue, artist, EIGHT_PM, 120, exclude_id=show) == []
+
+#----------------------------------------------------------------------------#
+# Show form.
+#----------------------------------------------------------------------------#
+
+def _submit(client, venue, artist, start_time=EIGHT_PM, duration=60):
+    return client.post('/shows/create', data={
+        'venue_id': venue, 'artist_id': artist,
+        'start_time': start_time.strftime('%Y-%m-%d %H:%M:%S') if isinstance(start_time, datetime) else start_time,
+        'duration_minutes': duration})
+
+
+def _state(venue, artist):
+    return (db.session.query(Show).count(),
+            db.session.query(Venue.upcoming_shows_count, Venue.version).filter(Venue.id == venue).one(),
+            db.session.query(Artist.upcoming_shows_count, Artist.version).filter(Artist.id == artist).one())
+
+
+def test_conflicting_show_is_rejected_before_writing(client, booked):
+    venue, artist, other_venue, other_artist, show = booked
+    before = _state(venue, other_artist)
+
+    response = _submit(client, venue, other_artist, EIGHT_PM + timedelta(minutes=30))
+    assert response.status_code == 409
+    assert b'the venue is already booked' in response.data
+    db.session.expire_all()
+    assert _state(venue, other_artist) == before
+
+
+def test_free_slot_is_booked(client, booked):
+    venue, artist, other_venue, other_artist, show = booked
+    assert _submit(client, venue, artist, EIGHT_PM + timedelta(hours=2)).status_code == 200
+    assert db.session.query(Show).count() == 2
+    assert db.session.query(Venue.upcoming_shows_count).filter(Venue.id == venue).scalar() == 1
+
+
+@pytest.mark.parametrize('field, value', [
+    ('venue_id', 'abc'), ('artist_id', ''), ('start_time', 'tomorrow'), ('duration_minutes', '0'), ('venue_id', '999999'),
+])
+def test_invalid_show_form(client, booked, field, value):
+    venue, artist, other_venue, other_artist, show = booked
+    data = {'venue_id': other_venue, 'artist_id': other_artist, 'start_time': EIGHT_PM, 'duration': 60}
+    data[{'duration_minutes': 'duration'}.get(field, field)] = value
+    response = _submit(client, data['venue_id'], data['artist_id'], data['start_time'], data['duration'])
+    assert response.status_code == 400
+    assert db.session.query(Show).count() == 1
@@ -0,0 +1,90 @@
+import pytest
+
+from app import page_cache
+from cache import LRUBackend
+from models import db, Artist
+
+#----------------------------------------------------------------------------#
+# LRU backend.
+#----------------------------------------------------------------------------#
+
+def test_entries_expire_and_are_evicted(monkeypatch):
+    backend = LRUBackend(max_entries=2)
+    now = [100.0]
+    monkeypatch.setattr('cache.time.monotonic', lambda: now[0])
+    backend.set('a', b'A', ttl=10)
+    backend.set('b', b'B', ttl=10)
+    assert backend.get('a') == b'A'
+    backend.set('c', b'C', ttl=10)
+    # 'b' was the least recently used.
+    assert (backend.get('a'), backend.get('b'), backend.get('c')) == (b'A', None, b'C')
+    now[0] += 11
+    assert backend.get('a') is None
+
+
+def test_counters_are_bounded_without_going_back():
+    backend = LRUBackend(max_entries=3)
+    for _ in range(5):
+        backend.incr('tag:venue:1')
+    for number in range(2, 10):
+        backend.incr('tag:venue:{}'.format(number))
+    assert len(backend._counters) == 3
+    # Evicted, it never reads lower than its last version, and moves past it.
+    version, = backend.get_counters(['tag:venue:1'])
+    assert version >= 5
+    assert backend.incr('tag:venue:1') == version + 1
+
+#----------------------------------------------------------------------------#
+# Page cache.
+#----------------------------------------------------------------------------#
+
+@pytest.fixture
+def cached(app, monkeypatch):
+    monkeypatch.setattr(page_cache, 'enabled', True)
+    monkeypatch.setattr(page_cache, 'backend', LRUBackend(64))
+    for name in ('hits', 'misses', 'invalidations'):
+        monkeypatch.setattr(page_cache, name, 0)
+    return page_cache
+
+
+def _stats(cache):
+    return cache.hits, cache.misses
+
+
+def test_hits_and_misses(client, catalogue, cached):
+    catalogue.artist()
+    catalogue.commit()
+    first = client.get('/artists')
+    second = client.get('/artists')
+    assert first.status_code == second.status_code == 200
+    assert first.data == second.data
+    assert _stats(cached) == (1, 1)
+
+
+def test_edits_invalidate_pages(client, catalogue, cached):
+    venue, artist = catalogue.venue(), catalogue.artist()
+    catalogue.shows(venue, artist, upcoming=1)
+    catalogue.commit()
+    venue_page = '/venues/{}'.format(venue)
+    assert client.get(venue_page).status_code == 200
+    assert client.get('/artists/{}'.format(artist)).status_code == 200
+
+    # Deleting the venue invalidates its page and its artists' pages.
+    assert client.delete('/venues/{}/delete'.format(venue)).status_code == 302
+    assert cached.invalidations == 1
+    assert client.get(venue_page).status_code == 404
+    response = client.get('/artists/{}'.format(artist))
+    assert response.status_code == 200
+    assert venue_page.encode() not in response.data
+
+
+def test_pages_are_keyed_by_their_etag(client, catalogue, cached):
+    # A change made behind the cache's back (e.g. by another process) still
+    # reaches the page, because its ETag is part of the key.
+    artist = catalogue.artist()
+    catalogue.commit()
+    assert b'Renamed' not in client.get('/artists').data
+    db.session.query(Artist).filter(Artist.id == artist).update({Artist.name: 'Renamed'})
+    db.session.commit()
+    assert b'Renamed' in client.get('/artists').data
+    assert _stats(cached) == (0, 2)
@@ -0,0 +1,70 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from models import db, Venue, Artist
+from partitions import month_start, next_month
+
+#----------------------------------------------------------------------------#
+# Calendar API.
+#----------------------------------------------------------------------------#
+
+def _calendar(client, first, last, **args):
+    return client.get('/api/v1/calendar', query_string=dict(
+        {'from': first.isoformat(), 'to': last.isoformat()}, **args))
+
+
+def test_shows_in_range(client, catalogue):
+    venue_id, artist_id = catalogue.venue(), catalogue.artist()
+    catalogue.shows(venue_id, artist_id, upcoming=3, past=3)
+    catalogue.commit()
+    today = catalogue.now.date()
+
+    data = _calendar(client, today, today + timedelta(days=2)).get_json()['data']
+    assert [row['start_time'][:10] for row in data] == [
+        (today + timedelta(days=day)).isoformat() for day in (1, 2)]
+    assert {(row['venue_id'], row['artist_id']) for row in data} == {(venue_id, artist_id)}
+
+
+@pytest.mark.parametrize('days, code', [(91, 200), (92, 400), (365, 400)])
+def test_range_is_bounded(app, client, days, code):
+    assert app.config['CALENDAR_MAX_DAYS'] == 92
+    first = date(2026, 1, 1)
+    assert _calendar(client, first, first + timedelta(days=days)).status_code == code
+
+
+@pytest.mark.parametrize('args', [
+    {'from': '2026-02-01', 'to': '2026-01-31'},
+    {'from': '2026-01-01'},
+    {'from': '2026-01-01', 'to': '01/02/2026'},
+])
+def test_bad_ranges(client, args):
+    response = client.get('/api/v1/calendar', query_string=args)
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Bad Request'
+
+
+@pytest.mark.parametrize('model', [Venue, Artist])
+def test_etag_follows_venue_and_artist_names(client, catalogue, model):
+    venue_id, artist_id = catalogue.venue(), catalogue.artist()
+    catalogue.shows(venue_id, artist_id, upcoming=1)
+    catalogue.commit()
+    today = catalogue.now.date()
+    etag = _calendar(client, today, today + timedelta(days=7)).headers['ETag']
+
+    db.session.get(model, venue_id if model is Venue else artist_id).name = 'Renamed'
+    db.session.commit()
+
+    response = client.get('/api/v1/calendar', query_string={
+        'from': today.isoformat(), 'to': (today + timedelta(days=7)).isoformat()},
+        headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    row, = response.get_json()['data']
+    assert row['venue_name' if model is Venue else 'artist_name'] == 'Renamed'
+
+
+def test_month_boundaries():
+    assert month_start(datetime(2026, 12, 31, 23, 59)) == datetime(2026, 12, 1)
+    assert next_month(datetime(2026, 12, 1)) == datetime(2027, 1, 1)
+    assert next_month(datetime(2026, 1, 1)) == datetime(2026, 2, 1)
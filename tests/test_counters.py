@@ -0,0 +1,74 @@
+from datetime import timedelta
+
+from counters import check_counts, rollover_shows
+from models import db, Venue, Artist, Show
+from queries import load_venue_areas
+
+#----------------------------------------------------------------------------#
+# Show counters.
+#----------------------------------------------------------------------------#
+
+def _counts(model, entity_id):
+    return tuple(db.session.query(model.upcoming_shows_count, model.past_shows_count).filter(model.id == entity_id).one())
+
+
+def test_rollover_moves_started_shows(catalogue):
+    venue, artist = catalogue.venue(), catalogue.artist()
+    catalogue.shows(venue, artist, upcoming=3, past=1)
+    catalogue.commit()
+
+    # The shows of tomorrow and the day after have started two days later.
+    later = catalogue.now + timedelta(days=2, minutes=1)
+    assert rollover_shows(now=later) == 2
+    db.session.commit()
+    assert _counts(Venue, venue) == _counts(Artist, artist) == (1, 3)
+    assert db.session.query(Show).filter(Show.is_upcoming).count() == 1
+    assert check_counts(now=later) == []
+    assert rollover_shows(now=later) == 0
+
+
+def test_check_reports_and_repairs_drift(catalogue):
+    venue, artist = catalogue.venue(), catalogue.artist()
+    catalogue.shows(venue, artist, upcoming=2, past=2)
+    catalogue.commit()
+    assert check_counts() == []
+
+    db.session.query(Venue).filter(Venue.id == venue).update({Venue.upcoming_shows_count: 5})
+    db.session.commit()
+    assert check_counts() == [('venue', venue, (5, 2), (2, 2))]
+    assert check_counts(repair=True) == [('venue', venue, (5, 2), (2, 2))]
+    db.session.commit()
+    assert check_counts() == []
+    assert _counts(Venue, venue) == (2, 2)
+
+
+def test_check_command_is_read_only_without_repair(app, catalogue):
+    venue, artist = catalogue.venue(), catalogue.artist()
+    catalogue.shows(venue, artist, upcoming=2)
+    catalogue.commit()
+    # Drift, and a show that has started but was not rolled over.
+    db.session.query(Show).filter(Show.venue_id == venue).update(
+        {Show.start_time: catalogue.now - timedelta(hours=1)}, synchronize_session=False)
+    db.session.query(Artist).filter(Artist.id == artist).update({Artist.past_shows_count: 4})
+    db.session.commit()
+    version = db.session.query(Venue.version).filter(Venue.id == venue).scalar()
+    runner = app.test_cli_runner()
+
+    result = runner.invoke(args=['counts', 'check'])
+    assert result.exit_code == 0, result.output
+    # Reported after the (uncommitted) rollover of the two started shows.
+    assert result.output.splitlines()[0] == 'artist {}: stored upcoming/past 0/6, actual 0/2'.format(artist)
+    db.session.expire_all()
+    assert _counts(Venue, venue) == (2, 0)
+    assert db.session.query(Venue.version).filter(Venue.id == venue).scalar() == version
+    assert db.session.query(Show).filter(Show.is_upcoming).count() == 2
+
+    result = runner.invoke(args=['counts', 'check', '--repair'])
+    assert result.exit_code == 0, result.output
+    db.session.expire_all()
+    assert _counts(Venue, venue) == (0, 2)
+    assert _counts(Artist, artist) == (0, 2)
+    assert check_counts() == []
+    # The area summary behind /venues was refreshed.
+    upcoming = [entry['num_upcoming_shows'] for area in load_venue_areas() for entry in area['venues'] if entry['id'] == venue]
+    assert upcoming == [0]
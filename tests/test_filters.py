@@ -0,0 +1,23 @@
+from datetime import datetime
+
+import babel.dates
+import pytest
+
+from app import format_datetime
+
+#----------------------------------------------------------------------------#
+# datetime filter.
+#----------------------------------------------------------------------------#
+
+SHOW_TIME = datetime(2026, 1, 1, 20, 0)
+
+
+def test_custom_formats():
+    assert format_datetime(SHOW_TIME) == 'Thu 01, 01, 2026 8:00PM'
+    assert format_datetime(SHOW_TIME, 'full') == 'Thursday January, 1, 2026 at 8:00PM'
+    assert format_datetime('2026-01-01T20:00:00', 'full') == 'Thursday January, 1, 2026 at 8:00PM'
+
+
+@pytest.mark.parametrize('format', ['short', 'long', 'yyyy-MM-dd HH:mm'])
+def test_other_formats_match_babel(format):
+    assert format_datetime(SHOW_TIME, format) == babel.dates.format_datetime(SHOW_TIME, format, locale='en')
@@ -0,0 +1,40 @@
+from flask import url_for
+
+from forms import VenueForm
+from genres import clear_genre_choices, resolve_genres
+from importer import VENUE_COLUMNS, write_entities
+from models import db, Venue
+
+#----------------------------------------------------------------------------#
+# Genre pages.
+#----------------------------------------------------------------------------#
+
+def test_genre_names_with_slashes(app, client, catalogue):
+    row = dict.fromkeys(VENUE_COLUMNS)
+    row.update(external_id='slash', name='The Slash Room', city='Austin', state='TX', genres=['R&B/Soul'])
+    write_entities(Venue, VENUE_COLUMNS, [row])
+    db.session.commit()
+
+    with app.test_request_context():
+        path = url_for('show_genre', name='R&B/Soul')
+    response = client.get(path)
+    assert response.status_code == 200
+    assert b'The Slash Room' in response.data
+    venue = Venue.query.filter_by(external_id='slash').one()
+    assert 'href="/venues/{}"'.format(venue.id).encode() in response.data
+    assert client.get('/genres/R%26B%2FSoul').status_code == 200
+
+
+def test_genre_choices_are_cached(app, count_statements):
+    with app.test_request_context(method='POST'):
+        VenueForm()
+        with count_statements() as statements:
+            choices = VenueForm().genres.choices
+        assert statements == []
+        assert ('Jazz', 'Jazz') in choices
+
+        # A name added by this process is offered on the next form.
+        resolve_genres(['Zydeco'])
+        assert ('Zydeco', 'Zydeco') in VenueForm().genres.choices
+        db.session.rollback()
+        clear_genre_choices()
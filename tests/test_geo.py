@@ -0,0 +1,83 @@
+import pytest
+
+from geo import GRID_DEGREES, distance_km, grid_cell, nearest_venues, venues_within
+from importer import VENUE_COLUMNS, write_entities
+from models import db, Venue
+
+#----------------------------------------------------------------------------#
+# Proximity search.
+#----------------------------------------------------------------------------#
+
+ORIGIN = (37.7999, -122.4001)
+
+@pytest.fixture
+def place(catalogue):
+    # Adds a venue at (latitude, longitude), or at an unknown city without
+    # coordinates, and returns its id.
+    def place(latitude=None, longitude=None):
+        catalogue.count += 1
+        row = dict.fromkeys(VENUE_COLUMNS)
+        row.update(external_id='geo-{}'.format(catalogue.count), name='Geo {}'.format(catalogue.count),
+                   city='Nowhere', state='ZZ', genres=[], latitude=latitude, longitude=longitude)
+        write_entities(Venue, VENUE_COLUMNS, [row])
+        return db.session.query(Venue.id).filter(Venue.external_id == row['external_id']).scalar()
+    yield place
+    db.session.commit()
+
+
+def _ids(found):
+    return [row.id for _, row in found]
+
+
+def test_nearest_first(place):
+    # Inserted out of order: ~11 km, ~1 km, ~111 km and ~5 km north.
+    far, nearest, farthest, middle = (place(ORIGIN[0] + degrees, ORIGIN[1]) for degrees in (0.1, 0.01, 1, 0.045))
+    found = nearest_venues(*ORIGIN, limit=10, max_radius_km=500)
+    assert _ids(found) == [nearest, middle, far, farthest]
+    distances = [distance for distance, _ in found]
+    assert distances == sorted(distances)
+    assert distances[0] == pytest.approx(1.1, abs=0.1)
+
+    assert _ids(nearest_venues(*ORIGIN, limit=2, max_radius_km=500)) == [nearest, middle]
+    assert _ids(nearest_venues(*ORIGIN, limit=10, max_radius_km=500, radius_km=20)) == [nearest, middle, far]
+
+
+def test_neighbouring_cells(place):
+    # A few metres from the origin, across both a row and a column border.
+    across = place(ORIGIN[0] + 0.0002, ORIGIN[1] + 0.0002)
+    assert grid_cell(*ORIGIN) != grid_cell(ORIGIN[0] + 0.0002, ORIGIN[1] + 0.0002)
+    found = venues_within(*ORIGIN, radius_km=0.1, columns=(Venue.id,))
+    assert _ids(found) == [across]
+    assert found[0][0] < 0.05
+
+    # Inside the radius only through a cell the origin is not in.
+    edge = place(ORIGIN[0], ORIGIN[1] + 2 * GRID_DEGREES)
+    radius = distance_km(*ORIGIN, ORIGIN[0], ORIGIN[1] + 2 * GRID_DEGREES) + 0.01
+    assert _ids(venues_within(*ORIGIN, radius_km=radius, columns=(Venue.id,))) == [across, edge]
+    assert _ids(venues_within(*ORIGIN, radius_km=radius - 0.02, columns=(Venue.id,))) == [across]
+
+
+def test_max_radius(app, client, place):
+    near, remote = place(ORIGIN[0] + 1, ORIGIN[1]), place(ORIGIN[0] + 6, ORIGIN[1])
+    # ~670 km away: beyond NEARBY_MAX_RADIUS_KM however few venues are nearer.
+    assert app.config['NEARBY_MAX_RADIUS_KM'] == 500
+    assert _ids(nearest_venues(*ORIGIN, limit=10, max_radius_km=500)) == [near]
+    assert _ids(nearest_venues(*ORIGIN, limit=10, max_radius_km=500, radius_km=1000)) == [near]
+    db.session.commit()
+
+    query = {'lat': ORIGIN[0], 'lon': ORIGIN[1]}
+    assert [row['id'] for row in client.get('/api/v1/venues/near', query_string=query).get_json()['data']] == [near]
+    for radius in (0, -1, 501):
+        response = client.get('/api/v1/venues/near', query_string=dict(query, radius_km=radius))
+        assert response.status_code == 400
+
+
+def test_venues_without_coordinates(client, place):
+    located = place(*ORIGIN)
+    unplaced = place()
+    db.session.commit()
+    assert db.session.get(Venue, unplaced).grid_cell is None
+
+    assert _ids(nearest_venues(*ORIGIN, limit=10, max_radius_km=500)) == [located]
+    data = client.get('/api/v1/venues/near', query_string={'lat': ORIGIN[0], 'lon': ORIGIN[1]}).get_json()['data']
+    assert [(row['id'], row['distance_km']) for row in data] == [(located, 0)]
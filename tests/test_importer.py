@@ -0,0 +1,106 @@
+import json
+from datetime import datetime, timedelta, timezone
+
+from importer import ARTIST_COLUMNS, VENUE_COLUMNS, import_entities, import_shows, read_records
+from models import db, Venue, Artist, Show
+
+#----------------------------------------------------------------------------#
+# Bulk import.
+#----------------------------------------------------------------------------#
+
+def _write_jsonl(path, records):
+    path.write_text(''.join(json.dumps(record) + '\n' for record in records))
+    return str(path)
+
+
+def _ignore(count):
+    pass
+
+
+def test_csv_entities(tmp_path, catalogue):
+    path = tmp_path / 'artists.csv'
+    path.write_text(
+        'external_id,name,city,state,phone,genres,facebook_link,image_link,website_link,seeking_venue,seeking_description\n'
+        'a-1,Quartet,Austin,TX,,Jazz; Blues,,,,yes,\n'
+        'a-2,Trio,Austin,TX,512-555-0100,,,,,,\n')
+
+    assert import_entities(Artist, ARTIST_COLUMNS, read_records(str(path)), 10, _ignore) == (2, 0)
+    quartet, trio = db.session.query(Artist).order_by(Artist.external_id).all()
+    assert (quartet.genres, quartet.seeking_venue, quartet.phone) == (['Jazz', 'Blues'], True, None)
+    assert (trio.genres, trio.seeking_venue, trio.phone) == (None, False, '512-555-0100')
+
+
+def test_jsonl_entities_keep_numbers_and_falsy_values(tmp_path, catalogue):
+    path = _write_jsonl(tmp_path / 'venues.jsonl', [
+        {'external_id': 101, 'name': 'Null Island', 'city': 'Nowhere', 'state': 'ZZ',
+         'latitude': 0, 'longitude': 0, 'genres': ['Jazz'], 'seeking_talent': False},
+        {'external_id': 102, 'name': 'Austin Room', 'city': 'Austin', 'state': 'TX', 'genres': []},
+    ])
+
+    assert import_entities(Venue, VENUE_COLUMNS, read_records(path), 10, _ignore) == (2, 0)
+    null_island = db.session.query(Venue).filter(Venue.external_id == '101').one()
+    assert (null_island.latitude, null_island.longitude) == (0, 0)
+    assert null_island.grid_cell is not None
+    # Geocoded from the city.
+    assert db.session.query(Venue.latitude).filter(Venue.external_id == '102').scalar() is not None
+
+
+def test_existing_external_ids_are_skipped(tmp_path, catalogue):
+    path = _write_jsonl(tmp_path / 'venues.jsonl', [
+        {'external_id': 'v-1', 'name': 'First', 'city': 'Austin', 'state': 'TX'},
+        {'external_id': 'v-1', 'name': 'Repeated', 'city': 'Austin', 'state': 'TX'},
+        {'external_id': 'v-2', 'name': 'Second', 'city': 'Austin', 'state': 'TX'},
+    ])
+
+    assert import_entities(Venue, VENUE_COLUMNS, read_records(path), 2, _ignore) == (2, 1)
+    assert import_entities(Venue, VENUE_COLUMNS, read_records(path), 2, _ignore) == (0, 3)
+    assert [name for name, in db.session.query(Venue.name).order_by(Venue.name)] == ['First', 'Second']
+
+
+def test_shows_resolve_keys_and_update_counters(tmp_path, catalogue):
+    venue, artist = catalogue.venue(), catalogue.artist()
+    db.session.query(Venue).filter(Venue.id == venue).update({Venue.external_id: '7'})
+    db.session.query(Artist).filter(Artist.id == artist).update({Artist.external_id: '8'})
+    db.session.commit()
+    now = datetime(2026, 6, 1, 12, 0)
+    path = _write_jsonl(tmp_path / 'shows.jsonl', [
+        {'venue_key': 7, 'artist_key': '8', 'start_time': '2026-07-01T20:00:00', 'duration_minutes': 90},
+        {'venue_key': '7', 'artist_key': 8, 'start_time': '2026-05-01 20:00'},
+        {'venue_key': 'missing', 'artist_key': 8, 'start_time': '2026-07-02T20:00:00'},
+        {'venue_key': 7, 'artist_key': 8, 'start_time': 'not a date'},
+        {'venue_key': 7, 'artist_key': 8, 'start_time': '2026-07-03T20:00:00', 'duration_minutes': 0},
+    ])
+
+    assert import_shows(read_records(path), 10, _ignore, now=now) == (2, 3)
+    shows = db.session.query(Show.start_time, Show.duration_minutes, Show.is_upcoming).order_by(Show.start_time).all()
+    assert shows == [(datetime(2026, 5, 1, 20, 0), 120, False), (datetime(2026, 7, 1, 20, 0), 90, True)]
+    for model, entity_id in ((Venue, venue), (Artist, artist)):
+        counts = db.session.query(model.upcoming_shows_count, model.past_shows_count).filter(model.id == entity_id).one()
+        assert tuple(counts) == (1, 1)
+
+
+def test_shows_with_offsets_are_stored_as_local_time(tmp_path, catalogue):
+    venue, artist = catalogue.venue(), catalogue.artist()
+    keys = db.session.query(Venue.external_id).filter(Venue.id == venue).scalar(), \
+        db.session.query(Artist.external_id).filter(Artist.id == artist).scalar()
+    catalogue.commit()
+    utc = datetime(2026, 1, 1, 20, 0, tzinfo=timezone.utc)
+    path = _write_jsonl(tmp_path / 'shows.jsonl', [
+        {'venue_key': keys[0], 'artist_key': keys[1], 'start_time': '2026-01-01T20:00:00Z'},
+        {'venue_key': keys[0], 'artist_key': keys[1], 'start_time': '2026-01-02T20:00:00+00:00'},
+    ])
+
+    assert import_shows(read_records(path), 10, _ignore) == (2, 0)
+    starts = [start for start, in db.session.query(Show.start_time).order_by(Show.start_time)]
+    local = utc.astimezone().replace(tzinfo=None)
+    assert starts == [local, local + timedelta(days=1)]
+
+
+def test_import_command(app, tmp_path, catalogue):
+    venues = _write_jsonl(tmp_path / 'venues.jsonl', [{'external_id': 'v', 'name': 'V', 'city': 'Austin', 'state': 'TX'}])
+    artists = _write_jsonl(tmp_path / 'artists.jsonl', [{'external_id': 'a', 'name': 'A', 'city': 'Austin', 'state': 'TX'}])
+    shows = _write_jsonl(tmp_path / 'shows.jsonl', [{'venue_key': 'v', 'artist_key': 'a', 'start_time': '2099-01-01T20:00:00Z'}])
+
+    result = app.test_cli_runner().invoke(args=['import', '--venues', venues, '--artists', artists, '--shows', shows])
+    assert result.exit_code == 0, result.output
+    assert db.session.query(Venue.upcoming_shows_count).filter(Venue.external_id == 'v').scalar() == 1
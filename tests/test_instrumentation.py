@@ -0,0 +1,80 @@
+import logging
+
+import pytest
+from flask import Flask
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import text
+
+from instrumentation import SQLInstrumentation, logger, statement_shape
+
+#----------------------------------------------------------------------------#
+# SQL instrumentation.
+#----------------------------------------------------------------------------#
+
+class Records(logging.Handler):
+
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+@pytest.fixture
+def records():
+    handler = Records()
+    level = logger.level
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    yield handler.records
+    logger.removeHandler(handler)
+    logger.setLevel(level)
+
+
+def make_app(tmp_path, **config):
+    db = SQLAlchemy()
+    app = Flask(__name__)
+    app.config.update(
+        SQLALCHEMY_DATABASE_URI='sqlite:///' + str(tmp_path / 'instrumented.db'),
+        SQLALCHEMY_TRACK_MODIFICATIONS=False,
+        SQL_REPEAT_THRESHOLD=2,
+        **config)
+    db.init_app(app)
+    SQLInstrumentation(app)
+
+    @app.route('/')
+    def index():
+        for number in range(3):
+            db.session.execute(text('SELECT {}'.format(number)))
+        return 'ok'
+
+    return app
+
+
+def test_off_by_default(tmp_path, records):
+    response = make_app(tmp_path).test_client().get('/')
+    assert 'Server-Timing' not in response.headers
+    assert records == []
+
+
+def test_logs_without_server_timing(tmp_path, records):
+    response = make_app(tmp_path, SQL_INSTRUMENTATION_ENABLED=True).test_client().get('/')
+    assert 'Server-Timing' not in response.headers
+
+    request, repeated = records
+    assert request.data['queries'] == 3
+    assert repeated.levelno == logging.WARNING
+    assert repeated.data['statement'] == 'SELECT ?'
+
+
+def test_server_timing_is_opt_in(tmp_path, records):
+    app = make_app(tmp_path, SQL_INSTRUMENTATION_ENABLED=True, SQL_SERVER_TIMING=True)
+    timings = app.test_client().get('/').headers.getlist('Server-Timing')
+    assert [timing.split(';')[0] for timing in timings] == ['db', 'total']
+    assert 'desc="3 queries"' in timings[0]
+
+
+def test_statement_shape():
+    assert statement_shape("SELECT * FROM show WHERE id IN (1, 2,\n 3) AND name = 'it''s'") == \
+        'SELECT * FROM show WHERE id IN (...) AND name = ?'
@@ -0,0 +1,54 @@
+import pytest
+from sqlalchemy.exc import InvalidRequestError
+
+from models import db, Venue, Artist
+
+#----------------------------------------------------------------------------#
+# Loading profiles.
+#----------------------------------------------------------------------------#
+
+SHOWS = {Venue: 'shows_venue', Artist: 'shows_artist'}
+
+
+@pytest.fixture
+def entities(catalogue):
+    # Three venues and three artists with four shows each.
+    venues = [catalogue.venue() for _ in range(3)]
+    artists = [catalogue.artist() for _ in range(3)]
+    for venue, artist in zip(venues, artists):
+        catalogue.shows(venue, artist, upcoming=2, past=2)
+    catalogue.commit()
+    return 3
+
+
+@pytest.mark.parametrize('model', [Venue, Artist])
+@pytest.mark.parametrize('profile', ['list', 'detail', 'edit'])
+def test_profile_row_and_column_counts(entities, count_statements, model, profile):
+    with count_statements() as statements:
+        loaded = model.profile(profile).all()
+    assert len(loaded) == entities
+    assert len(statements) == 1
+
+    # Run the statement the profile sent again to see its raw result: one
+    # row per entity (no joined shows), and only the columns it needs.
+    statement, parameters = statements[0]
+    result = db.session.connection().exec_driver_sql(statement, parameters)
+    keys, rows = result.keys(), result.all()
+    columns = 2 if profile == 'list' else len(model.__table__.columns)
+    assert len(keys) == columns
+    assert len(rows) == entities
+
+
+@pytest.mark.parametrize('model', [Venue, Artist])
+def test_profiles_do_not_load_shows(entities, count_statements, model):
+    entity_id = db.session.query(model.id).first().id
+    for profile in ('list', 'detail'):
+        entity = model.profile(profile).filter(model.id == entity_id).one()
+        with count_statements() as statements:
+            assert getattr(entity, SHOWS[model]) == []
+        assert statements == []
+        db.session.expunge_all()
+
+    entity = model.profile('edit').filter(model.id == entity_id).one()
+    with pytest.raises(InvalidRequestError):
+        getattr(entity, SHOWS[model])
@@ -0,0 +1,147 @@
+from datetime import timedelta
+
+import pytest
+
+from importer import write_shows
+from models import db, Show
+from queries import load_venue_areas, load_venue_detail, load_artist_detail, load_shows_page
+
+#----------------------------------------------------------------------------#
+# /venues area listing.
+#----------------------------------------------------------------------------#
+
+def test_venue_areas_are_one_statement(catalogue, count_statements):
+    artist = catalogue.artist()
+    first, second = catalogue.venue(), catalogue.venue()
+    oakland = catalogue.venue('Oakland', 'CA')
+    catalogue.shows(first, artist, upcoming=2, past=3)
+    catalogue.shows(oakland, artist, upcoming=1)
+    catalogue.commit()
+
+    with count_statements() as statements:
+        areas = load_venue_areas()
+
+    assert len(statements) == 1
+    assert [(area['city'], area['state']) for area in areas] == [('Oakland', 'CA'), ('San Francisco', 'CA')]
+    upcoming = {venue['id']: venue['num_upcoming_shows'] for area in areas for venue in area['venues']}
+    assert upcoming == {first: 2, second: 0, oakland: 1}
+
+
+def test_venues_page_statements_do_not_grow(client, catalogue, count_statements):
+    artist = catalogue.artist()
+    catalogue.shows(catalogue.venue(), artist, upcoming=1)
+    catalogue.commit()
+    with count_statements() as small:
+        assert client.get('/venues').status_code == 200
+
+    for index in range(10):
+        catalogue.shows(catalogue.venue('City {}'.format(index), 'NY'), artist, upcoming=2, past=2)
+    catalogue.commit()
+    with count_statements() as large:
+        assert client.get('/venues').status_code == 200
+
+    # The conditional GET probe and the listing itself.
+    assert len(small) == len(large) == 2
+
+#----------------------------------------------------------------------------#
+# Detail pages.
+#----------------------------------------------------------------------------#
+
+def test_detail_loaders_are_one_statement(catalogue, count_statements):
+    venue, artist = catalogue.venue(), catalogue.artist()
+    for _ in range(3):
+        catalogue.shows(venue, catalogue.artist(), upcoming=2, past=2)
+    catalogue.shows(catalogue.venue(), artist, upcoming=1, past=1)
+    catalogue.commit()
+
+    with count_statements() as statements:
+        venue_data = load_venue_detail(venue)
+    assert len(statements) == 1
+    assert (venue_data['upcoming_shows_count'], venue_data['past_shows_count']) == (6, 6)
+
+    with count_statements() as statements:
+        artist_data = load_artist_detail(artist)
+    assert len(statements) == 1
+    assert (artist_data['upcoming_shows_count'], artist_data['past_shows_count']) == (1, 1)
+
+
+def test_detail_pages_statements_do_not_grow(client, catalogue, count_statements):
+    quiet, busy, artist = catalogue.venue(), catalogue.venue(), catalogue.artist()
+    catalogue.shows(quiet, artist, upcoming=1)
+    for _ in range(5):
+        catalogue.shows(busy, catalogue.artist(), upcoming=3, past=3)
+    catalogue.commit()
+
+    counts = []
+    for path in ('/venues/{}'.format(quiet), '/venues/{}'.format(busy), '/artists/{}'.format(artist)):
+        with count_statements() as statements:
+            assert client.get(path).status_code == 200
+        counts.append(len(statements))
+
+    # The conditional GET probe and the page itself.
+    assert counts == [2, 2, 2]
+
+#----------------------------------------------------------------------------#
+# /shows feed.
+#----------------------------------------------------------------------------#
+
+@pytest.fixture
+def feed(catalogue):
+    # Seven shows at one venue, each by its own artist, three of them
+    # starting at the same time; newest first, as the feed orders them.
+    venue_id = catalogue.venue()
+    start = catalogue.now.replace(microsecond=0)
+    offsets = (0, 0, 2, 0, -2, 1, -1)
+    write_shows([{
+        'venue_id': venue_id,
+        'artist_id': catalogue.artist(),
+        'start_time': start + timedelta(hours=offset),
+        'duration_minutes': 60,
+        'is_upcoming': True
+    } for offset in offsets])
+    catalogue.commit()
+    rows = db.session.query(Show.artist_id).order_by(Show.start_time.desc(), Show.id.desc())
+    return [artist_id for artist_id, in rows]
+
+
+def _artists(page):
+    return [show['artist_id'] for show in page['shows']]
+
+
+def test_shows_pages_forward_and_back(feed):
+    pages = [load_shows_page(per_page=3)]
+    while pages[-1]['next_cursor']:
+        pages.append(load_shows_page(after=pages[-1]['next_cursor'], per_page=3))
+
+    assert [_artists(page) for page in pages] == [feed[0:3], feed[3:6], feed[6:]]
+    first, last = pages[0], pages[-1]
+    assert first['prev_cursor'] is None
+    assert last['next_cursor'] is None
+
+    # Back from the last page, across the shows sharing a start time.
+    back = [last]
+    while back[-1]['prev_cursor']:
+        back.append(load_shows_page(before=back[-1]['prev_cursor'], per_page=3))
+    assert [_artists(page) for page in back] == [feed[6:], feed[3:6], feed[0:3]]
+    assert back[-1]['prev_cursor'] is None
+    assert back[-1]['next_cursor'] is not None
+
+
+def test_shows_page_cursors_split_equal_start_times(feed):
+    page = load_shows_page(per_page=3)
+    following = load_shows_page(after=page['next_cursor'], per_page=3)
+    # Both pages hold shows starting at the same time, told apart by id.
+    assert page['shows'][-1]['start_time'] == following['shows'][0]['start_time']
+    assert _artists(page) + _artists(following) == feed[:6]
+
+
+def test_single_page(feed):
+    page = load_shows_page(per_page=len(feed))
+    assert _artists(page) == feed
+    assert page['prev_cursor'] is None and page['next_cursor'] is None
+
+
+@pytest.mark.parametrize('query', ['after=abc', 'before=2026-01-01T00:00:00', 'after=yesterday,1',
+                                   'before=2026-01-01T00:00:00,x'])
+def test_malformed_shows_cursor(client, query):
+    assert client.get('/shows?' + query).status_code == 400
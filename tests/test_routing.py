@@ -0,0 +1,96 @@
+import time
+
+import pytest
+from flask import Flask, jsonify
+from sqlalchemy import create_engine, text
+
+from routing import RoutingSQLAlchemy
+
+#----------------------------------------------------------------------------#
+# Read/write splitting.
+#----------------------------------------------------------------------------#
+
+# A small app on its own RoutingSQLAlchemy: the primary and the replica are
+# separate SQLite files holding different rows, so every response shows
+# which database served it.
+
+def _database(path, name):
+    engine = create_engine('sqlite:///' + str(path))
+    with engine.begin() as connection:
+        connection.execute(text('CREATE TABLE item (id INTEGER PRIMARY KEY, name VARCHAR(20))'))
+        connection.execute(text('INSERT INTO item (name) VALUES (:name)'), {'name': name})
+    engine.dispose()
+    return 'sqlite:///' + str(path)
+
+
+def make_app(tmp_path, replica_uri=None, secret='shared secret', primary=None):
+    db = RoutingSQLAlchemy()
+
+    class Item(db.Model):
+        id = db.Column(db.Integer, primary_key=True)
+        name = db.Column(db.String(20))
+
+    app = Flask(__name__)
+    app.config.update(
+        SECRET_KEY=secret,
+        SQLALCHEMY_DATABASE_URI=primary or _database(tmp_path / 'primary.db', 'primary'),
+        SQLALCHEMY_TRACK_MODIFICATIONS=False,
+        SQLALCHEMY_REPLICA_URIS=[replica_uri or _database(tmp_path / 'replica.db', 'replica')],
+        REPLICA_HEALTH_CHECK_INTERVAL=60,
+        READ_YOUR_WRITES_SECONDS=5)
+    db.init_app(app)
+
+    @app.route('/items', methods=['GET', 'POST'])
+    def items():
+        return jsonify(sorted(item.name for item in Item.query.all()))
+
+    @app.route('/items/add', methods=['POST'])
+    def add_item():
+        db.session.add(Item(name='added'))
+        db.session.commit()
+        return 'ok'
+
+    return app
+
+
+def test_gets_read_from_the_replica(tmp_path):
+    client = make_app(tmp_path).test_client()
+    assert client.get('/items').get_json() == ['replica']
+    assert client.post('/items').get_json() == ['primary']
+
+
+def test_writers_read_from_the_primary_for_a_while(tmp_path, monkeypatch):
+    app = make_app(tmp_path)
+    writer, other = app.test_client(), app.test_client()
+    assert writer.post('/items/add').status_code == 200
+
+    assert writer.get('/items').get_json() == ['added', 'primary']
+    assert other.get('/items').get_json() == ['replica']
+
+    # Once READ_YOUR_WRITES_SECONDS have passed, back to the replica.
+    later = time.time() + 6
+    monkeypatch.setattr(time, 'time', lambda: later)
+    assert writer.get('/items').get_json() == ['replica']
+
+
+def test_read_your_writes_across_workers(tmp_path):
+    # Two processes sharing SECRET_KEY accept each other's cookie; with
+    # different keys the second one does not, and reads from the replica.
+    first = make_app(tmp_path)
+    primary = first.config['SQLALCHEMY_DATABASE_URI']
+    replica = first.config['SQLALCHEMY_BINDS']['replica1']
+    client = first.test_client()
+    client.post('/items/add')
+    cookie = next(cookie for cookie in client.cookie_jar if cookie.name == 'session')
+
+    for secret, expected in (('shared secret', ['added', 'primary']), ('other secret', ['replica'])):
+        second = make_app(tmp_path, replica_uri=replica, secret=secret, primary=primary).test_client()
+        second.set_cookie('localhost', 'session', cookie.value)
+        assert second.get('/items').get_json() == expected
+
+
+def test_unhealthy_replica_falls_back_to_the_primary(tmp_path):
+    app = make_app(tmp_path, replica_uri='sqlite:///' + str(tmp_path / 'missing' / 'replica.db'))
+    assert app.test_client().get('/items').get_json() == ['primary']
+    with app.app_context():
+        assert [replica['healthy'] for replica in app.extensions['replicas'].stats()] == [False]
@@ -0,0 +1,39 @@
+import time
+
+from summaries import AreaSummaryRefresher
+
+#----------------------------------------------------------------------------#
+# Debounced refresh.
+#----------------------------------------------------------------------------#
+
+class RecordingRefresher(AreaSummaryRefresher):
+
+    def __init__(self, app):
+        super().__init__(app)
+        self.delay, self.max_delay = 0.2, 0.6
+        self.runs = []
+
+    def refresh(self):
+        self.runs.append(time.monotonic())
+
+
+def test_burst_refreshes_once_after_the_last_write(app):
+    refresher = RecordingRefresher(app)
+    for _ in range(4):
+        last = time.monotonic()
+        refresher.request_refresh()
+        time.sleep(0.05)
+    time.sleep(0.4)
+    assert len(refresher.runs) == 1
+    assert refresher.runs[0] - last >= refresher.delay
+
+
+def test_steady_writes_refresh_by_the_maximum_delay(app):
+    refresher = RecordingRefresher(app)
+    first = time.monotonic()
+    while time.monotonic() - first < 1.0:
+        refresher.request_refresh()
+        time.sleep(0.05)
+    time.sleep(0.4)
+    assert refresher.runs
+    assert refresher.runs[0] - first < refresher.max_delay + 0.1
@@ -0,0 +1,19 @@
+from models import db, Venue, Genre
+
+#----------------------------------------------------------------------------#
+# Deleting venues.
+#----------------------------------------------------------------------------#
+
+def test_delete_venue(client, catalogue):
+    venue, artist = catalogue.venue(), catalogue.artist()
+    catalogue.shows(venue, artist, upcoming=2, past=1)
+    catalogue.commit()
+
+    assert client.delete('/venues/{}/delete'.format(venue)).status_code == 302
+    assert db.session.get(Venue, venue) is None
+    jazz = db.session.query(Genre).filter(Genre.name == 'Jazz').one()
+    assert (jazz.venue_count, jazz.artist_count) == (0, 1)
+
+
+def test_delete_unknown_venue(client, catalogue):
+    assert client.delete('/venues/999999/delete').status_code == 404